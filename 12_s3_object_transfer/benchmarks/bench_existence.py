@@ -0,0 +1,93 @@
+"""
+存在確認のベンチマーク(moto上のS3で実行)
+
+1件ずつ逐次HEADする従来の方式と、s3_objects_existenceのhead / list / autoモードの
+実行時間を比較する。motoはプロセス内で応答するため、--latencyで1リクエストあたりの
+ネットワーク遅延を擬似的に加える
+
+実行方法:
+    cd 12_s3_object_transfer
+    PYTHONPATH=$(pwd) python benchmarks/bench_existence.py --files 5000 --latency 0.02
+"""
+
+import argparse
+import sys
+import time
+
+import boto3
+from moto import mock_s3
+
+sys.path.append("../")
+
+from lib.s3_operations import s3_objects_existence
+
+BUCKET_NAME = "bench-bucket"
+TARGET_PREFIX = "target/files/"
+
+
+class LatencyClient:
+    """
+    APIコールごとに遅延を加えるS3クライアントのラッパー
+    """
+
+    def __init__(self, s3_client, latency):
+        self.s3_client = s3_client
+        self.latency = latency
+
+    def head_object(self, **kwargs):
+        time.sleep(self.latency)
+        return self.s3_client.head_object(**kwargs)
+
+    def get_paginator(self, operation_name):
+        paginator = self.s3_client.get_paginator(operation_name)
+        latency = self.latency
+
+        class LatencyPaginator:
+            def paginate(self, **kwargs):
+                for page in paginator.paginate(**kwargs):
+                    time.sleep(latency)
+                    yield page
+
+        return LatencyPaginator()
+
+
+def sequential_head(file_names, s3_client):
+    result = {}
+    for file_name in file_names:
+        try:
+            s3_client.head_object(Bucket=BUCKET_NAME, Key=TARGET_PREFIX + file_name)
+            result[file_name] = True
+        except Exception:
+            result[file_name] = False
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--objects", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with mock_s3():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+        for i in range(args.objects):
+            s3_client.put_object(
+                Bucket=BUCKET_NAME, Key=f"{TARGET_PREFIX}{i:08}.pdf", Body=b""
+            )
+        # 半分は存在しないファイル名
+        file_names = [f"{i * 2:08}.pdf" for i in range(args.files)]
+        client = LatencyClient(s3_client, args.latency)
+
+        start = time.perf_counter()
+        sequential_head(file_names, client)
+        print(f"sequential head: {time.perf_counter() - start:.2f} sec")
+        for mode in ["head", "list", "auto"]:
+            start = time.perf_counter()
+            s3_objects_existence(file_names, BUCKET_NAME, TARGET_PREFIX, client, mode)
+            print(f"{mode:>15}: {time.perf_counter() - start:.2f} sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+インベントリ索引のベンチマーク(moto上のS3で実行)
+
+S3インベントリ(CSV)から索引を作成し、索引を使った存在確認と
+HEADのみの存在確認(逐次 / 並列)の実行時間を比較する。
+motoはプロセス内で応答するため、--latencyで1リクエストあたりの遅延を加える
+
+実行方法:
+    cd 12_s3_object_transfer
+    PYTHONPATH=$(pwd) python benchmarks/bench_existence_index.py --files 2000
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import boto3
+from moto import mock_s3
+
+sys.path.append("../")
+
+from benchmarks.bench_existence import LatencyClient, sequential_head
+from lib.existence_index import build_existence_index
+from lib.s3_operations import s3_objects_existence
+
+BUCKET_NAME = "bench-bucket"
+INVENTORY_BUCKET_NAME = "bench-inventory"
+TARGET_PREFIX = "target/files/"
+
+
+def put_inventory(s3_client, keys):
+    file = io.StringIO()
+    writer = csv.writer(file)
+    for key in keys:
+        writer.writerow([BUCKET_NAME, key, "0"])
+    data_key = f"{BUCKET_NAME}/daily/data/inventory.csv.gz"
+    s3_client.put_object(
+        Bucket=INVENTORY_BUCKET_NAME,
+        Key=data_key,
+        Body=gzip.compress(file.getvalue().encode("utf-8")),
+    )
+    manifest = {
+        "sourceBucket": BUCKET_NAME,
+        "destinationBucket": f"arn:aws:s3:::{INVENTORY_BUCKET_NAME}",
+        "fileFormat": "CSV",
+        "fileSchema": "Bucket, Key, Size",
+        "creationTimestamp": str(int(time.time() * 1000)),
+        "files": [{"key": data_key}],
+    }
+    s3_client.put_object(
+        Bucket=INVENTORY_BUCKET_NAME,
+        Key=f"{BUCKET_NAME}/daily/2024-01-01T01-00Z/manifest.json",
+        Body=json.dumps(manifest),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--objects", type=int, default=2000)
+    parser.add_argument("--new-objects", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with mock_s3():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+        s3_client.create_bucket(Bucket=INVENTORY_BUCKET_NAME)
+        keys = [f"{TARGET_PREFIX}{i:08}.pdf" for i in range(args.objects)]
+        for key in keys:
+            s3_client.put_object(Bucket=BUCKET_NAME, Key=key, Body=b"")
+        # スナップショット以降に作成されたオブジェクトはインベントリに含まれない
+        put_inventory(s3_client, keys[: args.objects - args.new_objects])
+        file_names = [f"{i:08}.pdf" for i in range(args.files)]
+        client = LatencyClient(s3_client, args.latency)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            start = time.perf_counter()
+            index = build_existence_index(
+                f"s3://{INVENTORY_BUCKET_NAME}/{BUCKET_NAME}/daily/",
+                prefix=TARGET_PREFIX,
+                s3_client=s3_client,
+                index_path=os.path.join(tmp_dir, "index.bin"),
+                bucket=BUCKET_NAME,
+            )
+            print(f"build index: {time.perf_counter() - start:.2f} sec")
+
+        start = time.perf_counter()
+        sequential_head(file_names, client)
+        print(f"sequential head: {time.perf_counter() - start:.2f} sec")
+        start = time.perf_counter()
+        s3_objects_existence(file_names, BUCKET_NAME, TARGET_PREFIX, client, "head")
+        print(f"concurrent head: {time.perf_counter() - start:.2f} sec")
+        start = time.perf_counter()
+        s3_objects_existence(
+            file_names, BUCKET_NAME, TARGET_PREFIX, client, existence_index=index
+        )
+        print(f"index + head: {time.perf_counter() - start:.2f} sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+ファイル名抽出のバックエンド(csv / pyarrow / polars)のマイクロベンチマーク
+
+合成したマニフェストCSV(ファイル名以外のカラムも含む)を一時ファイルに書き出し、
+各バックエンドでファイル名カラムのみを読み込んで重複除外するまでの
+時間とピークメモリを比較する。ピークメモリはtracemallocで計測するため、
+pyarrow / polarsのネイティブメモリは含まれない
+
+実行方法:
+    cd 12_s3_object_transfer
+    export PYTHONPATH=$(pwd)
+    python benchmarks/bench_extract_file_names.py --rows 1000000 10000000
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append("../")
+
+from lib.file_operations import FILE_NAME_BACKENDS, extract_file_names
+
+
+def write_manifest(path, row_count):
+    with open(path, "w") as f:
+        f.write("id,csv_file_name,customer_id,created_at\n")
+        for i in range(row_count):
+            # 1割程度は重複したファイル名
+            f.write(f"{i},target_{i % (row_count * 9 // 10 or 1):010}.pdf,{i % 997},")
+            f.write("2024-01-01T00:00:00\n")
+
+
+def run(path, backend):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        file_names = extract_file_names(f, "csv_file_name", backend=backend)
+        count = len(file_names) if backend != "csv" else sum(1 for _ in file_names)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    args = parser.parse_args()
+
+    backends = [
+        backend
+        for backend in FILE_NAME_BACKENDS
+        if backend == "csv" or importlib.util.find_spec(backend)
+    ]
+    print(f"{'rows':>10} {'backend':>8} {'unique':>10} {'sec':>8} {'peak(MB)':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for row_count in args.rows:
+            path = os.path.join(tmp_dir, f"manifest_{row_count}.csv")
+            write_manifest(path, row_count)
+            for backend in backends:
+                count, elapsed, peak = run(path, backend)
+                print(
+                    f"{row_count:>10} {backend:>8} {count:>10} {elapsed:>8.2f} "
+                    f"{peak / 1024 / 1024:>9.1f}"
+                )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+マニフェスト読み込みのベンチマーク(moto上のS3で実行)
+
+get_csv_file + get_file_names_from_csv(全体を文字列で読み込む) と
+iter_manifest_rows + get_file_names_from_rows(ストリーミング) のピークメモリを比較する
+
+実行方法:
+    cd 12_s3_object_transfer
+    PYTHONPATH=$(pwd) python benchmarks/bench_manifest_reader.py
+"""
+
+import sys
+import time
+import tracemalloc
+
+import boto3
+from moto import mock_s3
+
+sys.path.append("../")
+
+from lib.file_operations import (
+    get_csv_file,
+    get_file_names_from_csv,
+    get_file_names_from_rows,
+    iter_manifest_rows,
+)
+
+BUCKET_NAME = "bench-bucket"
+PREFIX = "csv_list/"
+ROW_COUNTS = [10_000, 100_000, 1_000_000]
+
+
+def make_manifest(row_count):
+    lines = ["id,csv_file_name"]
+    lines.extend(f"{i},target_{i:010}.pdf" for i in range(row_count))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def read_full(s3_client):
+    content = get_csv_file(BUCKET_NAME, PREFIX, s3_client)
+    return len(get_file_names_from_csv(content, "csv_file_name"))
+
+
+def read_streaming(s3_client):
+    count = 0
+    for _, rows in iter_manifest_rows(BUCKET_NAME, PREFIX, s3_client):
+        for _ in get_file_names_from_rows(rows, "csv_file_name"):
+            count += 1
+    return count
+
+
+def measure(func, s3_client):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func(s3_client)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    with mock_s3():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+        print(f"{'rows':>10} {'size(MB)':>9} {'mode':>10} {'sec':>8} {'peak(MB)':>9}")
+        for row_count in ROW_COUNTS:
+            body = make_manifest(row_count)
+            size = len(body) / 1024 / 1024
+            s3_client.put_object(
+                Bucket=BUCKET_NAME, Key=PREFIX + "bench.csv", Body=body
+            )
+            del body
+            for mode, func in [("full", read_full), ("streaming", read_streaming)]:
+                count, elapsed, peak = measure(func, s3_client)
+                assert count == row_count
+                print(
+                    f"{row_count:>10} {size:>9.1f} {mode:>10} {elapsed:>8.2f} "
+                    f"{peak / 1024 / 1024:>9.1f}"
+                )
+        # motoはget_object時にオブジェクト全体をメモリ上に保持するため、
+        # どちらのモードのピークにもオブジェクトサイズ分が含まれる
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,26 @@
 import os
+from datetime import timedelta
 
 import boto3
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from lib.file_operations import get_csv_file, get_file_names_from_csv
-from lib.s3_operations import s3_objects_existence
+from botocore.config import Config
+from lib.existence_index import DEFAULT_INDEX_PATH, load_existence_index
+from lib.file_operations import (
+    concat_file_names,
+    extract_file_names,
+    iter_manifest_bodies,
+)
+from lib.s3_operations import (
+    DEFAULT_MAX_WORKERS,
+    count_statuses,
+    s3_objects_existence,
+)
 
 logger = Logger()
 
-s3_client = boto3.client("s3")
+# HEADの並列実行数に合わせてコネクションプールを広げる
+s3_client = boto3.client("s3", config=Config(max_pool_connections=DEFAULT_MAX_WORKERS))
 
 
 @logger.inject_lambda_context(log_event=True)
@@ -18,6 +30,7 @@ def handler(event, context: LambdaContext):
 
     :param event: dict : Lambdaのイベントオブジェクト
     :param context: dict : Lambdaのコンテキストオブジェクト
+    :return: dict : {"counts": statusごとの件数}
     """
     ENV = os.getenv("ENV")
 
@@ -26,9 +39,44 @@ def handler(event, context: LambdaContext):
     csv_prefix = "csv_list/"
     target_prefix = "target/files/"
     file_name_colum = "csv_file_name"
-    csv_content = get_csv_file(csv_bucket_name, csv_prefix, s3_client)
-    csv_to_file_names = get_file_names_from_csv(csv_content, file_name_colum)
-    logger.info(csv_to_file_names)
-    s3_objects_existence(
-        csv_to_file_names, target_bucket_name, target_prefix, s3_client
+    # newest / all / globパターン(例: "csv_list/2024-*.csv")
+    manifest_select = os.getenv("MANIFEST_SELECT", "newest")
+    # csv / pyarrow / polars
+    file_name_backend = os.getenv("FILE_NAME_BACKEND", "csv")
+    file_name_lists = []
+    for csv_key, body in iter_manifest_bodies(
+        csv_bucket_name, csv_prefix, s3_client, select=manifest_select
+    ):
+        logger.info(f"read manifest: {csv_key}")
+        file_names = extract_file_names(body, file_name_colum, file_name_backend)
+        # csvのgeneratorはBodyを閉じる前に読み切る(Arrowの配列はそのまま保持する)
+        if not hasattr(file_names, "to_pylist"):
+            file_names = list(file_names)
+        file_name_lists.append(file_names)
+    csv_to_file_names = concat_file_names(file_name_lists)
+    logger.info(f"{len(csv_to_file_names)} file names found.")
+    # auto / head / list
+    existence_mode = os.getenv("EXISTENCE_MODE", "auto")
+    # S3インベントリの出力先(manifest.jsonのパス or s3://bucket/prefix/)
+    inventory_location = os.getenv("INVENTORY_LOCATION")
+    existence_index = None
+    if inventory_location:
+        existence_index = load_existence_index(
+            inventory_location,
+            prefix=target_prefix,
+            s3_client=s3_client,
+            index_path=os.getenv("EXISTENCE_INDEX_PATH", DEFAULT_INDEX_PATH),
+            max_age=timedelta(hours=int(os.getenv("INVENTORY_MAX_AGE_HOURS", "48"))),
+            bucket=target_bucket_name,
+        )
+    result = s3_objects_existence(
+        csv_to_file_names,
+        target_bucket_name,
+        target_prefix,
+        s3_client,
+        mode=existence_mode,
+        existence_index=existence_index,
     )
+    # ファイル名ごとの結果はレスポンスの上限(6MB)を超えうるため件数のみ返す
+    # (存在しない・確認に失敗したファイルはs3_objects_existenceでログに出力している)
+    return {"counts": count_statuses(result)}
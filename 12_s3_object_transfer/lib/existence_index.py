@@ -0,0 +1,336 @@
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from urllib.parse import unquote_plus, urlparse
+
+from aws_lambda_powertools import Logger
+
+logger = Logger()
+
+DEFAULT_INDEX_PATH = "/tmp/existence_index.bin"
+# インベントリのスナップショットを有効とみなす期間
+DEFAULT_MAX_AGE = timedelta(hours=48)
+
+
+def key_hash(key):
+    """
+    オブジェクトキーを64bitのハッシュ値に変換する
+
+    :param key: str : オブジェクトキー
+    :return: int : ハッシュ値
+    """
+    return int.from_bytes(
+        hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class ExistenceIndex:
+    """
+    S3インベントリから作成したオブジェクトキーの索引
+
+    キーを64bitハッシュのソート済み配列で保持する(1キーあたり8バイト)。
+    索引に含まれないキーはスナップショット以降に作成された可能性があるため、
+    呼び出し側でHEAD等により確認する
+    """
+
+    def __init__(self, hashes, snapshot_at, prefix="", source=None, bucket=None):
+        self.hashes = hashes
+        self.snapshot_at = snapshot_at
+        self.prefix = prefix
+        self.source = source
+        self.bucket = bucket
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, key):
+        value = key_hash(key)
+        i = bisect_left(self.hashes, value)
+        return i < len(self.hashes) and self.hashes[i] == value
+
+    def is_fresh(self, max_age=DEFAULT_MAX_AGE, now=None):
+        """
+        スナップショットが有効期間内か確認する
+
+        :param max_age: timedelta : 有効期間
+        :param now: datetime : 現在時刻(テスト用)
+        :return: bool : 有効期間内の場合True
+        """
+        now = now or datetime.now(timezone.utc)
+        return now - self.snapshot_at <= max_age
+
+    def save(self, index_path=DEFAULT_INDEX_PATH):
+        """
+        索引をファイルに保存する(メタデータは{index_path}.jsonに保存)
+
+        :param index_path: str : 保存先のパス(/tmpやEFS)
+        """
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            self.hashes.tofile(f)
+        os.replace(tmp_path, index_path)
+        with open(f"{index_path}.json", "w") as f:
+            json.dump(
+                {
+                    "snapshot_at": self.snapshot_at.isoformat(),
+                    "prefix": self.prefix,
+                    "source": self.source,
+                    "bucket": self.bucket,
+                    "count": len(self.hashes),
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, index_path=DEFAULT_INDEX_PATH):
+        """
+        保存済みの索引を読み込む
+
+        :param index_path: str : 保存先のパス
+        :return: ExistenceIndex : 索引
+        """
+        with open(f"{index_path}.json") as f:
+            meta = json.load(f)
+        hashes = array("Q")
+        with open(index_path, "rb") as f:
+            hashes.fromfile(f, meta["count"])
+        return cls(
+            hashes,
+            datetime.fromisoformat(meta["snapshot_at"]),
+            meta["prefix"],
+            meta["source"],
+            meta.get("bucket"),
+        )
+
+    @classmethod
+    def from_keys(cls, keys, snapshot_at, prefix="", source=None, bucket=None):
+        """
+        オブジェクトキーから索引を作成する
+
+        :param keys: iterable : オブジェクトキー
+        :param snapshot_at: datetime : インベントリの作成日時
+        :param prefix: str : 索引に含めるキーのプレフィックス
+        :param source: str : インベントリのmanifest.jsonの場所
+        :param bucket: str : インベントリの対象バケット名
+        :return: ExistenceIndex : 索引
+        """
+        hashes = array("Q")
+        for value in sorted(key_hash(k) for k in keys if k.startswith(prefix)):
+            if not hashes or hashes[-1] != value:
+                hashes.append(value)
+        return cls(hashes, snapshot_at, prefix, source, bucket)
+
+
+def _open_binary(location, s3_client):
+    """
+    ローカルパスまたはs3://のURIをバイナリで開く
+    """
+    if location.startswith("s3://"):
+        parsed = urlparse(location)
+        response = s3_client.get_object(Bucket=parsed.netloc, Key=parsed.path[1:])
+        return response["Body"]
+    return open(location, "rb")
+
+
+def find_latest_manifest(location, s3_client=None):
+    """
+    インベントリの出力先から最新のmanifest.jsonを探す
+
+    :param location: str : manifest.jsonのパス、またはインベントリ設定の出力先
+                           (ローカルパス or s3://bucket/prefix/)
+    :return: str : manifest.jsonのパス
+    """
+    if location.endswith("manifest.json"):
+        return location
+    if not location.startswith("s3://"):
+        manifests = [
+            os.path.join(root, "manifest.json")
+            for root, _, files in os.walk(location)
+            if "manifest.json" in files
+        ]
+        return max(manifests)
+    parsed = urlparse(location)
+    paginator = s3_client.get_paginator("list_objects_v2")
+    manifests = [
+        obj["Key"]
+        for page in paginator.paginate(Bucket=parsed.netloc, Prefix=parsed.path[1:])
+        for obj in page.get("Contents", [])
+        if obj["Key"].endswith("/manifest.json")
+    ]
+    # 出力先は日付(YYYY-MM-DDTHH-MMZ)のフォルダのため、キー順の最大が最新
+    return f"s3://{parsed.netloc}/{max(manifests)}"
+
+
+def _iter_csv_inventory_keys(stream, schema):
+    key_column = schema.index("Key")
+    # バージョニングが有効な場合、最新バージョンかつ削除マーカーでないキーのみ対象とする
+    latest_column = schema.index("IsLatest") if "IsLatest" in schema else None
+    delete_marker_column = (
+        schema.index("IsDeleteMarker") if "IsDeleteMarker" in schema else None
+    )
+    with gzip.GzipFile(fileobj=stream) as f:
+        for row in csv.reader(io.TextIOWrapper(f, encoding="utf-8")):
+            if latest_column is not None and row[latest_column] != "true":
+                continue
+            if delete_marker_column is not None and row[delete_marker_column] == "true":
+                continue
+            # CSV形式のインベントリではキーがURLエンコードされている
+            yield unquote_plus(row[key_column])
+
+
+def _iter_parquet_inventory_keys(stream):
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    # ParquetFileはシーク可能なファイルが必要なため一時ファイルに書き出す
+    with tempfile.TemporaryFile() as f:
+        for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+            f.write(chunk)
+        f.seek(0)
+        parquet_file = pq.ParquetFile(f)
+        columns = [
+            c
+            for c in ("key", "is_latest", "is_delete_marker")
+            if c in parquet_file.schema_arrow.names
+        ]
+        for i in range(parquet_file.num_row_groups):
+            table = parquet_file.read_row_group(i, columns=columns)
+            # バージョニングが有効な場合、最新かつ削除マーカーでないキーのみ対象とする
+            if "is_latest" in columns:
+                table = table.filter(pc.fill_null(table.column("is_latest"), False))
+            if "is_delete_marker" in columns:
+                table = table.filter(
+                    pc.invert(pc.fill_null(table.column("is_delete_marker"), False))
+                )
+            yield from table.column("key").to_pylist()
+
+
+def _data_file_location(manifest_location, manifest, data_key):
+    """
+    manifest.jsonに記載されたデータファイルの場所を返す
+    """
+    if manifest_location.startswith("s3://"):
+        bucket = manifest["destinationBucket"].split(":::")[-1]
+        return f"s3://{bucket}/{data_key}"
+    # ローカルの場合はmanifest.jsonを基準に解決する。データファイルは
+    # {設定の出力先}/data/、manifest.jsonは{設定の出力先}/{日時}/に出力される
+    config_dir = os.path.dirname(os.path.dirname(manifest_location))
+    _, sep, name = data_key.rpartition("/data/")
+    if not sep:
+        raise ValueError(f"unexpected inventory data file: {data_key}")
+    return os.path.join(config_dir, "data", name)
+
+
+def iter_inventory_keys(manifest_location, s3_client=None, bucket=None):
+    """
+    S3インベントリ(CSV / Parquet)からオブジェクトキーを読み込む
+
+    :param manifest_location: str : manifest.jsonのパス(ローカルパス or s3://)
+    :param bucket: str : 確認対象のバケット名
+                         (インベントリの対象バケットと異なる場合はエラー)
+    :return: tuple : (スナップショット日時, キーのgenerator)
+    """
+    with _open_binary(manifest_location, s3_client) as f:
+        manifest = json.load(f)
+    if bucket is not None and manifest["sourceBucket"] != bucket:
+        raise ValueError(
+            f"inventory of {manifest['sourceBucket']} cannot be used for {bucket}: "
+            f"{manifest_location}"
+        )
+    snapshot_at = datetime.fromtimestamp(
+        int(manifest["creationTimestamp"]) / 1000, tz=timezone.utc
+    )
+    file_format = manifest["fileFormat"]
+    if file_format not in ("CSV", "Parquet"):
+        raise ValueError(f"unsupported inventory format: {file_format}")
+
+    def keys():
+        for data_file in manifest["files"]:
+            location = _data_file_location(
+                manifest_location, manifest, data_file["key"]
+            )
+            with _open_binary(location, s3_client) as stream:
+                if file_format == "CSV":
+                    schema = [c.strip() for c in manifest["fileSchema"].split(",")]
+                    yield from _iter_csv_inventory_keys(stream, schema)
+                else:
+                    yield from _iter_parquet_inventory_keys(stream)
+
+    return snapshot_at, keys()
+
+
+def build_existence_index(
+    manifest_location,
+    prefix="",
+    s3_client=None,
+    index_path=DEFAULT_INDEX_PATH,
+    bucket=None,
+):
+    """
+    S3インベントリから索引を作成し、ファイルに保存する
+
+    :param manifest_location: str : manifest.jsonのパス、またはインベントリの出力先
+    :param prefix: str : 索引に含めるキーのプレフィックス
+    :param index_path: str : 索引の保存先(/tmpやEFS)
+    :param bucket: str : 確認対象のバケット名
+    :return: ExistenceIndex : 索引
+    """
+    manifest_location = find_latest_manifest(manifest_location, s3_client)
+    snapshot_at, keys = iter_inventory_keys(manifest_location, s3_client, bucket)
+    index = ExistenceIndex.from_keys(
+        keys, snapshot_at, prefix, manifest_location, bucket
+    )
+    index.save(index_path)
+    logger.info(
+        f"built existence index: {len(index)} keys, snapshot {snapshot_at.isoformat()}"
+    )
+    return index
+
+
+def load_existence_index(
+    manifest_location,
+    prefix="",
+    s3_client=None,
+    index_path=DEFAULT_INDEX_PATH,
+    max_age=DEFAULT_MAX_AGE,
+    bucket=None,
+):
+    """
+    保存済みの索引を読み込む。最新のインベントリと異なる場合は作成し直す
+
+    スナップショットが有効期間を過ぎている場合はNoneを返す
+
+    :param manifest_location: str : manifest.jsonのパス、またはインベントリの出力先
+    :param prefix: str : 索引に含めるキーのプレフィックス
+    :param index_path: str : 索引の保存先(/tmpやEFS)
+    :param max_age: timedelta : スナップショットの有効期間
+    :param bucket: str : 確認対象のバケット名
+    :return: ExistenceIndex : 索引(使用できない場合はNone)
+    """
+    latest_manifest = find_latest_manifest(manifest_location, s3_client)
+    index = None
+    if os.path.exists(f"{index_path}.json"):
+        index = ExistenceIndex.load(index_path)
+        if (
+            index.source != latest_manifest
+            or index.prefix != prefix
+            or index.bucket != bucket
+        ):
+            index = None
+    if index is None:
+        index = build_existence_index(
+            latest_manifest, prefix, s3_client, index_path, bucket
+        )
+    if not index.is_fresh(max_age):
+        logger.warning(
+            f"existence index is stale: snapshot {index.snapshot_at.isoformat()}"
+        )
+        return None
+    return index
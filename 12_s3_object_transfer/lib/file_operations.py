@@ -1,4 +1,117 @@
+import codecs
 import csv
+import io
+from fnmatch import fnmatch
+
+# マニフェスト読み込み時に1回のreadで取得するバイト数
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def list_csv_objects(bucket_name, prefix, s3_client):
+    """
+    S3バケットから指定したプレフィックス配下のCSVオブジェクトを全ページ分取得する
+
+    :param bucket_name: str : バケット名
+    :param prefix: str : 検索するプレフィックス
+    :return: generator : list_objects_v2のContents要素(dict)
+    """
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj.get("Key")
+            # CSVファイルかどうかチェック
+            if key.startswith(prefix) and key.endswith(".csv"):
+                yield obj
+
+
+def select_manifest_keys(csv_objects, select="newest"):
+    """
+    CSVオブジェクトの中から読み込むマニフェストを選択する
+
+    :param csv_objects: iterable : list_objects_v2のContents要素(dict)
+    :param select: str : "newest"(最新の1件), "all"(全件), それ以外はglobパターン
+    :return: list : マニフェストのキーのリスト(キー順)
+    """
+    if select == "newest":
+        newest = max(csv_objects, key=lambda obj: obj["LastModified"], default=None)
+        return [newest["Key"]] if newest else []
+    if select == "all":
+        return sorted(obj["Key"] for obj in csv_objects)
+    return sorted(obj["Key"] for obj in csv_objects if fnmatch(obj["Key"], select))
+
+
+def iter_text_lines(body, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    S3のレスポンスBodyをチャンク単位でUTF-8デコードし、行単位で返す
+
+    改行コードは残したまま返すため、csv.readerでクォート内の改行も扱える
+
+    :param body: StreamingBody : get_objectのレスポンスBody
+    :param chunk_size: int : 1回のreadで取得するバイト数
+    :return: generator : 行文字列
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    for chunk in body.iter_chunks(chunk_size):
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_csv_rows(bucket_name, key, s3_client, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    S3上のCSVファイルを全体をメモリに載せずに1行ずつ読み込む
+
+    :param bucket_name: str : バケット名
+    :param key: str : CSVファイルのキー
+    :param chunk_size: int : 1回のreadで取得するバイト数
+    :return: generator : CSVの行(list)
+    """
+    response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    body = response["Body"]
+    try:
+        yield from csv.reader(iter_text_lines(body, chunk_size))
+    finally:
+        body.close()
+
+
+def iter_manifest_bodies(bucket_name, prefix, s3_client, select="newest"):
+    """
+    プレフィックス配下から選択したマニフェストCSVのレスポンスBodyを順に返す
+
+    :param bucket_name: str : バケット名
+    :param prefix: str : 検索するプレフィックス
+    :param select: str : マニフェストの選択ルール(select_manifest_keys参照)
+    :return: generator : (マニフェストのキー, StreamingBody)
+    """
+    csv_objects = list_csv_objects(bucket_name, prefix, s3_client)
+    for key in select_manifest_keys(csv_objects, select):
+        body = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"]
+        try:
+            yield key, body
+        finally:
+            body.close()
+
+
+def iter_manifest_rows(
+    bucket_name, prefix, s3_client, select="newest", chunk_size=DEFAULT_CHUNK_SIZE
+):
+    """
+    プレフィックス配下から選択したマニフェストCSVを順に読み込み、行単位で返す
+
+    :param bucket_name: str : バケット名
+    :param prefix: str : 検索するプレフィックス
+    :param select: str : マニフェストの選択ルール(select_manifest_keys参照)
+    :param chunk_size: int : 1回のreadで取得するバイト数
+    :return: generator : (マニフェストのキー, CSVの行(list)のgenerator)
+    """
+    csv_objects = list_csv_objects(bucket_name, prefix, s3_client)
+    for key in select_manifest_keys(csv_objects, select):
+        yield key, iter_csv_rows(bucket_name, key, s3_client, chunk_size)
 
 
 def get_csv_file(bucket_name, prefix, s3_client):
@@ -9,18 +122,146 @@ def get_csv_file(bucket_name, prefix, s3_client):
     :param prefix: str : 検索するプレフィックス
     :return: str : CSVファイルの中身
     """
-    response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-    for obj in response.get("Contents"):
-        key = obj.get("Key")
-        # CSVファイルかどうかチェック
-        if key.startswith(prefix) and key.endswith(".csv"):
-            csv_file = key
-            break
+    csv_file = next(list_csv_objects(bucket_name, prefix, s3_client))["Key"]
     response = s3_client.get_object(Bucket=bucket_name, Key=csv_file)
     content = response["Body"].read().decode("utf-8")
     return content
 
 
+def get_file_names_from_rows(rows, file_name_colum):
+    """
+    CSVの行からファイル名を取得する
+
+    :param rows: iterable : ヘッダー行を先頭に含むCSVの行(list)
+    :param file_name_colum: str : ファイル名が格納されたカラム名
+    :return: generator : ファイル名
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    file_name_colum_num = header.index(file_name_colum)
+    for row in rows:
+        if row:
+            yield row[file_name_colum_num]
+
+
+def _iter_csv_lines(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    CSVの中身(str / bytes / バイナリのファイルオブジェクト)を行単位で返す
+    """
+    if isinstance(source, str):
+        return io.StringIO(source, newline="")
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    if hasattr(source, "iter_chunks"):
+        return iter_text_lines(source, chunk_size)
+    return io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+
+
+def _unique(values):
+    seen = set()
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+            yield value
+
+
+def _extract_file_names_csv(source, file_name_colum, unique):
+    file_names = get_file_names_from_rows(
+        csv.reader(_iter_csv_lines(source)), file_name_colum
+    )
+    return _unique(file_names) if unique else file_names
+
+
+def _extract_file_names_pyarrow(source, file_name_colum, unique):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, bytes):
+        source = pa.BufferReader(source)
+    reader = pa_csv.open_csv(
+        source,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=[file_name_colum],
+            column_types={file_name_colum: pa.string()},
+        ),
+    )
+    chunks = []
+    for batch in reader:
+        column = batch.column(0)
+        # 複数バッチにまたがる重複はconcat後に除外する
+        chunks.append(pc.unique(column) if unique else column)
+    file_names = pa.chunked_array(chunks, type=pa.string()).combine_chunks()
+    file_names = file_names.drop_null()
+    return pc.unique(file_names) if unique else file_names
+
+
+def _extract_file_names_polars(source, file_name_colum, unique):
+    import polars as pl
+
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    # polarsは空の値・空行をどちらも欠損値として読み込むため、全ての列を文字列として
+    # 読み込み、全ての列が欠損値の行を空行として除外してから空の値を空文字列に戻す
+    # (csv・pyarrowと同じく、空行は除外し、空のファイル名は残す)
+    df = pl.read_csv(source, infer_schema_length=0)
+    df = df.filter(~pl.all_horizontal(pl.all().is_null()))
+    file_names = df.get_column(file_name_colum).fill_null("")
+    if unique:
+        file_names = file_names.unique(maintain_order=True)
+    return file_names.to_arrow()
+
+
+FILE_NAME_BACKENDS = {
+    "csv": _extract_file_names_csv,
+    "pyarrow": _extract_file_names_pyarrow,
+    "polars": _extract_file_names_polars,
+}
+
+
+def extract_file_names(source, file_name_colum, backend="csv", unique=True):
+    """
+    CSVからファイル名のカラムのみを読み込む
+
+    backend:
+      - "csv": 標準ライブラリのcsvで1行ずつ読み込む(generatorを返す)
+      - "pyarrow": pyarrow.csvで対象カラムのみ読み込む(pyarrow.Arrayを返す)
+      - "polars": polarsで対象カラムのみ読み込む(pyarrow.Arrayを返す)
+
+    :param source: str / bytes / file : CSVの中身、またはバイナリのファイルオブジェクト
+    :param file_name_colum: str : ファイル名が格納されたカラム名
+    :param backend: str : csv / pyarrow / polars
+    :param unique: bool : 重複を除外する場合True(出現順を維持する)
+    :return: generator / pyarrow.Array : ファイル名
+    """
+    if backend not in FILE_NAME_BACKENDS:
+        raise ValueError(f"unknown backend: {backend}")
+    return FILE_NAME_BACKENDS[backend](source, file_name_colum, unique)
+
+
+def concat_file_names(file_name_lists):
+    """
+    マニフェストごとのファイル名を1つにまとめる
+
+    全てpyarrow.Array(pyarrow / polarsで読み込んだ場合)の場合は、Pythonの
+    リストに変換せずにpyarrow.ChunkedArrayとして連結する
+
+    :param file_name_lists: list : マニフェストごとのファイル名(list / pyarrow.Array)
+    :return: list / pyarrow.ChunkedArray : ファイル名
+    """
+    if file_name_lists and all(hasattr(f, "to_pylist") for f in file_name_lists):
+        import pyarrow as pa
+
+        return pa.chunked_array(
+            [f.cast(pa.string()) for f in file_name_lists], type=pa.string()
+        )
+    return [file_name for file_names in file_name_lists for file_name in file_names]
+
+
 def get_file_names_from_csv(csv_content, file_name_colum):
     """
     CSVファイルの中身からファイル名を取得する
@@ -28,10 +269,4 @@ def get_file_names_from_csv(csv_content, file_name_colum):
     :param csv_content: str : CSVファイルの中身
     :return: list : ファイル名のリスト
     """
-    csv_to_file_names = []
-    rows = csv.reader(csv_content.splitlines())
-    header = next(rows)  # ヘッダーをスキップ
-    file_name_colum_num = header.index(file_name_colum)
-    for row in rows:
-        csv_to_file_names.append(row[file_name_colum_num])
-    return csv_to_file_names
+    return list(extract_file_names(csv_content, file_name_colum, unique=False))
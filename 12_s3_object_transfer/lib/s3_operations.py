@@ -1,25 +1,278 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError
 
 logger = Logger()
 
+EXISTS = "exists"
+MISSING = "missing"
+ERROR = "error"
+
+# HEADを並列実行するスレッド数の上限
+DEFAULT_MAX_WORKERS = 32
+# スロットリング時のリトライ回数
+DEFAULT_MAX_RETRIES = 5
+NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound"}
+THROTTLING_CODES = {
+    "503",
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+LIST_PAGE_SIZE = 1000
+
+
+class AdaptiveLimiter:
+    """
+    同時実行数をAIMD(加算増加・乗算減少)で調整するリミッター
+
+    スロットリングされたら上限を半分にし、成功が続いたら1ずつ戻す
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self.successes = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self.successes = 0
+            else:
+                self.successes += 1
+                if self.limit < self.max_limit and self.successes >= self.limit:
+                    self.limit += 1
+                    self.successes = 0
+            self.condition.notify_all()
+
+
+def _error_code(e):
+    return e.response.get("Error", {}).get("Code", "")
+
+
+def head_object_existence(
+    bucket_name, key, s3_client, limiter, max_retries=DEFAULT_MAX_RETRIES
+):
+    """
+    HEADリクエストで1オブジェクトの存在を確認する
+
+    スロットリングされた場合は指数バックオフ(ジッター付き)でリトライする
+
+    :param bucket_name: str : バケット名
+    :param key: str : オブジェクトキー
+    :param limiter: AdaptiveLimiter : 同時実行数のリミッター
+    :param max_retries: int : スロットリング時のリトライ回数
+    :return: dict : {"status": exists/missing/error, "message": エラー内容}
+    """
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        throttled = False
+        try:
+            s3_client.head_object(Bucket=bucket_name, Key=key)
+            return {"status": EXISTS}
+        except ClientError as e:
+            code = _error_code(e)
+            if code in NOT_FOUND_CODES:
+                return {"status": MISSING}
+            if code not in THROTTLING_CODES or attempt == max_retries:
+                return {"status": ERROR, "message": str(e)}
+            throttled = True
+        except Exception as e:
+            return {"status": ERROR, "message": str(e)}
+        finally:
+            limiter.release(throttled)
+        time.sleep(random.uniform(0, min(20, 0.1 * 2**attempt)))
+
+
+def head_objects_existence(
+    keys,
+    bucket_name,
+    s3_client,
+    max_workers=DEFAULT_MAX_WORKERS,
+    max_retries=DEFAULT_MAX_RETRIES,
+):
+    """
+    HEADリクエストをスレッドプールで並列実行し、オブジェクトの存在を確認する
+
+    :param keys: list : オブジェクトキーのリスト
+    :param bucket_name: str : バケット名
+    :param max_workers: int : 同時実行数の上限
+    :param max_retries: int : スロットリング時のリトライ回数
+    :return: dict : {オブジェクトキー: {"status": ..., "message": ...}}
+    """
+    limiter = AdaptiveLimiter(max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda key: head_object_existence(
+                bucket_name, key, s3_client, limiter, max_retries
+            ),
+            keys,
+        )
+        return dict(zip(keys, results))
+
+
+def list_object_keys(bucket_name, prefix, s3_client, max_pages=None):
+    """
+    プレフィックス配下のオブジェクトキーを取得する
+
+    :param bucket_name: str : バケット名
+    :param prefix: str : 検索するプレフィックス
+    :param max_pages: int : 取得するページ数の上限(Noneの場合は全ページ)
+    :return: tuple : (キーのset, 全ページ取得したか, 取得した最後のキー)
+    """
+    keys = set()
+    last_key = None
+    paginator = s3_client.get_paginator("list_objects_v2")
+    pages = paginator.paginate(
+        Bucket=bucket_name,
+        Prefix=prefix,
+        PaginationConfig={"PageSize": LIST_PAGE_SIZE},
+    )
+    for page_num, page in enumerate(pages, start=1):
+        for obj in page.get("Contents", []):
+            keys.add(obj["Key"])
+            last_key = obj["Key"]
+        if not page.get("IsTruncated"):
+            return keys, True, last_key
+        if max_pages is not None and page_num >= max_pages:
+            return keys, False, last_key
+    return keys, True, last_key
+
 
 def s3_objects_existence(
-    csv_to_file_names, target_bucket_name, target_prefix, s3_client
+    csv_to_file_names,
+    target_bucket_name,
+    target_prefix,
+    s3_client,
+    mode="auto",
+    max_workers=DEFAULT_MAX_WORKERS,
+    existence_index=None,
 ):
     """
     S3バケット上にファイルが存在するか確認する
 
-    :param csv_to_file_names: list : ファイル名のリスト
+    mode:
+      - "head": ファイル名ごとにHEADリクエストを並列実行する
+      - "list": target_prefixを一覧取得し、取得したキーのsetで判定する
+      - "auto": ファイル数に見合うページ数までtarget_prefixを一覧取得し、
+                取得範囲(キー順で最後のキー以前)のファイルはsetで判定、
+                残りのファイルのみHEADで確認する
+
+    existence_indexを指定した場合、索引に含まれるファイルは存在するものとし、
+    索引に含まれないファイル(スナップショット以降に作成された可能性がある)のみ
+    modeに従って確認する
+
+    :param csv_to_file_names: list / pyarrow.ChunkedArray : ファイル名のリスト
     :param target_bucket_name: str : バケット名
     :param target_prefix: str : target格納先のprefix
-    :return: dict : ファイルの存在状態
+    :param mode: str : auto / head / list
+    :param max_workers: int : HEADの同時実行数の上限
+    :param existence_index: ExistenceIndex : S3インベントリから作成した索引
+    :return: dict : {ファイル名: {"status": ..., "message": ...}}
     """
-    for file_name in csv_to_file_names:
-        try:
-            s3_client.head_object(
-                Bucket=target_bucket_name, Key=target_prefix + file_name
-            )
-            logger.info(f"{target_prefix}{file_name} exists.")
-        except Exception as e:
+    if mode not in ("auto", "head", "list"):
+        raise ValueError(f"unknown mode: {mode}")
+    if existence_index is not None and existence_index.bucket not in (
+        None,
+        target_bucket_name,
+    ):
+        raise ValueError(
+            f"existence index of {existence_index.bucket} "
+            f"cannot be used for {target_bucket_name}"
+        )
+    if hasattr(csv_to_file_names, "to_pylist"):
+        import pyarrow.compute as pc
+
+        # Arrowの配列は重複の除外までArrowで行う(出現順を維持する)
+        file_names = pc.unique(csv_to_file_names).to_pylist()
+    else:
+        file_names = list(dict.fromkeys(csv_to_file_names))
+    keys = {file_name: target_prefix + file_name for file_name in file_names}
+
+    result = {}
+    if existence_index is not None:
+        unindexed_file_names = []
+        for file_name in file_names:
+            if keys[file_name] in existence_index:
+                result[file_name] = {"status": EXISTS}
+            else:
+                unindexed_file_names.append(file_name)
+        logger.info(
+            f"{len(result)} file names found in existence index, "
+            f"{len(unindexed_file_names)} file names left."
+        )
+        # 索引に含まれないファイルは少数の想定のため、一覧取得せずHEADで確認する
+        if mode == "auto":
+            mode = "head"
+    else:
+        unindexed_file_names = file_names
+
+    head_file_names = unindexed_file_names
+    if mode in ("auto", "list") and unindexed_file_names:
+        # 一覧取得は逐次なので、HEADを並列実行した場合と同程度のリクエスト回数に抑える
+        max_pages = (
+            None if mode == "list" else max(1, len(unindexed_file_names) // max_workers)
+        )
+        listed_keys, completed, last_key = list_object_keys(
+            target_bucket_name, target_prefix, s3_client, max_pages
+        )
+        head_file_names = []
+        for file_name in unindexed_file_names:
+            key = keys[file_name]
+            if key in listed_keys:
+                result[file_name] = {"status": EXISTS}
+            elif completed or (last_key is not None and key <= last_key):
+                result[file_name] = {"status": MISSING}
+            else:
+                head_file_names.append(file_name)
+        logger.info(
+            f"listed {len(listed_keys)} keys under {target_prefix}, "
+            f"{len(head_file_names)} file names left for HEAD."
+        )
+
+    if head_file_names:
+        head_results = head_objects_existence(
+            [keys[file_name] for file_name in head_file_names],
+            target_bucket_name,
+            s3_client,
+            max_workers=max_workers,
+        )
+        for file_name in head_file_names:
+            result[file_name] = head_results[keys[file_name]]
+
+    for file_name in file_names:
+        status = result[file_name]["status"]
+        if status == MISSING:
             logger.info(f"{target_prefix}{file_name} does not exists.")
-            logger.info(e)
+        elif status == ERROR:
+            logger.info(f"{target_prefix}{file_name}: {result[file_name]['message']}")
+    logger.info(f"existence check result: {count_statuses(result)}")
+    return {file_name: result[file_name] for file_name in file_names}
+
+
+def count_statuses(result):
+    """
+    存在確認の結果をstatusごとに集計する
+
+    :param result: dict : s3_objects_existenceの結果
+    :return: dict : {"exists": 件数, "missing": 件数, "error": 件数}
+    """
+    counts = {status: 0 for status in (EXISTS, MISSING, ERROR)}
+    for file_result in result.values():
+        counts[file_result["status"]] += 1
+    return counts
@@ -0,0 +1,264 @@
+import csv
+import gzip
+import io
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+from moto import mock_s3
+
+sys.path.append("../")
+
+from lib.existence_index import (
+    ExistenceIndex,
+    build_existence_index,
+    find_latest_manifest,
+    load_existence_index,
+)
+from lib.s3_operations import s3_objects_existence
+
+SNAPSHOT_AT = datetime(2024, 1, 1, 1, 0, tzinfo=timezone.utc)
+INVENTORY_PREFIX = "cm-kasama-infa/daily"
+
+
+VERSIONED_SCHEMA = "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, Size"
+
+
+def make_csv_inventory(keys):
+    file = io.StringIO()
+    writer = csv.writer(file)
+    for key in keys:
+        writer.writerow(["cm-kasama-infa", key.replace(" ", "+"), "1"])
+    return gzip.compress(file.getvalue().encode("utf-8"))
+
+
+def make_manifest(data_keys, file_format="CSV", file_schema="Bucket, Key, Size"):
+    return json.dumps(
+        {
+            "sourceBucket": "cm-kasama-infa",
+            "destinationBucket": "arn:aws:s3:::inventory-bucket",
+            "fileFormat": file_format,
+            "fileSchema": file_schema,
+            "creationTimestamp": str(int(SNAPSHOT_AT.timestamp() * 1000)),
+            "files": [{"key": key} for key in data_keys],
+        }
+    )
+
+
+@pytest.fixture
+def s3_client():
+    with mock_s3():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="inventory-bucket")
+        conn.create_bucket(Bucket="cm-kasama-infa")
+        yield conn
+
+
+@pytest.fixture
+def local_inventory(tmp_path):
+    data_dir = tmp_path / INVENTORY_PREFIX / "data"
+    data_dir.mkdir(parents=True)
+    (data_dir / "a.csv.gz").write_bytes(
+        make_csv_inventory(["target/files/a.pdf", "target/files/b c.pdf"])
+    )
+    (data_dir / "b.csv.gz").write_bytes(make_csv_inventory(["other/x.pdf"]))
+    for date in ["2023-12-31T01-00Z", "2024-01-01T01-00Z"]:
+        manifest_dir = tmp_path / INVENTORY_PREFIX / date
+        manifest_dir.mkdir()
+        (manifest_dir / "manifest.json").write_text(
+            make_manifest(
+                [
+                    f"{INVENTORY_PREFIX}/data/a.csv.gz",
+                    f"{INVENTORY_PREFIX}/data/b.csv.gz",
+                ]
+            )
+        )
+    return tmp_path
+
+
+def test_build_existence_index_from_local_csv(local_inventory, tmp_path):
+    index_path = str(tmp_path / "index.bin")
+    index = build_existence_index(
+        str(local_inventory), prefix="target/files/", index_path=index_path
+    )
+
+    assert index.source.endswith("2024-01-01T01-00Z/manifest.json")
+    assert index.snapshot_at == SNAPSHOT_AT
+    assert len(index) == 2
+    assert "target/files/a.pdf" in index
+    assert "target/files/b c.pdf" in index
+    assert "target/files/c.pdf" not in index
+    assert "other/x.pdf" not in index
+
+    loaded = ExistenceIndex.load(index_path)
+    assert list(loaded.hashes) == list(index.hashes)
+    assert loaded.snapshot_at == index.snapshot_at
+    assert loaded.source == index.source
+
+
+def test_build_existence_index_from_s3_parquet(s3_client, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    buffer = io.BytesIO()
+    pq.write_table(
+        pa.table({"bucket": ["cm-kasama-infa"] * 2, "key": ["t/a.pdf", "t/b.pdf"]}),
+        buffer,
+    )
+    s3_client.put_object(
+        Bucket="inventory-bucket",
+        Key=f"{INVENTORY_PREFIX}/data/a.parquet",
+        Body=buffer.getvalue(),
+    )
+    s3_client.put_object(
+        Bucket="inventory-bucket",
+        Key=f"{INVENTORY_PREFIX}/2024-01-01T01-00Z/manifest.json",
+        Body=make_manifest([f"{INVENTORY_PREFIX}/data/a.parquet"], "Parquet"),
+    )
+
+    index = build_existence_index(
+        "s3://inventory-bucket/cm-kasama-infa/daily/",
+        s3_client=s3_client,
+        index_path=str(tmp_path / "index.bin"),
+    )
+    assert "t/a.pdf" in index
+    assert "t/c.pdf" not in index
+
+
+def test_build_existence_index_latest_versions_only(tmp_path):
+    # インベントリの出力先の一部(設定の出力先)のみコピーした構成
+    config_dir = tmp_path / "daily"
+    (config_dir / "data").mkdir(parents=True)
+    (config_dir / "2024-01-01T01-00Z").mkdir()
+    file = io.StringIO()
+    writer = csv.writer(file)
+    writer.writerow(["cm-kasama-infa", "t/a.pdf", "v2", "true", "false", "1"])
+    writer.writerow(["cm-kasama-infa", "t/a.pdf", "v1", "false", "false", "1"])
+    writer.writerow(["cm-kasama-infa", "t/old.pdf", "v1", "false", "false", "1"])
+    writer.writerow(["cm-kasama-infa", "t/deleted.pdf", "v2", "true", "true", ""])
+    writer.writerow(["cm-kasama-infa", "t/deleted.pdf", "v1", "false", "false", "1"])
+    (config_dir / "data" / "a.csv.gz").write_bytes(
+        gzip.compress(file.getvalue().encode("utf-8"))
+    )
+    manifest = config_dir / "2024-01-01T01-00Z" / "manifest.json"
+    manifest.write_text(
+        make_manifest(
+            [f"inventory/{INVENTORY_PREFIX}/data/a.csv.gz"],
+            file_schema=VERSIONED_SCHEMA,
+        )
+    )
+
+    index = build_existence_index(str(manifest), index_path=str(tmp_path / "index.bin"))
+    assert len(index) == 1
+    assert "t/a.pdf" in index
+    assert "t/old.pdf" not in index
+    assert "t/deleted.pdf" not in index
+
+
+def test_build_existence_index_from_s3_versioned_parquet(s3_client, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    buffer = io.BytesIO()
+    pq.write_table(
+        pa.table(
+            {
+                "bucket": ["cm-kasama-infa"] * 4,
+                "key": ["t/a.pdf", "t/a.pdf", "t/old.pdf", "t/deleted.pdf"],
+                "is_latest": [True, False, False, True],
+                "is_delete_marker": [False, False, False, True],
+            }
+        ),
+        buffer,
+    )
+    s3_client.put_object(
+        Bucket="inventory-bucket",
+        Key=f"{INVENTORY_PREFIX}/data/a.parquet",
+        Body=buffer.getvalue(),
+    )
+    s3_client.put_object(
+        Bucket="inventory-bucket",
+        Key=f"{INVENTORY_PREFIX}/2024-01-01T01-00Z/manifest.json",
+        Body=make_manifest([f"{INVENTORY_PREFIX}/data/a.parquet"], "Parquet"),
+    )
+
+    index = build_existence_index(
+        "s3://inventory-bucket/cm-kasama-infa/daily/",
+        s3_client=s3_client,
+        index_path=str(tmp_path / "index.bin"),
+        bucket="cm-kasama-infa",
+    )
+    assert len(index) == 1
+    assert "t/a.pdf" in index
+    assert index.bucket == "cm-kasama-infa"
+    assert ExistenceIndex.load(str(tmp_path / "index.bin")).bucket == "cm-kasama-infa"
+
+
+def test_build_existence_index_other_bucket(local_inventory, tmp_path):
+    with pytest.raises(ValueError):
+        build_existence_index(
+            str(local_inventory),
+            index_path=str(tmp_path / "index.bin"),
+            bucket="other-bucket",
+        )
+
+
+def test_s3_objects_existence_with_other_bucket_index(s3_client):
+    index = ExistenceIndex.from_keys(
+        ["target/files/a.pdf"], SNAPSHOT_AT, bucket="other-bucket"
+    )
+
+    with pytest.raises(ValueError):
+        s3_objects_existence(
+            ["a.pdf"],
+            "cm-kasama-infa",
+            "target/files/",
+            s3_client,
+            existence_index=index,
+        )
+
+
+def test_find_latest_manifest(local_inventory):
+    manifest = find_latest_manifest(str(local_inventory))
+    assert manifest.endswith("2024-01-01T01-00Z/manifest.json")
+    assert find_latest_manifest(manifest) == manifest
+
+
+def test_is_fresh():
+    index = ExistenceIndex.from_keys([], SNAPSHOT_AT)
+    assert index.is_fresh(timedelta(hours=48), now=SNAPSHOT_AT + timedelta(hours=47))
+    assert not index.is_fresh(timedelta(hours=48), now=SNAPSHOT_AT + timedelta(days=3))
+
+
+def test_load_existence_index_stale(local_inventory, tmp_path):
+    index = load_existence_index(
+        str(local_inventory),
+        index_path=str(tmp_path / "index.bin"),
+        max_age=timedelta(hours=1),
+    )
+    assert index is None
+    assert (tmp_path / "index.bin.json").exists()
+
+
+def test_s3_objects_existence_with_index(s3_client):
+    s3_client.put_object(Bucket="cm-kasama-infa", Key="target/files/new.pdf", Body=b"")
+    index = ExistenceIndex.from_keys(["target/files/a.pdf"], SNAPSHOT_AT)
+    head_keys = []
+    s3_client.meta.events.register(
+        "before-call.s3.HeadObject",
+        lambda params, **kwargs: head_keys.append(params["url_path"]),
+    )
+
+    result = s3_objects_existence(
+        ["a.pdf", "new.pdf", "missing.pdf"],
+        "cm-kasama-infa",
+        "target/files/",
+        s3_client,
+        existence_index=index,
+    )
+    assert {k: v["status"] for k, v in result.items()} == {
+        "a.pdf": "exists",
+        "new.pdf": "exists",
+        "missing.pdf": "missing",
+    }
+    assert len(head_keys) == 2
@@ -0,0 +1,190 @@
+import csv
+import sys
+from datetime import datetime, timedelta
+from io import StringIO
+
+import boto3
+import pytest
+from moto import mock_s3
+
+sys.path.append("../")
+
+from lib.file_operations import (
+    concat_file_names,
+    extract_file_names,
+    get_csv_file,
+    get_file_names_from_csv,
+    get_file_names_from_rows,
+    iter_csv_rows,
+    iter_manifest_bodies,
+    iter_manifest_rows,
+    iter_text_lines,
+    list_csv_objects,
+    select_manifest_keys,
+)
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i : i + chunk_size]
+
+
+@pytest.fixture
+def s3_client():
+    with mock_s3():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="test-bucket")
+        yield conn
+
+
+def make_csv(file_names):
+    file = StringIO()
+    writer = csv.writer(file)
+    writer.writerow(["id", "csv_file_name"])
+    for i, file_name in enumerate(file_names):
+        writer.writerow([i, file_name])
+    return file.getvalue()
+
+
+def test_list_csv_objects_paginates(s3_client):
+    for i in range(1005):
+        s3_client.put_object(Bucket="test-bucket", Key=f"csv_list/{i:04}.txt", Body=b"")
+    s3_client.put_object(Bucket="test-bucket", Key="csv_list/zzzz.csv", Body=b"")
+
+    keys = [
+        obj["Key"] for obj in list_csv_objects("test-bucket", "csv_list/", s3_client)
+    ]
+    assert keys == ["csv_list/zzzz.csv"]
+
+
+def test_select_manifest_keys():
+    now = datetime(2024, 1, 1)
+    objects = [
+        {"Key": "csv_list/b.csv", "LastModified": now},
+        {"Key": "csv_list/a.csv", "LastModified": now + timedelta(hours=1)},
+        {"Key": "csv_list/2024-01.csv", "LastModified": now - timedelta(hours=1)},
+    ]
+    assert select_manifest_keys(objects, "newest") == ["csv_list/a.csv"]
+    assert select_manifest_keys(objects, "all") == [
+        "csv_list/2024-01.csv",
+        "csv_list/a.csv",
+        "csv_list/b.csv",
+    ]
+    assert select_manifest_keys(objects, "csv_list/2024-*") == ["csv_list/2024-01.csv"]
+    assert select_manifest_keys([], "newest") == []
+
+
+def test_iter_text_lines_splits_multibyte_characters():
+    data = "ヘッダー\r\nテスト_あ.pdf\nlast".encode("utf-8-sig")
+    lines = list(iter_text_lines(FakeBody(data), chunk_size=1))
+    assert lines == ["ヘッダー\r\n", "テスト_あ.pdf\n", "last"]
+
+
+def test_iter_csv_rows_keeps_quoted_newlines(s3_client):
+    body = 'id,csv_file_name\r\n1,"a\nb.pdf"\r\n2,c.pdf\r\n'
+    s3_client.put_object(Bucket="test-bucket", Key="csv_list/a.csv", Body=body)
+
+    rows = list(iter_csv_rows("test-bucket", "csv_list/a.csv", s3_client, chunk_size=3))
+    assert rows == [["id", "csv_file_name"], ["1", "a\nb.pdf"], ["2", "c.pdf"]]
+
+
+def test_iter_manifest_rows_all(s3_client):
+    s3_client.put_object(
+        Bucket="test-bucket", Key="csv_list/a.csv", Body=make_csv(["a.pdf", "b.pdf"])
+    )
+    s3_client.put_object(
+        Bucket="test-bucket", Key="csv_list/b.csv", Body=make_csv(["c.pdf"])
+    )
+
+    file_names = []
+    for _, rows in iter_manifest_rows(
+        "test-bucket", "csv_list/", s3_client, select="all"
+    ):
+        file_names.extend(get_file_names_from_rows(rows, "csv_file_name"))
+    assert file_names == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_get_file_names_from_rows_empty():
+    assert list(get_file_names_from_rows([], "csv_file_name")) == []
+
+
+def test_get_csv_file(s3_client):
+    content = make_csv(["a.pdf"])
+    s3_client.put_object(Bucket="test-bucket", Key="csv_list/a.csv", Body=content)
+
+    assert get_csv_file("test-bucket", "csv_list/", s3_client) == content
+
+
+@pytest.mark.parametrize("backend", ["csv", "pyarrow", "polars"])
+def test_extract_file_names(backend):
+    if backend != "csv":
+        pytest.importorskip(backend)
+    content = make_csv(["a.pdf", "b.pdf", "a.pdf", "c.pdf"])
+
+    for source in [content, content.encode("utf-8")]:
+        file_names = extract_file_names(source, "csv_file_name", backend=backend)
+        if backend != "csv":
+            file_names = file_names.to_pylist()
+        assert list(file_names) == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+@pytest.mark.parametrize("backend", ["csv", "pyarrow", "polars"])
+def test_extract_file_names_from_s3_body(s3_client, backend):
+    if backend != "csv":
+        pytest.importorskip(backend)
+    s3_client.put_object(
+        Bucket="test-bucket", Key="csv_list/a.csv", Body=make_csv(["1.pdf", "2.pdf"])
+    )
+
+    for _, body in iter_manifest_bodies("test-bucket", "csv_list/", s3_client):
+        file_names = extract_file_names(
+            body, "csv_file_name", backend=backend, unique=False
+        )
+        if backend != "csv":
+            file_names = file_names.to_pylist()
+        assert list(file_names) == ["1.pdf", "2.pdf"]
+
+
+@pytest.mark.parametrize("unique", [True, False])
+@pytest.mark.parametrize("backend", ["pyarrow", "polars"])
+def test_extract_file_names_backends_agree(backend, unique):
+    pytest.importorskip(backend)
+    # 空の値(クォートあり・なし)・空行・重複・クォート内の区切り文字
+    content = 'csv_file_name,id\na.pdf,1\n,2\n"",3\n\n"b,c.pdf",4\na.pdf,5\n'
+
+    expected = list(extract_file_names(content, "csv_file_name", unique=unique))
+    file_names = extract_file_names(
+        content, "csv_file_name", backend=backend, unique=unique
+    )
+    assert file_names.to_pylist() == expected
+    assert expected == (
+        ["a.pdf", "", "b,c.pdf"] if unique else ["a.pdf", "", "", "b,c.pdf", "a.pdf"]
+    )
+
+
+def test_concat_file_names():
+    assert concat_file_names([["a.pdf"], ["b.pdf", "a.pdf"]]) == [
+        "a.pdf",
+        "b.pdf",
+        "a.pdf",
+    ]
+    pa = pytest.importorskip("pyarrow")
+    file_names = concat_file_names(
+        [pa.array(["a.pdf"]), pa.array(["b.pdf"], pa.large_string())]
+    )
+    assert isinstance(file_names, pa.ChunkedArray)
+    assert file_names.to_pylist() == ["a.pdf", "b.pdf"]
+
+
+def test_extract_file_names_unknown_backend():
+    with pytest.raises(ValueError):
+        extract_file_names("", "csv_file_name", backend="dummy")
+
+
+def test_get_file_names_from_csv():
+    content = make_csv(["a.pdf", "a.pdf"])
+    assert get_file_names_from_csv(content, "csv_file_name") == ["a.pdf", "a.pdf"]
@@ -0,0 +1,144 @@
+import sys
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_s3
+
+sys.path.append("../")
+
+from lib.s3_operations import (
+    AdaptiveLimiter,
+    count_statuses,
+    head_object_existence,
+    list_object_keys,
+    s3_objects_existence,
+)
+
+
+@pytest.fixture
+def s3_client():
+    with mock_s3():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="test-bucket")
+        conn.put_object(Bucket="test-bucket", Key="target/test_a.pdf", Body=b"a")
+        conn.put_object(Bucket="test-bucket", Key="target/test_b.pdf", Body=b"b")
+        yield conn
+
+
+class ThrottlingClient:
+    def __init__(self, throttle_count):
+        self.throttle_count = throttle_count
+        self.calls = 0
+
+    def head_object(self, Bucket, Key):
+        self.calls += 1
+        if self.calls <= self.throttle_count:
+            raise ClientError({"Error": {"Code": "SlowDown"}}, "HeadObject")
+        return {}
+
+
+@pytest.mark.parametrize("mode", ["head", "list", "auto"])
+def test_s3_objects_existence(s3_client, mode):
+    result = s3_objects_existence(
+        ["test_a.pdf", "test_b.pdf", "test_c.pdf", "test_a.pdf"],
+        "test-bucket",
+        "target/",
+        s3_client,
+        mode=mode,
+    )
+    assert result == {
+        "test_a.pdf": {"status": "exists"},
+        "test_b.pdf": {"status": "exists"},
+        "test_c.pdf": {"status": "missing"},
+    }
+
+
+def test_count_statuses(s3_client):
+    result = s3_objects_existence(
+        ["test_a.pdf", "test_c.pdf", "test_d.pdf"],
+        "test-bucket",
+        "target/",
+        s3_client,
+        mode="list",
+    )
+    assert count_statuses(result) == {"exists": 1, "missing": 2, "error": 0}
+
+
+def test_s3_objects_existence_arrow_file_names(s3_client):
+    pa = pytest.importorskip("pyarrow")
+    file_names = pa.chunked_array(
+        [["test_c.pdf", "test_a.pdf"], ["test_a.pdf", "test_b.pdf"]]
+    )
+
+    result = s3_objects_existence(
+        file_names, "test-bucket", "target/", s3_client, mode="list"
+    )
+    # 重複を除外し、出現順を維持する
+    assert list(result) == ["test_c.pdf", "test_a.pdf", "test_b.pdf"]
+    assert result["test_c.pdf"] == {"status": "missing"}
+
+
+def test_s3_objects_existence_error(s3_client):
+    result = s3_objects_existence(
+        ["test_a.pdf"], "test-bucket-dummy", "target/", s3_client, mode="head"
+    )
+    assert result["test_a.pdf"]["status"] == "error"
+
+
+def test_s3_objects_existence_auto_partial_listing(s3_client):
+    for i in range(1500):
+        s3_client.put_object(Bucket="test-bucket", Key=f"target/x_{i:04}.pdf", Body=b"")
+    file_names = ["test_a.pdf", "test_c.pdf", "x_0001.pdf", "x_1499.pdf", "z.pdf"]
+
+    # 1ページ(1000件)のみ一覧取得し、残りはHEADで確認する
+    result = s3_objects_existence(
+        file_names, "test-bucket", "target/", s3_client, mode="auto", max_workers=32
+    )
+    assert {k: v["status"] for k, v in result.items()} == {
+        "test_a.pdf": "exists",
+        "test_c.pdf": "missing",
+        "x_0001.pdf": "exists",
+        "x_1499.pdf": "exists",
+        "z.pdf": "missing",
+    }
+
+
+def test_list_object_keys_max_pages(s3_client):
+    for i in range(1500):
+        s3_client.put_object(Bucket="test-bucket", Key=f"target/x_{i:04}.pdf", Body=b"")
+
+    keys, completed, last_key = list_object_keys(
+        "test-bucket", "target/", s3_client, max_pages=1
+    )
+    assert len(keys) == 1000
+    assert not completed
+    assert last_key == max(keys)
+
+
+def test_head_object_existence_retries_throttling(monkeypatch):
+    monkeypatch.setattr("lib.s3_operations.time.sleep", lambda _: None)
+    client = ThrottlingClient(throttle_count=2)
+    limiter = AdaptiveLimiter(8)
+
+    result = head_object_existence("test-bucket", "a.pdf", client, limiter)
+    assert result == {"status": "exists"}
+    assert client.calls == 3
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+def test_head_object_existence_gives_up(monkeypatch):
+    monkeypatch.setattr("lib.s3_operations.time.sleep", lambda _: None)
+    client = ThrottlingClient(throttle_count=10)
+
+    result = head_object_existence(
+        "test-bucket", "a.pdf", client, AdaptiveLimiter(8), max_retries=2
+    )
+    assert result["status"] == "error"
+    assert client.calls == 3
+
+
+def test_s3_objects_existence_unknown_mode(s3_client):
+    with pytest.raises(ValueError):
+        s3_objects_existence([], "test-bucket", "target/", s3_client, mode="dummy")
@@ -0,0 +1,79 @@
+"""
+MyLoggerの同期モードと非同期モードのスループットを比較するベンチマーク
+
+8スレッドから同時にログを出力し、1秒あたりのログ出力回数を計測する。
+非同期モードは呼び出し側の処理時間(calls)と、キューの書き込み完了までの時間(flushed)を出力する
+
+実行方法:
+    cd 14_python_loggger_implement
+    python benchmarks/bench_my_logger.py --threads 8 --calls 20000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from lib.my_logger import MyLogger
+
+
+def run_threads(logger, thread_count, call_count):
+    barrier = threading.Barrier(thread_count + 1)
+
+    def worker():
+        barrier.wait()
+        for i in range(call_count):
+            logger.debug("debug %d", i)
+            logger.info("info %d", i)
+            if i % 100 == 0:
+                logger.error("error %d", i)
+
+    threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    total = args.threads * (args.calls * 2 + (args.calls + 99) // 100)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        logger = MyLogger("bench_sync").logger
+        elapsed = run_threads(logger, args.threads, args.calls)
+        MyLogger.shutdown()
+        print(f" sync: {total / elapsed:>10.0f} calls/s ({elapsed:.2f}s)")
+
+        for policy in ["block", "drop"]:
+            logger = MyLogger(
+                f"bench_async_{policy}", async_mode=True, queue_full_policy=policy
+            ).logger
+            start = time.perf_counter()
+            elapsed = run_threads(logger, args.threads, args.calls)
+            dropped = MyLogger._queue_handler.dropped
+            MyLogger.shutdown()
+            flushed = time.perf_counter() - start
+            print(
+                f"async({policy}): {total / elapsed:>10.0f} calls/s ({elapsed:.2f}s), "
+                f"flushed {flushed:.2f}s, dropped {dropped}"
+            )
+        logging.shutdown()
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+ログファイルのローテーションにかかる時間を比較するベンチマーク
+
+- legacy: 従来の構成(RotatingFileHandler x 3 + Filter)。圧縮はrotatorで行うため
+          ログを出力するスレッドで実行される
+- routing: LevelRoutingHandler。ローテーション時はファイル名の変更のみ行い、
+           圧縮と古いファイルの削除は別スレッドで行う
+
+ログ出力1回あたりの処理時間(平均・p99・最大)と、ログを出力するスレッドで
+ローテーションに使った時間を出力する
+
+実行方法:
+    cd 14_python_loggger_implement
+    python benchmarks/bench_rotation.py --calls 200000 --max-bytes 1000000
+"""
+
+import argparse
+import gzip
+import logging
+import logging.handlers
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from lib.log_rotation import LevelRoutingHandler, RotationPolicy
+
+FORMAT = (
+    "%(asctime)s - %(levelname)s - %(name)s - %(funcName)s "
+    " - line:%(lineno)d - %(message)s"
+)
+
+
+class DebugFilter(logging.Filter):
+    def filter(self, record):
+        return record.levelno == logging.DEBUG
+
+
+class InfoFilter(logging.Filter):
+    def filter(self, record):
+        return record.levelno == logging.INFO
+
+
+def gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class TimedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """doRolloverにかかった時間を計測するRotatingFileHandler"""
+
+    rollover_seconds = 0.0
+
+    def doRollover(self):
+        start = time.perf_counter()
+        super().doRollover()
+        TimedRotatingFileHandler.rollover_seconds += time.perf_counter() - start
+
+
+class TimedLevelRoutingHandler(LevelRoutingHandler):
+    """_rolloverにかかった時間を計測するLevelRoutingHandler"""
+
+    rollover_seconds = 0.0
+
+    def _rollover(self, route):
+        start = time.perf_counter()
+        segment = super()._rollover(route)
+        TimedLevelRoutingHandler.rollover_seconds += time.perf_counter() - start
+        return segment
+
+
+def legacy_handlers(log_dir, max_bytes, compression):
+    handlers = []
+    for name, level, log_filter in [
+        ("debug", logging.DEBUG, DebugFilter()),
+        ("info", logging.INFO, InfoFilter()),
+        ("error", logging.WARNING, None),
+    ]:
+        handler = TimedRotatingFileHandler(
+            filename=os.path.join(log_dir, f"{name}.log"),
+            encoding="utf-8",
+            maxBytes=max_bytes,
+            backupCount=5,
+        )
+        handler.setLevel(level)
+        if log_filter is not None:
+            handler.addFilter(log_filter)
+        if compression:
+            handler.rotator = gzip_rotator
+            handler.namer = lambda name: name + ".gz"
+        handlers.append(handler)
+    return handlers
+
+
+def routing_handlers(log_dir, max_bytes, compression):
+    policy = RotationPolicy(
+        max_bytes=max_bytes, backup_count=5, compression="gzip" if compression else None
+    )
+    return [TimedLevelRoutingHandler(log_dir, policy)]
+
+
+def run(name, make_handlers, call_count, max_bytes, compression):
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = logging.getLogger(f"bench_{name}")
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        handlers = make_handlers(log_dir, max_bytes, compression)
+        formatter = logging.Formatter(FORMAT)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+
+        latencies = []
+        start = time.perf_counter()
+        for i in range(call_count):
+            level = (
+                logging.ERROR if i % 100 == 0 else (logging.DEBUG, logging.INFO)[i % 2]
+            )
+            t = time.perf_counter()
+            logger.log(level, "message %d %s", i, "x" * 80)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        for handler in handlers:
+            logger.removeHandler(handler)
+            handler.close()
+        closed = time.perf_counter() - start
+
+        latencies.sort()
+        rollover = (
+            TimedRotatingFileHandler.rollover_seconds
+            + TimedLevelRoutingHandler.rollover_seconds
+        )
+        TimedRotatingFileHandler.rollover_seconds = 0.0
+        TimedLevelRoutingHandler.rollover_seconds = 0.0
+        print(
+            f"{name:>8}: {call_count / elapsed:>8.0f} calls/s, "
+            f"mean {statistics.mean(latencies) * 1e6:6.1f}us, "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:6.1f}us, "
+            f"max {latencies[-1] * 1e3:6.2f}ms, "
+            f"rollover on logging thread {rollover:.3f}s, "
+            f"closed {closed:.2f}s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--max-bytes", type=int, default=1000000)
+    parser.add_argument(
+        "--no-compression", action="store_true", help="ローテーション時に圧縮しない"
+    )
+    args = parser.parse_args()
+    compression = not args.no_compression
+    run("legacy", legacy_handlers, args.calls, args.max_bytes, compression)
+    run("routing", routing_handlers, args.calls, args.max_bytes, compression)
+
+
+if __name__ == "__main__":
+    main()
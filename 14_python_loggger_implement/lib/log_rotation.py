@@ -0,0 +1,269 @@
+import glob
+import gzip
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+# 出力先ファイルと、出力するログレベルの判定
+ROUTES = {
+    "debug": lambda levelno: levelno == logging.DEBUG,
+    "info": lambda levelno: levelno == logging.INFO,
+    "error": lambda levelno: levelno >= logging.WARNING,
+}
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+INTERVAL_SECONDS = {"S": 1, "M": 60, "H": 60 * 60, "D": 60 * 60 * 24}
+
+
+@dataclass
+class RotationPolicy:
+    """
+    ログファイルのローテーションと保持の設定
+
+    :param max_bytes: int : ファイルサイズの上限(Noneの場合はサイズで判定しない)
+    :param when: str : 時間でローテーションする単位(S / M / H / D / midnight)
+    :param interval: int : 時間でローテーションする間隔(whenの単位)
+    :param backup_count: int : ファイルごとに保持する世代数(Noneの場合は無制限)
+    :param max_total_bytes: int : ローテーション済みファイルの合計サイズの上限
+    :param compression: str : ローテーション済みファイルの圧縮形式(gzip / zstd)
+    """
+
+    max_bytes: int | None = 10 * 1024 * 1024
+    when: str | None = None
+    interval: int = 1
+    backup_count: int | None = 5
+    max_total_bytes: int | None = None
+    compression: str | None = None
+
+    def __post_init__(self):
+        if self.when is not None and self.when not in (*INTERVAL_SECONDS, "midnight"):
+            raise ValueError(f"unknown when: {self.when}")
+        if self.compression is not None:
+            if self.compression not in COMPRESSION_SUFFIXES:
+                raise ValueError(f"unknown compression: {self.compression}")
+            if self.compression == "zstd":
+                # zstdはオプションの依存関係のため、設定時に確認する
+                import zstandard  # noqa: F401
+
+    def next_rollover_at(self, now):
+        """
+        時間でローテーションする次の時刻を計算する
+
+        :param now: float : 基準の時刻(UNIX時間)
+        :return: float : 次のローテーション時刻(時間でローテーションしない場合はNone)
+        """
+        if self.when is None:
+            return None
+        if self.when == "midnight":
+            midnight = datetime.fromtimestamp(now).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            return (midnight + timedelta(days=self.interval)).timestamp()
+        return now + INTERVAL_SECONDS[self.when] * self.interval
+
+
+def compress_file(path, compression):
+    """
+    ファイルを圧縮し、元のファイルを削除する
+
+    :param path: str : 圧縮するファイルのパス
+    :param compression: str : gzip / zstd
+    :return: str : 圧縮後のファイルのパス
+    """
+    compressed_path = path + COMPRESSION_SUFFIXES[compression]
+    tmp_path = compressed_path + ".tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        if compression == "gzip":
+            with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6) as f:
+                shutil.copyfileobj(src, f)
+        else:
+            import zstandard
+
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+    os.replace(tmp_path, compressed_path)
+    os.remove(path)
+    return compressed_path
+
+
+class SegmentCompressor:
+    """
+    ローテーション済みファイルの圧縮と保持期間の管理を別スレッドで行う
+
+    ログを出力するスレッドはファイル名の変更のみ行い、圧縮と古いファイルの削除は
+    このスレッドで行う
+    """
+
+    def __init__(self, policy, base_paths):
+        self.policy = policy
+        self.base_paths = base_paths
+        self.jobs = queue.SimpleQueue()
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path):
+        with self._lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="log-compressor", daemon=True
+                )
+                self.thread.start()
+        self.jobs.put(path)
+
+    def stop(self):
+        """
+        残っている圧縮を完了してスレッドを停止する
+        """
+        with self._lock:
+            if self.thread is None:
+                return
+            self.jobs.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while True:
+            path = self.jobs.get()
+            if path is None:
+                return
+            try:
+                # 圧縮待ちの間に保持期間の管理で削除された場合は何もしない
+                if self.policy.compression is not None and os.path.exists(path):
+                    compress_file(path, self.policy.compression)
+                self.enforce_retention()
+            except Exception:
+                if logging.raiseExceptions:
+                    traceback.print_exc(file=sys.stderr)
+
+    def rotated_segments(self, base_path):
+        """
+        ローテーション済みファイルを古い順に取得する
+
+        :param base_path: str : ログファイルのパス
+        :return: list : ローテーション済みファイルのパス
+        """
+        # ファイル名の末尾は日時のため、名前順が作成順
+        return sorted(
+            path
+            for path in glob.glob(glob.escape(base_path) + ".*")
+            if not path.endswith(".tmp")
+        )
+
+    def enforce_retention(self):
+        """
+        世代数と合計サイズの上限を超えたローテーション済みファイルを古い順に削除する
+        """
+        segments = []
+        for base_path in self.base_paths:
+            rotated = self.rotated_segments(base_path)
+            if self.policy.backup_count is not None:
+                excess = max(0, len(rotated) - self.policy.backup_count)
+                for path in rotated[:excess]:
+                    os.remove(path)
+                rotated = rotated[excess:]
+            segments.extend(rotated)
+        if self.policy.max_total_bytes is None:
+            return
+        sizes = {path: os.path.getsize(path) for path in segments}
+        total = sum(sizes.values())
+        for path in sorted(segments, key=os.path.getmtime):
+            if total <= self.policy.max_total_bytes:
+                break
+            os.remove(path)
+            total -= sizes[path]
+
+
+class _Segment:
+    def __init__(self, path, policy):
+        self.path = path
+        self.stream = open(path, "ab")
+        self.size = self.stream.tell()
+        started_at = os.path.getmtime(path) if self.size else time.time()
+        self.rollover_at = policy.next_rollover_at(started_at)
+
+
+class LevelRoutingHandler(logging.Handler):
+    """
+    ログレベルごとにファイルを振り分けて出力するハンドラ
+
+    debug.log(DEBUGのみ)、info.log(INFOのみ)、error.log(WARNING以上)に出力する。
+    ファイルサイズ・時間でローテーションし、ローテーション時はファイル名を変更して
+    ({ファイル名}.{日時})、圧縮と古いファイルの削除はSegmentCompressorに任せる
+    """
+
+    def __init__(self, log_dir="log", policy=None, encoding="utf-8"):
+        """
+        :param log_dir: str : ログファイルの出力先
+        :param policy: RotationPolicy : ローテーションの設定(Noneの場合は既定値)
+        :param encoding: str : ログファイルの文字コード
+        """
+        super().__init__(logging.DEBUG)
+        self.policy = policy or RotationPolicy()
+        self.encoding = encoding
+        self.paths = {route: os.path.join(log_dir, f"{route}.log") for route in ROUTES}
+        self.compressor = SegmentCompressor(self.policy, list(self.paths.values()))
+        self.segments = {
+            route: _Segment(path, self.policy) for route, path in self.paths.items()
+        }
+        self.rollover_count = 0
+        # 前回の実行で圧縮されずに残ったファイルを圧縮する
+        if self.policy.compression is not None:
+            suffix = COMPRESSION_SUFFIXES[self.policy.compression]
+            for path in self.paths.values():
+                for rotated in self.compressor.rotated_segments(path):
+                    if not rotated.endswith(suffix):
+                        self.compressor.submit(rotated)
+
+    def emit(self, record):
+        for route, match in ROUTES.items():
+            if match(record.levelno):
+                break
+        else:
+            return
+        try:
+            data = (self.format(record) + "\n").encode(self.encoding)
+            segment = self.segments[route]
+            if self._should_rollover(segment, len(data)):
+                segment = self._rollover(route)
+            segment.stream.write(data)
+            segment.stream.flush()
+            segment.size += len(data)
+        except Exception:
+            self.handleError(record)
+
+    def _should_rollover(self, segment, length):
+        if (
+            self.policy.max_bytes is not None
+            and segment.size > 0
+            and segment.size + length > self.policy.max_bytes
+        ):
+            return True
+        return segment.rollover_at is not None and time.time() >= segment.rollover_at
+
+    def _rollover(self, route):
+        segment = self.segments[route]
+        segment.stream.close()
+        rotated = f"{segment.path}.{datetime.now():%Y%m%d-%H%M%S-%f}"
+        os.rename(segment.path, rotated)
+        self.compressor.submit(rotated)
+        self.rollover_count += 1
+        self.segments[route] = _Segment(segment.path, self.policy)
+        return self.segments[route]
+
+    def flush(self):
+        with self.lock:
+            for segment in self.segments.values():
+                if not segment.stream.closed:
+                    segment.stream.flush()
+
+    def close(self):
+        with self.lock:
+            for segment in self.segments.values():
+                segment.stream.close()
+        self.compressor.stop()
+        super().close()
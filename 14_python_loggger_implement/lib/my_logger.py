@@ -1,64 +1,92 @@
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+import threading
 
+from lib.log_rotation import LevelRoutingHandler
 
-class DebugFilter(logging.Filter):
-    def filter(self, record):
-        return record.levelno == logging.DEBUG
 
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    上限付きのキューにログレコードを渡すハンドラ
 
-class InfoFilter(logging.Filter):
-    def filter(self, record):
-        return record.levelno == logging.INFO
+    キューが満杯の場合、policy="block"は空きが出るまで待ち、
+    policy="drop"はレコードを破棄して破棄件数を数える
+    """
+
+    def __init__(self, log_queue, policy="block"):
+        super().__init__(log_queue)
+        if policy not in ("block", "drop"):
+            raise ValueError(f"unknown policy: {policy}")
+        self.policy = policy
+        self.dropped = 0
+        self._lock_dropped = threading.Lock()
+
+    def enqueue(self, record):
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock_dropped:
+                self.dropped += 1
+
+
+class BoundedQueueListener(logging.handlers.QueueListener):
+    """
+    上限付きのキューに対応したQueueListener
+
+    停止時の番兵をput_nowaitで入れるとキューが満杯の場合にqueue.Fullとなるため、
+    空きが出るまで待って入れる
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
 
 
 class MyLogger:
-    def __init__(self, name):
+    # 全loggerで共有するファイル出力のハンドラ
+    _file_handler = None
+    # 非同期モードの全loggerで共有するキューとリスナー
+    _queue_handler = None
+    _listener = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        name,
+        async_mode=False,
+        queue_size=10000,
+        queue_full_policy="block",
+        rotation=None,
+    ):
+        """
+        :param name: str : logger名
+        :param async_mode: bool : Trueの場合、ファイル出力を別スレッドで行う
+        :param queue_size: int : 非同期モードのキューの上限
+        :param queue_full_policy: str : キューが満杯の場合の動作(block / drop)
+        :param rotation: RotationPolicy : ローテーションの設定(初回の設定を使用する)
+        """
         self._make_log_dir()
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
 
-        formatter = logging.Formatter(
-            "%(asctime)s - %(levelname)s - %(name)s - %(funcName)s "
-            " - line:%(lineno)d - %(message)s"
-        )
-
-        debug_file_path = "log/debug.log"
-        debug_handler = logging.handlers.RotatingFileHandler(
-            filename=debug_file_path, encoding="utf-8", maxBytes=10000, backupCount=5
-        )
-        debug_handler.setLevel(logging.DEBUG)
-        debug_handler.setFormatter(formatter)
-        debug_filter = DebugFilter()
-        debug_handler.addFilter(debug_filter)
-        self.logger.addHandler(debug_handler)
-
-        info_file_path = "log/info.log"
-        info_handler = logging.handlers.RotatingFileHandler(
-            filename=info_file_path, encoding="utf-8", maxBytes=10000, backupCount=5
-        )
-        info_handler.setLevel(logging.INFO)
-        info_handler.setFormatter(formatter)
-        info_filter = InfoFilter()
-        info_handler.addFilter(info_filter)
-        self.logger.addHandler(info_handler)
-
-        error_file_path = "log/error.log"
-        error_handler = logging.handlers.RotatingFileHandler(
-            filename=error_file_path, encoding="utf-8", maxBytes=10000, backupCount=5
-        )
-        error_handler.setLevel(logging.WARNING)
-        error_handler.setFormatter(formatter)
-        self.logger.addHandler(error_handler)
+        if async_mode:
+            self.logger.addHandler(
+                self._get_queue_handler(queue_size, queue_full_policy, rotation)
+            )
+        else:
+            self.logger.addHandler(self._get_file_handler(rotation))
 
         # /**コンソール出力設定例
         # import sys
         # console_handler = logging.StreamHandler(sys.stdout)
         # console_handler.setLevel(logging.INFO)
         # console_handler.setFormatter(formatter)
-        # info_filter = InfoFilter()
-        # console_handler.addFilter(info_filter)
+        # console_handler.addFilter(lambda record: record.levelno == logging.INFO)
         # self.logger.addHandler(console_handler)
 
         # error_handler = logging.StreamHandler(sys.stderr)
@@ -67,6 +95,69 @@ class MyLogger:
         # self.logger.addHandler(error_handler)
         # **/
 
+    def _get_file_handler(self, rotation):
+        """
+        ログレベルごとにファイルへ出力するハンドラを取得する
+
+        debug.log(DEBUGのみ)、info.log(INFOのみ)、error.log(WARNING以上)に出力する。
+        同じファイルを複数のハンドラでローテーションしないよう、初回のみ作成する
+        """
+        with MyLogger._lock:
+            if MyLogger._file_handler is None:
+                formatter = logging.Formatter(
+                    "%(asctime)s - %(levelname)s - %(name)s - %(funcName)s "
+                    " - line:%(lineno)d - %(message)s"
+                )
+                MyLogger._file_handler = LevelRoutingHandler("log", rotation)
+                MyLogger._file_handler.setFormatter(formatter)
+            return MyLogger._file_handler
+
+    def _get_queue_handler(self, queue_size, queue_full_policy, rotation):
+        """
+        非同期モードのQueueHandlerを取得する
+
+        初回のみキューと、ファイルへの書き込みを行うQueueListenerのスレッドを作成する
+        """
+        file_handler = self._get_file_handler(rotation)
+        with MyLogger._lock:
+            if MyLogger._listener is None:
+                log_queue = queue.Queue(maxsize=queue_size)
+                MyLogger._queue_handler = BoundedQueueHandler(
+                    log_queue, queue_full_policy
+                )
+                MyLogger._listener = BoundedQueueListener(
+                    log_queue, file_handler, respect_handler_level=True
+                )
+                MyLogger._listener.start()
+                atexit.register(MyLogger.shutdown)
+            return MyLogger._queue_handler
+
+    @classmethod
+    def shutdown(cls):
+        """
+        非同期モードのキューに残っているログを書き込み、リスナーのスレッドを停止する
+
+        ファイル出力のハンドラを閉じ(圧縮待ちのファイルの圧縮も完了させる)、
+        各loggerから取り除く
+        """
+        with cls._lock:
+            handlers = [cls._queue_handler, cls._file_handler]
+            if cls._listener is not None:
+                cls._listener.stop()
+                if cls._queue_handler.dropped:
+                    logging.getLogger(__name__).warning(
+                        "%d log records were dropped.", cls._queue_handler.dropped
+                    )
+            if cls._file_handler is not None:
+                cls._file_handler.close()
+            for logger in logging.Logger.manager.loggerDict.values():
+                if isinstance(logger, logging.Logger):
+                    for handler in handlers:
+                        logger.removeHandler(handler)
+            cls._listener = None
+            cls._queue_handler = None
+            cls._file_handler = None
+
     def _make_log_dir(self):
         LOG_DIR = "log"
 
@@ -0,0 +1,165 @@
+"""
+DDL作成のスループットを計測するベンチマーク
+
+合成したtable定義(デフォルト5,000table)からDBごとにDDLを作成する時間と、
+tableごとにファイルを出力する場合とschemaごとに1ファイルにまとめる場合の書き込み時間を比較する。
+--workbooksを指定した場合はtable定義書(xlsx)を作成し、読み込み時間も計測する
+
+実行方法:
+    cd 30_create_redshift_ddls
+    python benchmarks/bench_dialects.py --tables 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from openpyxl import Workbook
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from lib.dialects import DIALECTS
+from lib.environments import get_env
+from lib.excel_processing import read_table_definition
+from lib.sql_processing import make_column_definitions, make_ddl, make_schema_script
+
+# 全てのDBで対応しているデータ型
+DATA_TYPES = [
+    ("SMALLINT", "-", "-"),
+    ("INTEGER", "-", "-"),
+    ("BIGINT", "-", "-"),
+    ("DECIMAL", "10", "2"),
+    ("DOUBLE PRECISION", "-", "-"),
+    ("BOOLEAN", "-", "-"),
+    ("VARCHAR", "255", "-"),
+    ("DATE", "-", "-"),
+    ("TIMESTAMP", "-", "-"),
+    ("SUPER", "-", "-"),
+]
+
+
+def make_definitions(env, table_count, schema_count, seed=0):
+    rng = random.Random(seed)
+    columns = [
+        env["COLUMN_NAME"],
+        env["DATA_TYPE"],
+        env["DIGITS"],
+        env["DECIMAL_PART"],
+        env["PRIMARY_KEY"],
+        env["NOT_NULL"],
+        env["DEFAULT_VALUE"],
+    ]
+    definitions = []
+    for i in range(table_count):
+        rows = []
+        for j in range(rng.randint(10, 80)):
+            data_type, digits, decimal_part = rng.choice(DATA_TYPES)
+            primary_key = "○" if j == 0 else "-"
+            not_null = "○" if j == 0 or rng.random() < 0.3 else "-"
+            rows.append(
+                [
+                    f"col_{j}",
+                    data_type,
+                    digits,
+                    decimal_part,
+                    primary_key,
+                    not_null,
+                    "-",
+                ]
+            )
+        table_data = pd.DataFrame(rows, columns=columns, dtype=object)
+        definitions.append((f"schema_{i % schema_count}", f"table_{i}", table_data))
+    return definitions
+
+
+def write_workbook(path, env, schema_name, table_name, table_data):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = env["SHEET_NAME"]
+    title = [None] * 10
+    title[0] = "テーブル名称"
+    title[int(env["TABLE_NAME_LOCATION"])] = table_name
+    title[int(env["SCHEMA_NAME_LOCATION"])] = schema_name
+    sheet.append(title)
+    sheet.append(["詳細"])
+    sheet.append(["No."] + table_data.columns.tolist())
+    for i, row in enumerate(table_data.itertuples(index=False), start=1):
+        sheet.append([i] + [None if value == "-" else value for value in row])
+    workbook.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=5000)
+    parser.add_argument("--schemas", type=int, default=20)
+    parser.add_argument(
+        "--workbooks", type=int, default=0, help="作成して読み込むtable定義書の数"
+    )
+    args = parser.parse_args()
+
+    env = get_env()
+    definitions = make_definitions(env, args.tables, args.schemas)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.workbooks:
+            paths = []
+            for i, (schema_name, table_name, table_data) in enumerate(
+                definitions[: args.workbooks]
+            ):
+                path = os.path.join(tmp_dir, f"{i}.xlsx")
+                write_workbook(path, env, schema_name, table_name, table_data)
+                paths.append(path)
+            start = time.perf_counter()
+            for path in paths:
+                read_table_definition(path, env)
+            elapsed = time.perf_counter() - start
+            print(
+                f"read workbooks: {len(paths)} files {elapsed:.2f}s "
+                f"({len(paths) / elapsed:.0f} files/s)"
+            )
+
+        for dialect in DIALECTS:
+            start = time.perf_counter()
+            ddls = []
+            for schema_name, table_name, table_data in definitions:
+                table_info = make_column_definitions(
+                    schema_name, table_name, table_data, env, dialect
+                )
+                ddls.append((schema_name, make_ddl(table_info, env, dialect)))
+            generate_elapsed = time.perf_counter() - start
+
+            table_dir = os.path.join(tmp_dir, dialect, "table")
+            os.makedirs(table_dir)
+            start = time.perf_counter()
+            for i, (schema_name, ddl) in enumerate(ddls):
+                path = os.path.join(table_dir, f"{schema_name}.table_{i}.sql")
+                with open(path, "w", encoding="utf-8") as file:
+                    file.write(ddl)
+            table_elapsed = time.perf_counter() - start
+
+            schema_dir = os.path.join(tmp_dir, dialect, "schema")
+            os.makedirs(schema_dir)
+            start = time.perf_counter()
+            schemas = {}
+            for schema_name, ddl in ddls:
+                schemas.setdefault(schema_name, []).append(ddl)
+            for schema_name, schema_ddls in schemas.items():
+                path = os.path.join(schema_dir, f"{schema_name}.sql")
+                with open(path, "w", encoding="utf-8") as file:
+                    file.write(make_schema_script(schema_name, schema_ddls, dialect))
+            schema_elapsed = time.perf_counter() - start
+
+            print(
+                f"{dialect:>9}: generate {generate_elapsed:.2f}s "
+                f"({len(ddls) / generate_elapsed:.0f} tables/s), "
+                f"write per table {table_elapsed:.2f}s ({len(ddls)} files), "
+                f"write per schema {schema_elapsed:.2f}s ({len(schemas)} files)"
+            )
+
+
+if __name__ == "__main__":
+    main()
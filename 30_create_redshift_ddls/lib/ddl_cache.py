@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+
+CACHE_PATH = "./output/.ddl_cache.json"
+# DDLの内容に影響する環境変数
+CACHE_ENV_KEYS = [
+    "SHEET_NAME",
+    "COLUMN_NAME",
+    "DATA_TYPE",
+    "DIGITS",
+    "DECIMAL_PART",
+    "PRIMARY_KEY",
+    "NOT_NULL",
+    "DEFAULT_VALUE",
+    "TABLE_NAME_LOCATION",
+    "SCHEMA_NAME_LOCATION",
+    "REDSHIFT_DATA_TYPES",
+    "DIALECT",
+    "OUTPUT_MODE",
+    "ATHENA_LOCATION",
+]
+
+
+def hash_bytes(data: bytes) -> str:
+    """バイト列のハッシュ値を計算"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """ファイルの中身のハッシュ値を計算"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_env(env) -> str:
+    """DDLの内容に影響する環境変数のハッシュ値を計算"""
+    values = {key: env[key] for key in CACHE_ENV_KEYS}
+    return hash_bytes(json.dumps(values, sort_keys=True).encode("utf-8"))
+
+
+def load_cache(path: str = CACHE_PATH) -> dict:
+    """キャッシュを読み込み。存在しない・壊れている場合は空のキャッシュ"""
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache: dict, path: str = CACHE_PATH) -> None:
+    """キャッシュを書き込み"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(cache, file, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(entry, input_hash: str, env_hash: str) -> bool:
+    """
+    キャッシュのエントリが最新か判定
+
+    table定義書と環境変数が前回と同じで、出力済みのDDLが変更・削除されていない場合に最新とする
+    (schema単位で出力する場合はDDLがキャッシュに保持されている場合に最新とする)
+    """
+    if not entry:
+        return False
+    if entry["input_hash"] != input_hash or entry["env_hash"] != env_hash:
+        return False
+    # schema単位で出力する場合はDDLをキャッシュに保持している
+    if "output" not in entry:
+        return "ddl" in entry
+    try:
+        return hash_file(entry["output"]) == entry["ddl_hash"]
+    except FileNotFoundError:
+        return False
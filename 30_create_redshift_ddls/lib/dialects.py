@@ -0,0 +1,133 @@
+# table定義書のデータ型(Redshift)から各DBのデータ型への対応表
+# Noneのデータ型は対応するデータ型がないためエラーとする
+DIALECTS = {
+    "redshift": {
+        "types": {
+            "SMALLINT": "SMALLINT",
+            "INTEGER": "INTEGER",
+            "BIGINT": "BIGINT",
+            "DECIMAL": "DECIMAL",
+            "REAL": "REAL",
+            "DOUBLE PRECISION": "DOUBLE PRECISION",
+            "BOOLEAN": "BOOLEAN",
+            "CHAR": "CHAR",
+            "VARCHAR": "VARCHAR",
+            "DATE": "DATE",
+            "TIMESTAMP": "TIMESTAMP",
+            "TIMESTAMPTZ": "TIMESTAMPTZ",
+            "GEOMETRY": "GEOMETRY",
+            "GEOGRAPHY": "GEOGRAPHY",
+            "HLLSKETCH": "HLLSKETCH",
+            "SUPER": "SUPER",
+            "TIME": "TIME",
+            "TIMETZ": "TIMETZ",
+            "VARBYTE": "VARBYTE",
+        },
+        # 桁数を付与するデータ型(Noneの場合は桁数が指定されていれば全て付与)
+        "precision_types": None,
+        "not_null": True,
+        "default": True,
+        "primary_key": True,
+        "table_options": "\nDISTSTYLE AUTO\nSORTKEY AUTO",
+        "transaction": True,
+    },
+    "snowflake": {
+        "types": {
+            "SMALLINT": "SMALLINT",
+            "INTEGER": "INTEGER",
+            "BIGINT": "BIGINT",
+            "DECIMAL": "NUMBER",
+            "REAL": "FLOAT",
+            "DOUBLE PRECISION": "DOUBLE",
+            "BOOLEAN": "BOOLEAN",
+            "CHAR": "CHAR",
+            "VARCHAR": "VARCHAR",
+            "DATE": "DATE",
+            "TIMESTAMP": "TIMESTAMP_NTZ",
+            "TIMESTAMPTZ": "TIMESTAMP_TZ",
+            "GEOMETRY": "GEOMETRY",
+            "GEOGRAPHY": "GEOGRAPHY",
+            "HLLSKETCH": "BINARY",
+            "SUPER": "VARIANT",
+            "TIME": "TIME",
+            "TIMETZ": None,
+            "VARBYTE": "BINARY",
+        },
+        "precision_types": {"NUMBER", "CHAR", "VARCHAR", "BINARY"},
+        "not_null": True,
+        "default": True,
+        "primary_key": True,
+        "table_options": "",
+        # SnowflakeのDDLは暗黙的にコミットされるためトランザクションで囲まない
+        "transaction": False,
+    },
+    "athena": {
+        "types": {
+            "SMALLINT": "INT",
+            "INTEGER": "INT",
+            "BIGINT": "BIGINT",
+            "DECIMAL": "DECIMAL",
+            "REAL": "FLOAT",
+            "DOUBLE PRECISION": "DOUBLE",
+            "BOOLEAN": "BOOLEAN",
+            "CHAR": "STRING",
+            "VARCHAR": "STRING",
+            "DATE": "DATE",
+            "TIMESTAMP": "TIMESTAMP",
+            "TIMESTAMPTZ": None,
+            "GEOMETRY": None,
+            "GEOGRAPHY": None,
+            "HLLSKETCH": "BINARY",
+            "SUPER": "STRING",
+            "TIME": None,
+            "TIMETZ": None,
+            "VARBYTE": "BINARY",
+        },
+        "precision_types": {"DECIMAL"},
+        # AthenaのIcebergテーブルはNOT NULL制約・デフォルト値・主キーに対応していない
+        "not_null": False,
+        "default": False,
+        "primary_key": False,
+        "table_options": (
+            "\nLOCATION '{location}'\nTBLPROPERTIES ('table_type'='ICEBERG')"
+        ),
+        # Athenaは複数のDDLを1トランザクションで実行できない
+        "transaction": False,
+    },
+    "duckdb": {
+        "types": {
+            "SMALLINT": "SMALLINT",
+            "INTEGER": "INTEGER",
+            "BIGINT": "BIGINT",
+            "DECIMAL": "DECIMAL",
+            "REAL": "REAL",
+            "DOUBLE PRECISION": "DOUBLE",
+            "BOOLEAN": "BOOLEAN",
+            "CHAR": "VARCHAR",
+            "VARCHAR": "VARCHAR",
+            "DATE": "DATE",
+            "TIMESTAMP": "TIMESTAMP",
+            "TIMESTAMPTZ": "TIMESTAMPTZ",
+            "GEOMETRY": "BLOB",
+            "GEOGRAPHY": "BLOB",
+            "HLLSKETCH": "BLOB",
+            "SUPER": "JSON",
+            "TIME": "TIME",
+            "TIMETZ": "TIMETZ",
+            "VARBYTE": "BLOB",
+        },
+        "precision_types": {"DECIMAL"},
+        "not_null": True,
+        "default": True,
+        "primary_key": True,
+        "table_options": "",
+        "transaction": True,
+    },
+}
+
+
+def get_dialect(name: str) -> dict:
+    """DDLを出力するDBの設定を取得"""
+    if name not in DIALECTS:
+        raise ValueError(f"unknown dialect: {name}")
+    return DIALECTS[name]
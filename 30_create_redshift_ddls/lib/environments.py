@@ -22,6 +22,14 @@ def get_env():
     os.environ["TABLE_NAME_LOCATION"] = os.environ.get("TABLE_NAME_LOCATION", "1")
     # schema nameが格納されている列番号
     os.environ["SCHEMA_NAME_LOCATION"] = os.environ.get("SCHEMA_NAME_LOCATION", "5")
+    # DDLを出力するDB(redshift / snowflake / athena / duckdb)
+    os.environ["DIALECT"] = os.environ.get("DIALECT", "redshift")
+    # 出力単位(table: tableごとに1ファイル / schema: schemaごとに1ファイル)
+    os.environ["OUTPUT_MODE"] = os.environ.get("OUTPUT_MODE", "table")
+    # AthenaのIcebergテーブルのLOCATION
+    os.environ["ATHENA_LOCATION"] = os.environ.get(
+        "ATHENA_LOCATION", "s3://your-bucket/{schema_name}/{table_name}/"
+    )
 
     os.environ["REDSHIFT_DATA_TYPES"] = ",".join(
         [
@@ -1,4 +1,30 @@
 import pandas as pd
+from openpyxl import load_workbook
+
+# pandas.read_excelがデフォルトで欠損値とみなす文字列
+NA_VALUES = {
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+}
+# 列名が格納されている行番号(0始まり)
+HEADER_ROW = 2
 
 
 def extract_schema_table_name_from_excel(file: str, env):
@@ -12,6 +38,49 @@ def extract_schema_table_name_from_excel(file: str, env):
 def extract_table_data_from_excel(file: str, env) -> pd.DataFrame:
     """Excelファイルからデータフレームを抽出"""
     extract_df = pd.read_excel(file, sheet_name=env["SHEET_NAME"], header=2, dtype=str)
+    return select_table_columns(extract_df, env)
+
+
+def cell_to_str(value):
+    """セルの値をpandas.read_excel(dtype=str)と同じ文字列に変換(欠損値はNone)"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value)
+    return None if value in NA_VALUES else value
+
+
+def read_table_definition(file: str, env):
+    """
+    Excelファイルを1回だけ読み込み、schema_name,table_nameとデータフレームを抽出
+
+    openpyxlのread-onlyモードで対象シートを1回走査し、
+    extract_schema_table_name_from_excel,extract_table_data_from_excelと同じ結果を返す
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook[env["SHEET_NAME"]].iter_rows(values_only=True)
+        title_row = next(rows)
+        schema_name = title_row[int(env["SCHEMA_NAME_LOCATION"])]
+        table_name = title_row[int(env["TABLE_NAME_LOCATION"])]
+        for _ in range(HEADER_ROW - 1):
+            next(rows)
+        header = [cell_to_str(value) for value in next(rows)]
+        data = []
+        for row in rows:
+            values = [cell_to_str(value) for value in row[: len(header)]]
+            # 空行はpandasと同様にスキップ
+            if any(value is not None for value in values):
+                data.append(values + [None] * (len(header) - len(values)))
+    finally:
+        workbook.close()
+    extract_df = pd.DataFrame(data, columns=header, dtype=object)
+    return schema_name, table_name, select_table_columns(extract_df, env)
+
+
+def select_table_columns(extract_df: pd.DataFrame, env) -> pd.DataFrame:
+    """DDLの作成に使用する列を抽出"""
     col_map = {
         "column_name": env["COLUMN_NAME"],
         "data_type": env["DATA_TYPE"],
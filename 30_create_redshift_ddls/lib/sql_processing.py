@@ -1,21 +1,150 @@
-def make_column_definition(file_info):
-    sql_line = (
-        f"    {file_info.column_name:<{file_info.max_column_length}}"
-        f" {file_info.data_type}"
+import numpy as np
+import pandas as pd
+from lib.dialects import get_dialect
+from lib.table_info import TableInfo
+
+
+def make_column_definitions(
+    schema_name: str,
+    table_name: str,
+    table_data: pd.DataFrame,
+    env,
+    dialect: str = "redshift",
+) -> TableInfo:
+    """
+    データフレームからカラム定義と主キーの一覧を列単位でまとめて作成
+
+    未定義の行(カラム名・データ型・桁数・小数点以下桁数・主キー・デフォルト値が全て"-")は
+    スキップし、対応していないデータ型がある場合はValueErrorとする。
+    データ型はdialectの対応表で変換する。
+    1tableあたりの行数は少ないため、pandasより呼び出しのオーバーヘッドが小さい
+    NumPyの文字列関数(np.strings)で処理する
+    """
+    settings = get_dialect(dialect)
+    values = table_data[
+        [
+            env["COLUMN_NAME"],
+            env["DATA_TYPE"],
+            env["DIGITS"],
+            env["DECIMAL_PART"],
+            env["PRIMARY_KEY"],
+            env["NOT_NULL"],
+            env["DEFAULT_VALUE"],
+        ]
+    ].to_numpy(dtype=str)
+    (
+        column_name,
+        data_type,
+        digits,
+        decimal_part,
+        primary_key,
+        not_null,
+        default_value,
+    ) = values.T
+
+    max_column_length = int(np.strings.str_len(column_name).max())
+    is_empty = (
+        (column_name == "-")
+        & (decimal_part == "-")
+        & (data_type == "-")
+        & (digits == "-")
+        & (primary_key == "-")
+        & (default_value == "-")
+    )
+    is_invalid = ~is_empty & ~np.isin(data_type, env["REDSHIFT_DATA_TYPES"].split(","))
+    if is_invalid.any():
+        print("error record:", table_data[is_invalid].iloc[0].to_dict())
+        raise ValueError(
+            "There is no data type. Tracking your self or  ask the administorator"
+        )
+    types = {k: v for k, v in settings["types"].items() if v is not None}
+    is_unsupported = ~is_empty & ~np.isin(data_type, list(types))
+    if is_unsupported.any():
+        print("error record:", table_data[is_unsupported].iloc[0].to_dict())
+        raise ValueError(f"There is no data type for {dialect}.")
+
+    rows = ~is_empty
+    if not rows.any():
+        return TableInfo(schema_name, table_name)
+    column_name = column_name[rows]
+    target_type = np.array([types[value] for value in data_type[rows]], dtype=str)
+    digits = digits[rows]
+    decimal_part = decimal_part[rows]
+
+    has_digits = digits != "-"
+    if settings["precision_types"] is not None:
+        has_digits &= np.isin(target_type, list(settings["precision_types"]))
+    # 桁数は整数に変換して出力(小数点以下桁数はそのまま出力)
+    digits_str = np.where(has_digits, digits, "0").astype(np.int64).astype(str)
+    precision = np.where(
+        has_digits,
+        add(
+            "(",
+            digits_str,
+            np.where(decimal_part != "-", add(",", decimal_part), ""),
+            ")",
+        ),
+        "",
     )
+    column_definitions = add(
+        "    ",
+        np.strings.ljust(column_name, max_column_length),
+        " ",
+        target_type,
+        precision,
+    )
+    if settings["not_null"]:
+        column_definitions = add(
+            column_definitions, np.where(not_null[rows] != "-", " NOT NULL", "")
+        )
+    if settings["default"]:
+        default_value = default_value[rows]
+        column_definitions = add(
+            column_definitions,
+            np.where(default_value != "-", add(" DEFAULT '", default_value, "'"), ""),
+        )
+    primary_key_list = []
+    if settings["primary_key"]:
+        primary_key_list = column_name[primary_key[rows] != "-"].tolist()
+    return TableInfo(
+        schema_name,
+        table_name,
+        column_definitions.tolist(),
+        primary_key_list,
+    )
+
+
+def add(*arrays):
+    """文字列の配列(またはスカラー)を要素ごとに連結"""
+    result = arrays[0]
+    for array in arrays[1:]:
+        result = np.strings.add(result, array)
+    return result
+
+
+def make_ddl(table_info: TableInfo, env=None, dialect: str = "redshift") -> str:
+    """カラム定義と主キーを連結してCREATE TABLE文を作成"""
+    settings = get_dialect(dialect)
+    definitions = list(table_info.column_definitions)
+    if table_info.primary_key_list:
+        definitions.append(
+            "    PRIMARY KEY (" + ", ".join(table_info.primary_key_list) + ")"
+        )
+    table_name = f"{table_info.schema_name}.{table_info.table_name}"
+    ddl = f"CREATE TABLE IF NOT EXISTS {table_name}(\n" + ",\n".join(definitions)
+    table_options = settings["table_options"]
+    if "{location}" in table_options:
+        location = env["ATHENA_LOCATION"].format(
+            schema_name=table_info.schema_name, table_name=table_info.table_name
+        )
+        table_options = table_options.format(location=location)
+    return ddl.rstrip(",\n") + "\n)" + table_options + ";"
+
 
-    # Add digits and decimal part if needed
-    if file_info.digits != "-":
-        if file_info.decimal_part != "-":
-            sql_line += f"({int(file_info.digits)},{file_info.decimal_part})"
-        else:
-            sql_line += f"({int(file_info.digits)})"
-
-    # Add NOT NULL if needed
-    if file_info.is_not_null != "-":
-        sql_line += " NOT NULL"
-    # Add default value if needed
-    if file_info.default_value != "-":
-        sql_line += f" DEFAULT '{file_info.default_value}'"
-
-    file_info.ddl += sql_line + ",\n"
+def make_schema_script(schema_name: str, ddls: list, dialect: str = "redshift") -> str:
+    """schema内の全tableのCREATE TABLE文を1つのスクリプトにまとめる"""
+    settings = get_dialect(dialect)
+    script = "\n\n".join([f"CREATE SCHEMA IF NOT EXISTS {schema_name};", *ddls])
+    if settings["transaction"]:
+        script = f"BEGIN;\n\n{script}\n\nCOMMIT;"
+    return script + "\n"
@@ -1,14 +1,21 @@
+import argparse
 import glob
+import os
+import time
 import traceback
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 
-from lib.environments import get_env
-from lib.excel_processing import (
-    extract_schema_table_name_from_excel,
-    extract_table_data_from_excel,
+from lib.ddl_cache import (
+    hash_env,
+    hash_file,
+    is_up_to_date,
+    load_cache,
+    save_cache,
 )
-from lib.sql_processing import make_column_definition
-from lib.table_info import TableInfo
+from lib.environments import get_env
+from lib.excel_processing import read_table_definition
+from lib.sql_processing import make_column_definitions, make_ddl, make_schema_script
 
 # Excelファイルにデータ検証(Data Validation)の拡張が含まれているけど、
 # その拡張は openpyxl ライブラリでサポートされていないという意味です。
@@ -18,69 +25,158 @@ warnings.filterwarnings(
 )
 
 
-def write_to_file(s_name: str, t_name: str, ddl: str) -> None:
-    """ "SQL文をファイルに書き込み"""
-    with open(f"./output/{s_name}.{t_name}.sql", "w", encoding="utf-8") as file:
+def output_path(env, name: str) -> str:
+    """出力先のパス。Redshift以外はDBごとのフォルダに出力"""
+    output_dir = "./output"
+    if env["DIALECT"] != "redshift":
+        output_dir = f"./output/{env['DIALECT']}"
+        os.makedirs(output_dir, exist_ok=True)
+    return f"{output_dir}/{name}.sql"
+
+
+def write_to_file(path: str, ddl: str) -> bool:
+    """ "SQL文をファイルに書き込み。内容が変わらない場合は書き込まない"""
+    try:
+        with open(path, encoding="utf-8") as file:
+            if file.read() == ddl:
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    with open(path, "w", encoding="utf-8") as file:
         file.write(ddl)
+    return True
+
+
+def create_ddl(file: str, env):
+    """table定義書からDDLを作成"""
+    schema_name, table_name, extract_table_data = read_table_definition(file, env)
+    table_info = make_column_definitions(
+        schema_name, table_name, extract_table_data, env, env["DIALECT"]
+    )
+    return schema_name, table_name, make_ddl(table_info, env, env["DIALECT"])
+
 
+def process_file(file: str, env, entry=None):
+    """
+    1ファイル分のDDLを作成して出力
 
-def main():
+    table定義書と環境変数がキャッシュと同じ場合はスキップする。エラーは呼び出し元に返す。
+    schema単位で出力する場合はファイルに書き込まず、DDLをキャッシュのエントリに保持する
+    """
     try:
-        env = get_env()
-        files = [file for file in glob.glob("./input/*.xlsx") if "~$" not in file]
-        if not files:
-            raise ValueError("file did not exist.")
-        print("files:", files)
-        for file in files:
-            schema_name, table_name = extract_schema_table_name_from_excel(file, env)
-            extract_table_data = extract_table_data_from_excel(file, env)
-            column_lengths = extract_table_data[env["COLUMN_NAME"]].apply(
-                lambda x: len(str(x))
-            )
-            max_column_length = max(column_lengths)
-            ddl = f"CREATE TABLE IF NOT EXISTS {schema_name}.{table_name}(\n"
-            table_info = TableInfo(ddl, max_column_length)
-            for _, row in extract_table_data.iterrows():
-                table_info.column_name = row[env["COLUMN_NAME"]]
-                table_info.data_type = row[env["DATA_TYPE"]]
-                table_info.digits = row[env["DIGITS"]]
-                table_info.decimal_part = row[env["DECIMAL_PART"]]
-                table_info.primary_key = row[env["PRIMARY_KEY"]]
-                table_info.is_not_null = row[env["NOT_NULL"]]
-                table_info.default_value = row[env["DEFAULT_VALUE"]]
-                # 全て含む場合
-                if {
-                    table_info.column_name,
-                    table_info.decimal_part,
-                    table_info.data_type,
-                    table_info.digits,
-                    table_info.primary_key,
-                    table_info.default_value,
-                } == {"-"}:
-                    continue
-                elif table_info.data_type in env["REDSHIFT_DATA_TYPES"].split(","):
-                    if table_info.primary_key != "-":
-                        table_info.primary_key_list = table_info.column_name
-                    make_column_definition(table_info)
-                else:
-                    print("error record:", vars(table_info))
-                    raise ValueError(
-                        "There is no data type. Tracking your"
-                        " self or  ask the administorator"
-                    )
-            if table_info.primary_key_list != []:
-                table_info.ddl += (
-                    "    PRIMARY KEY (" + ", ".join(table_info.primary_key_list) + ")\n"
+        input_hash = hash_file(file)
+        env_hash = hash_env(env)
+        if is_up_to_date(entry, input_hash, env_hash):
+            return {"status": "skipped", "entry": entry}
+        schema_name, table_name, ddl = create_ddl(file, env)
+        entry = {
+            "input_hash": input_hash,
+            "env_hash": env_hash,
+            "schema_name": schema_name,
+            "table_name": table_name,
+        }
+        if env["OUTPUT_MODE"] == "schema":
+            entry["ddl"] = ddl
+            return {"status": "regenerated", "entry": entry}
+        output = output_path(env, f"{schema_name}.{table_name}")
+        written = write_to_file(output, ddl)
+        entry["output"] = output
+        entry["ddl_hash"] = hash_file(output)
+        return {"status": "regenerated" if written else "unchanged", "entry": entry}
+    except Exception:
+        return {"status": "error", "error": traceback.format_exc()}
+
+
+def write_schema_scripts(entries: list, env) -> int:
+    """schemaごとに全tableのDDLを1つのスクリプトにまとめて出力"""
+    schemas = {}
+    for entry in sorted(entries, key=lambda e: (e["schema_name"], e["table_name"])):
+        schemas.setdefault(entry["schema_name"], []).append(entry["ddl"])
+    written_count = 0
+    for schema_name, ddls in schemas.items():
+        script = make_schema_script(schema_name, ddls, env["DIALECT"])
+        if write_to_file(output_path(env, schema_name), script):
+            written_count += 1
+    print(f"schema scripts written: {written_count} / {len(schemas)}")
+    return written_count
+
+
+def main(workers: int = 1, use_cache: bool = True):
+    start = time.perf_counter()
+    env = get_env()
+    files = [file for file in glob.glob("./input/*.xlsx") if "~$" not in file]
+    if not files:
+        raise ValueError("file did not exist.")
+    print("files:", files)
+    cache = load_cache() if use_cache else {}
+    entries = [cache.get(file) for file in files]
+    if workers > 1:
+        # os.environはpickleできないためdictに変換してワーカーに渡す
+        env = dict(env)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    process_file,
+                    files,
+                    [env] * len(files),
+                    entries,
+                    chunksize=max(1, len(files) // (workers * 4)),
                 )
-            table_info.ddl = (
-                table_info.ddl.rstrip(",\n") + "\n)\nDISTSTYLE AUTO\nSORTKEY AUTO;"
             )
-            write_to_file(schema_name, table_name, table_info.ddl)
+    else:
+        results = [
+            process_file(file, env, entry) for file, entry in zip(files, entries)
+        ]
+    # 削除されたtable定義書・エラーになったtable定義書はキャッシュから除外
+    cache = {}
+    counts = {"skipped": 0, "unchanged": 0, "regenerated": 0, "error": 0}
+    for file, result in zip(files, results):
+        counts[result["status"]] += 1
+        if result["status"] == "error":
+            print("error file:", file)
+            print(result["error"])
+        else:
+            cache[file] = result["entry"]
+    save_cache(cache)
+    if env["OUTPUT_MODE"] == "schema":
+        write_schema_scripts(list(cache.values()), env)
+    print(
+        f"regenerated: {counts['regenerated']}, unchanged: {counts['unchanged']}, "
+        f"skipped: {counts['skipped']}, error: {counts['error']}, "
+        f"elapsed: {time.perf_counter() - start:.2f}s"
+    )
+    if counts["error"]:
+        print(f"failed: {counts['error']} / {len(files)} files")
+    else:
         print("successfull")
-    except Exception:
-        print("error file:", file)
-        traceback.print_exc()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="並列に処理するプロセス数(0の場合はCPU数)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="キャッシュを使用せず全てのtable定義書からDDLを作成する",
+    )
+    parser.add_argument(
+        "--dialect",
+        choices=["redshift", "snowflake", "athena", "duckdb"],
+        help="DDLを出力するDB(環境変数DIALECTより優先)",
+    )
+    parser.add_argument(
+        "--output-mode",
+        choices=["table", "schema"],
+        help="tableごとに出力(table)、schemaごとに1ファイルにまとめて出力(schema)",
+    )
+    args = parser.parse_args()
+    if args.dialect:
+        os.environ["DIALECT"] = args.dialect
+    if args.output_mode:
+        os.environ["OUTPUT_MODE"] = args.output_mode
+    main(args.workers or os.cpu_count(), use_cache=not args.no_cache)
@@ -0,0 +1,62 @@
+CREATE TABLE IF NOT EXISTS dwh.test(
+    col_smallint_1    SMALLINT NOT NULL DEFAULT '0',
+    col_integer_1     INTEGER NOT NULL DEFAULT '0',
+    col_bigint_1      BIGINT NOT NULL DEFAULT '0',
+    col_decimal_1     DECIMAL(5,2) NOT NULL DEFAULT '0.0',
+    col_real_1        REAL NOT NULL DEFAULT '0.0',
+    col_double_1      DOUBLE PRECISION NOT NULL DEFAULT '0.0',
+    col_boolean_1     BOOLEAN NOT NULL DEFAULT 'True',
+    col_char_1        CHAR(10) NOT NULL,
+    col_varchar_1     VARCHAR(255) NOT NULL,
+    col_date_1        DATE NOT NULL DEFAULT '2020-01-01',
+    col_timestamp_1   TIMESTAMP NOT NULL DEFAULT '2000-01-01 00:00:00',
+    col_timestamptz_1 TIMESTAMPTZ NOT NULL DEFAULT '2000-01-01 00:00:00+09',
+    col_geometry_1    GEOMETRY NOT NULL,
+    col_geography_1   GEOGRAPHY NOT NULL,
+    col_hllsketch_1   HLLSKETCH NOT NULL,
+    col_super_1       SUPER NOT NULL DEFAULT '{"key": "value"}',
+    col_time_1        TIME NOT NULL DEFAULT '00:00:00',
+    col_timetz_1      TIMETZ NOT NULL DEFAULT '00:00:00+09',
+    col_varbyte_1     VARBYTE NOT NULL,
+    col_smallint_2    SMALLINT,
+    col_integer_2     INTEGER,
+    col_bigint_2      BIGINT,
+    col_decimal_2     DECIMAL(5,2),
+    col_real_2        REAL,
+    col_double_2      DOUBLE PRECISION,
+    col_boolean_2     BOOLEAN,
+    col_char_2        CHAR(10),
+    col_varchar_2     VARCHAR(255),
+    col_date_2        DATE,
+    col_timestamp_2   TIMESTAMP,
+    col_timestamptz_2 TIMESTAMPTZ,
+    col_geometry_2    GEOMETRY,
+    col_geography_2   GEOGRAPHY,
+    col_hllsketch_2   HLLSKETCH,
+    col_super_2       SUPER,
+    col_time_2        TIME,
+    col_timetz_2      TIMETZ,
+    col_varbyte_2     VARBYTE,
+    col_smallint_3    SMALLINT,
+    col_integer_3     INTEGER,
+    col_bigint_3      BIGINT,
+    col_decimal_3     DECIMAL(5,2),
+    col_real_3        REAL,
+    col_double_3      DOUBLE PRECISION,
+    col_boolean_3     BOOLEAN,
+    col_char_3        CHAR(10),
+    col_varchar_3     VARCHAR(255),
+    col_date_3        DATE,
+    col_timestamp_3   TIMESTAMP,
+    col_timestamptz_3 TIMESTAMPTZ,
+    col_geometry_3    GEOMETRY,
+    col_geography_3   GEOGRAPHY,
+    col_hllsketch_3   HLLSKETCH,
+    col_super_3       SUPER,
+    col_time_3        TIME,
+    col_timetz_3      TIMETZ,
+    col_varbyte_3     VARBYTE,
+    PRIMARY KEY (col_smallint_2, col_integer_2, col_bigint_2, col_decimal_2, col_real_2, col_double_2, col_boolean_2, col_char_2, col_varchar_2, col_date_2, col_timestamp_2, col_timestamptz_2, col_time_2, col_timetz_2, col_varbyte_2)
+)
+DISTSTYLE AUTO
+SORTKEY AUTO;
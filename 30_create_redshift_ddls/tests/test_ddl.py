@@ -0,0 +1,210 @@
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from lib.environments import get_env
+from lib.excel_processing import (
+    extract_schema_table_name_from_excel,
+    extract_table_data_from_excel,
+    read_table_definition,
+)
+from lib.sql_processing import make_column_definitions, make_ddl, make_schema_script
+from main import create_ddl
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), "..")
+INPUT_FILE = os.path.join(BASE_DIR, "input", "正常系table定義.xlsx")
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+
+
+def legacy_ddl(schema_name, table_name, table_data, env):
+    """iterrowsで1行ずつ文字列を連結していた変更前の実装"""
+    max_column_length = max(table_data[env["COLUMN_NAME"]].apply(lambda x: len(str(x))))
+    ddl = f"CREATE TABLE IF NOT EXISTS {schema_name}.{table_name}(\n"
+    primary_key_list = []
+    for _, row in table_data.iterrows():
+        column_name = row[env["COLUMN_NAME"]]
+        data_type = row[env["DATA_TYPE"]]
+        digits = row[env["DIGITS"]]
+        decimal_part = row[env["DECIMAL_PART"]]
+        primary_key = row[env["PRIMARY_KEY"]]
+        not_null = row[env["NOT_NULL"]]
+        default_value = row[env["DEFAULT_VALUE"]]
+        if {
+            column_name,
+            decimal_part,
+            data_type,
+            digits,
+            primary_key,
+            default_value,
+        } == {"-"}:
+            continue
+        elif data_type in env["REDSHIFT_DATA_TYPES"].split(","):
+            if primary_key != "-":
+                primary_key_list.append(column_name)
+            sql_line = f"    {column_name:<{max_column_length}} {data_type}"
+            if digits != "-":
+                if decimal_part != "-":
+                    sql_line += f"({int(digits)},{decimal_part})"
+                else:
+                    sql_line += f"({int(digits)})"
+            if not_null != "-":
+                sql_line += " NOT NULL"
+            if default_value != "-":
+                sql_line += f" DEFAULT '{default_value}'"
+            ddl += sql_line + ",\n"
+        else:
+            raise ValueError("There is no data type.")
+    if primary_key_list != []:
+        ddl += "    PRIMARY KEY (" + ", ".join(primary_key_list) + ")\n"
+    return ddl.rstrip(",\n") + "\n)\nDISTSTYLE AUTO\nSORTKEY AUTO;"
+
+
+def make_table_data(env, rows):
+    columns = [
+        env["COLUMN_NAME"],
+        env["DATA_TYPE"],
+        env["DIGITS"],
+        env["DECIMAL_PART"],
+        env["PRIMARY_KEY"],
+        env["NOT_NULL"],
+        env["DEFAULT_VALUE"],
+    ]
+    return pd.DataFrame(rows, columns=columns, dtype=object)
+
+
+@pytest.fixture
+def env():
+    return get_env()
+
+
+def test_create_ddl_matches_golden_file(env):
+    schema_name, table_name, ddl = create_ddl(INPUT_FILE, env)
+    # end-of-file-fixer が末尾に改行を付けるため、比較では除く
+    with open(os.path.join(GOLDEN_DIR, f"{schema_name}.{table_name}.sql")) as f:
+        assert ddl == f.read().rstrip("\n")
+
+
+def test_read_table_definition_matches_pandas(env):
+    schema_name, table_name, table_data = read_table_definition(INPUT_FILE, env)
+    assert (schema_name, table_name) == extract_schema_table_name_from_excel(
+        INPUT_FILE, env
+    )
+    expected = extract_table_data_from_excel(INPUT_FILE, env)
+    assert table_data.values.tolist() == expected.values.tolist()
+    assert table_data.columns.tolist() == expected.columns.tolist()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_make_column_definitions_matches_legacy(env, seed):
+    rng = random.Random(seed)
+    data_types = env["REDSHIFT_DATA_TYPES"].split(",")
+    rows = []
+    for i in range(rng.randint(1, 30)):
+        if rng.random() < 0.1:
+            rows.append(["-", "-", "-", "-", "-", rng.choice(["-", "○"]), "-"])
+            continue
+        rows.append(
+            [
+                f"col_{'x' * rng.randint(0, 20)}_{i}",
+                rng.choice(data_types),
+                rng.choice(["-", "5", "10", "255"]),
+                rng.choice(["-", "0", "2"]),
+                rng.choice(["-", "○"]),
+                rng.choice(["-", "○"]),
+                rng.choice(["-", "0", "abc", "2000-01-01 00:00:00"]),
+            ]
+        )
+    table_data = make_table_data(env, rows)
+
+    table_info = make_column_definitions("dwh", "test", table_data, env)
+    assert make_ddl(table_info) == legacy_ddl("dwh", "test", table_data, env)
+
+
+def test_make_column_definitions_only_empty_rows(env):
+    table_data = make_table_data(env, [["-", "-", "-", "-", "-", "-", "-"]])
+
+    table_info = make_column_definitions("dwh", "test", table_data, env)
+    assert make_ddl(table_info) == legacy_ddl("dwh", "test", table_data, env)
+
+
+def test_make_column_definitions_invalid_data_type(env):
+    table_data = make_table_data(
+        env,
+        [
+            ["col_a", "INTEGER", "-", "-", "-", "-", "-"],
+            ["col_b", "NUMERIC"] + ["-"] * 5,
+        ],
+    )
+
+    with pytest.raises(ValueError):
+        make_column_definitions("dwh", "test", table_data, env)
+
+
+def test_make_ddl_dialects(env):
+    table_data = make_table_data(
+        env,
+        [
+            ["id", "INTEGER", "-", "-", "○", "○", "-"],
+            ["price", "DECIMAL", "5", "2", "-", "-", "0.0"],
+            ["name", "VARCHAR", "255", "-", "-", "-", "-"],
+            ["created_at", "TIMESTAMP", "-", "-", "-", "○", "-"],
+        ],
+    )
+    expected = {
+        "snowflake": (
+            "CREATE TABLE IF NOT EXISTS dwh.test(\n"
+            "    id         INTEGER NOT NULL,\n"
+            "    price      NUMBER(5,2) DEFAULT '0.0',\n"
+            "    name       VARCHAR(255),\n"
+            "    created_at TIMESTAMP_NTZ NOT NULL,\n"
+            "    PRIMARY KEY (id)\n"
+            ");"
+        ),
+        "athena": (
+            "CREATE TABLE IF NOT EXISTS dwh.test(\n"
+            "    id         INT,\n"
+            "    price      DECIMAL(5,2),\n"
+            "    name       STRING,\n"
+            "    created_at TIMESTAMP\n"
+            ")\n"
+            "LOCATION 's3://your-bucket/dwh/test/'\n"
+            "TBLPROPERTIES ('table_type'='ICEBERG');"
+        ),
+        "duckdb": (
+            "CREATE TABLE IF NOT EXISTS dwh.test(\n"
+            "    id         INTEGER NOT NULL,\n"
+            "    price      DECIMAL(5,2) DEFAULT '0.0',\n"
+            "    name       VARCHAR,\n"
+            "    created_at TIMESTAMP NOT NULL,\n"
+            "    PRIMARY KEY (id)\n"
+            ");"
+        ),
+    }
+    for dialect, ddl in expected.items():
+        table_info = make_column_definitions("dwh", "test", table_data, env, dialect)
+        assert make_ddl(table_info, env, dialect) == ddl
+
+
+def test_make_column_definitions_unsupported_data_type(env):
+    table_data = make_table_data(env, [["col_a", "TIMETZ"] + ["-"] * 5])
+
+    with pytest.raises(ValueError):
+        make_column_definitions("dwh", "test", table_data, env, "athena")
+
+
+def test_make_schema_script():
+    script = make_schema_script("dwh", ["CREATE TABLE a;", "CREATE TABLE b;"])
+    assert script == (
+        "BEGIN;\n\n"
+        "CREATE SCHEMA IF NOT EXISTS dwh;\n\n"
+        "CREATE TABLE a;\n\n"
+        "CREATE TABLE b;\n\n"
+        "COMMIT;\n"
+    )
+    script = make_schema_script("dwh", ["CREATE TABLE a;"], "snowflake")
+    assert script == "CREATE SCHEMA IF NOT EXISTS dwh;\n\nCREATE TABLE a;\n"
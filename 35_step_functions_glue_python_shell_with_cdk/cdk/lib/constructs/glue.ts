@@ -30,7 +30,14 @@ export class GlueConstruct extends Construct {
     );
     glueJobRole.addToPolicy(
       new iam.PolicyStatement({
-        actions: ['s3:ListBucket', 's3:GetObject', 's3:PutObject', 's3:CopyObject'],
+        actions: [
+          's3:ListBucket',
+          's3:GetObject',
+          's3:PutObject',
+          's3:CopyObject',
+          // マルチパートアップロードを中止する場合に必要
+          's3:AbortMultipartUpload',
+        ],
         resources: [
           `arn:aws:s3:::${props.dataSourceBucketName}`,
           `arn:aws:s3:::${props.dataSourceBucketName}/*`,
@@ -57,6 +64,10 @@ export class GlueConstruct extends Construct {
       defaultArguments: {
         '--TempDir': `s3://${props.sysBucketName}/tmp`,
         '--job-language': 'python',
+        // etl_script.pyと同じディレクトリのcsv_io.pyをimportできるようにする
+        '--extra-py-files': `s3://${props.sysBucketName}/glue-jobs/glue/csv_io.py`,
+        // csv_ioでpyarrowを使うため、analyticsのライブラリセットを使う
+        'library-set': 'analytics',
         '--S3_OUTPUT_BUCKET': props.dataStoreBucketName,
         '--S3_OUTPUT_KEY': 'output/',
       },
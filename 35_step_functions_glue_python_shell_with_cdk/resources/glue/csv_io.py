@@ -0,0 +1,602 @@
+import csv
+import io
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+# マルチパートアップロードのパートサイズ(最後のパート以外は5MiB以上)
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 16 * 1024 * 1024
+# 複数の入力をまとめて出力する場合の1ファイルあたりの目安のサイズ
+DEFAULT_TARGET_FILE_SIZE = 128 * 1024 * 1024
+# pandasのread_csvの既定で欠損値として読み込む値
+NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+# pandasのread_csvの既定で真偽値として読み込む値
+TRUE_VALUES = ["True", "TRUE", "true"]
+FALSE_VALUES = ["False", "FALSE", "false"]
+# 列名の行を探すために1回に読み込むバイト数
+HEADER_READ_SIZE = 64 * 1024
+# クォートが必要な文字(区切り文字・クォート・改行)
+NEEDS_QUOTING_PATTERN = r'[,"\r\n]'
+# CSVの文字列に変換する1回あたりの行数
+WRITE_BATCH_ROWS = 65_536
+# スキーマを満たさない行に追加する列(満たさない列名をカンマ区切りで入れる)
+QUARANTINE_REASON_COLUMN = "_invalid_columns"
+# 文字列から数値への変換の前に、変換できない値を除外するパターン
+INTEGER_PATTERN = r"^-?\d+$"
+FLOAT_PATTERN = r"(?i)^-?((\d+\.?\d*|\.\d+)(e[+-]?\d+)?|inf|infinity|nan)$"
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """
+    スキーマの列の定義
+
+    :param type: pa.DataType : 列の型
+    :param nullable: bool : 欠損値を許容するか
+    """
+
+    type: pa.DataType
+    nullable: bool = True
+
+
+class SchemaError(ValueError):
+    """
+    入力ファイルにスキーマの列がない場合の例外
+    """
+
+
+def read_csv_from_s3(s3_client, bucket, key):
+    """
+    S3のCSVをpyarrowのCSVパーサーで読み込み、Arrow型の列のデータフレームにする
+
+    列のデータはArrowの配列のままpandasから参照するため、文字列をPythonの
+    オブジェクトに変換しない。全ての列を文字列として読み込んでから、
+    pandasのread_csvと同じ規則で数値・真偽値に変換する(infer_column_type)。
+    日時は変換しないため、to_csvで入力と同じ形式のまま出力される
+
+    :param s3_client: S3のクライアント
+    :param bucket: str : バケット名
+    :param key: str : キー
+    :return: pd.DataFrame : 各列がpd.ArrowDtypeのデータフレーム
+    """
+    table = _read_csv_table(s3_client, bucket, key, streaming=True)
+    return _to_pandas(_infer_column_types(table, exclude=()))
+
+
+def _to_pandas(table):
+    # pd.ArrowDtypeがない古いpandas(1.5未満)では通常の型に変換する
+    return table.to_pandas(types_mapper=getattr(pd, "ArrowDtype", None))
+
+
+class _PrefixedStream:
+    """
+    先に読み込んだバイト列に続けて、残りのストリームを読み込む
+    """
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+        self.closed = False
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self.prefix + self.stream.read()
+            self.prefix = b""
+            return data
+        data = self.prefix[:size]
+        self.prefix = self.prefix[size:]
+        if len(data) < size:
+            data += self.stream.read(size - len(data))
+        return data
+
+    def close(self):
+        self.closed = True
+        self.stream.close()
+
+
+def _header_end(data):
+    # クォートの外にある最初の改行の位置(列名に改行を含む場合も考慮する)
+    start = 0
+    while True:
+        position = data.find(b"\n", start)
+        if position < 0:
+            return None
+        if data.count(b'"', 0, position) % 2 == 0:
+            return position
+        start = position + 1
+
+
+def _read_header(body):
+    # 列名の行を読み込み、列名と読み込んだバイト列を返す
+    data = b""
+    while True:
+        chunk = body.read(HEADER_READ_SIZE)
+        data += chunk
+        end = _header_end(data)
+        if end is not None or not chunk:
+            break
+    header = data if end is None else data[:end]
+    names = next(csv.reader(io.StringIO(header.decode("utf-8-sig"))), [])
+    return names, data
+
+
+def _read_csv_table(s3_client, bucket, key, streaming, column_types=None):
+    # column_typesにない列は文字列として読み込む(pyarrowの型の推定では日時の
+    # 形式やタイムゾーンが変わるため、推定はinfer_column_typeで行う)
+    body = s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+    try:
+        names, data = _read_header(body)
+        body = _PrefixedStream(data, body)
+        column_types = column_types or {}
+        convert_options = pa_csv.ConvertOptions(
+            column_types={name: column_types.get(name, pa.string()) for name in names},
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        )
+        source = pa.PythonFile(body, mode="r")
+        if streaming:
+            # read_csvはファイル全体の解析用のバッファを保持するため、
+            # ストリーミング形式の方がピークメモリが小さい
+            return pa_csv.open_csv(source, convert_options=convert_options).read_all()
+        return pa_csv.read_csv(source, convert_options=convert_options)
+    finally:
+        body.close()
+
+
+def infer_column_type(values):
+    """
+    文字列として読み込んだ列を、pandasのread_csvと同じ規則で変換する
+
+    - 整数: int64(欠損値がある場合はfloat64)
+    - 小数: float64
+    - 真偽値(True / TRUE / true など): bool
+    - 全て欠損値: float64
+    - それ以外(日時を含む): 文字列のまま
+
+    :param values: pa.ChunkedArray : 文字列の列
+    :return: pa.ChunkedArray : 変換した列
+    """
+    if values.null_count == len(values):
+        return pa.chunked_array([pa.nulls(len(values), pa.float64())])
+    numbers = pc.replace_substring_regex(pc.utf8_trim_whitespace(values), r"^\+", "")
+    if pc.all(pc.match_substring_regex(numbers, INTEGER_PATTERN)).as_py():
+        if values.null_count:
+            return _parse_floats(values)
+        for type in (pa.int64(), pa.uint64()):
+            try:
+                return pc.cast(numbers, type)
+            except pa.ArrowInvalid:
+                pass
+        # uint64にも収まらない整数は、pandasと同じく文字列のままにする
+        return values
+    if pc.all(pc.match_substring_regex(numbers, FLOAT_PATTERN)).as_py():
+        return _parse_floats(values)
+    bool_values = pa.array(TRUE_VALUES + FALSE_VALUES)
+    if pc.all(pc.is_in(pc.drop_null(values), bool_values)).as_py():
+        is_true = pc.is_in(values, pa.array(TRUE_VALUES))
+        return pc.if_else(pc.is_valid(values), is_true, pa.scalar(None, pa.bool_()))
+    return values
+
+
+def _parse_floats(values):
+    # pandasの小数の変換(float_precision="high")は最も近い値に丸めない場合があるため、
+    # 同じ値にするために1列のCSVとしてpandasのパーサーで変換する
+    empty = pa.scalar("", pa.large_string())
+    newline = pa.scalar("\n", pa.large_string())
+    lines = pc.binary_join_element_wise(
+        pc.fill_null(pc.cast(values, pa.large_string()), empty), empty, newline
+    ).combine_chunks()
+    offsets = np.frombuffer(lines.buffers()[1], np.int64)
+    offsets = offsets[lines.offset : lines.offset + len(lines) + 1]
+    numbers = pd.read_csv(
+        pa.BufferReader(lines.buffers()[2][offsets[0] : offsets[-1]]),
+        header=None,
+        dtype=np.float64,
+        skip_blank_lines=False,
+    )[0].to_numpy()
+    return pa.chunked_array([pa.array(numbers, pa.float64(), from_pandas=True)])
+
+
+def _infer_column_types(table, exclude):
+    for i, name in enumerate(table.column_names):
+        if name not in exclude:
+            table = table.set_column(i, name, infer_column_type(table[name]))
+    return table
+
+
+def read_csv_with_schema(s3_client, bucket, key, schema):
+    """
+    スキーマの型を指定してS3のCSVを読み込み、スキーマを満たさない行を分離する
+
+    型は解析時に指定するため、ファイル全体から型を推定しない。型に合わない値が
+    ある場合は、スキーマの列を文字列として読み直してから列ごとにまとめて変換し、
+    変換できない値・nullableでない列の欠損値を含む行を分離する。
+    スキーマにない列はread_csv_from_s3と同じく、pandasと同じ規則で変換する
+
+    :param s3_client: S3のクライアント
+    :param bucket: str : バケット名
+    :param key: str : キー
+    :param schema: dict : 列名とColumnSpecの辞書
+    :return: tuple : (スキーマを満たす行のデータフレーム,
+                      満たさない行のpa.Table(QUARANTINE_REASON_COLUMNに列名))
+    """
+    try:
+        table = _read_csv_table(
+            s3_client,
+            bucket,
+            key,
+            True,
+            {name: column.type for name, column in schema.items()},
+        )
+    except pa.ArrowInvalid:
+        table = _read_csv_table(s3_client, bucket, key, False)
+    missing = [name for name in schema if name not in table.column_names]
+    if missing:
+        raise SchemaError(f"{bucket}/{key} has no columns: {', '.join(missing)}")
+
+    # 分離する行は読み込んだ値のまま出力する
+    raw_table = table
+    table = _infer_column_types(table, exclude=schema)
+    invalid = []
+    for name, column in schema.items():
+        values = table[name]
+        errors = None
+        if values.type != column.type:
+            values, errors = _safe_cast(values, column.type)
+            table = table.set_column(table.schema.get_field_index(name), name, values)
+        if not column.nullable:
+            nulls = pc.is_null(values)
+            errors = nulls if errors is None else pc.or_(errors, nulls)
+        if errors is not None and pc.any(errors).as_py():
+            invalid.append((name, errors))
+    if not invalid:
+        reasons = pa.array([], pa.string())
+        return _to_pandas(table), raw_table.slice(0, 0).append_column(
+            QUARANTINE_REASON_COLUMN, reasons
+        )
+
+    row_errors = invalid[0][1]
+    for _, errors in invalid[1:]:
+        row_errors = pc.or_(row_errors, errors)
+    # 分離する行は読み込んだ値のまま出力し、満たさない列名を追加する
+    reasons = pc.binary_join_element_wise(
+        *[
+            pc.if_else(pc.filter(errors, row_errors), name, None)
+            for name, errors in invalid
+        ],
+        ",",
+        null_handling="skip",
+    )
+    quarantine = raw_table.filter(row_errors).append_column(
+        QUARANTINE_REASON_COLUMN, reasons
+    )
+    return _to_pandas(table.filter(pc.invert(row_errors))), quarantine
+
+
+def _safe_cast(values, type):
+    # 変換できない値をnullにして変換し、変換できなかった位置も返す
+    casted = pa.chunked_array(
+        [_cast_chunk(chunk, type) for chunk in values.chunks], type
+    )
+    return casted, pc.and_(pc.is_null(casted), pc.is_valid(values))
+
+
+def _cast_chunk(values, type):
+    # ほとんどのブロックは全ての値を変換できるため、まずそのまま変換する
+    try:
+        return pc.cast(values, type)
+    except pa.ArrowInvalid:
+        pass
+    if pa.types.is_integer(type) or pa.types.is_floating(type):
+        # 解析時の変換と同じく前後の空白と先頭の+を許容し、数値の形式でない値は
+        # 正規表現でまとめて除外する
+        values = pc.replace_substring_regex(pc.utf8_trim_whitespace(values), r"^\+", "")
+        pattern = INTEGER_PATTERN if pa.types.is_integer(type) else FLOAT_PATTERN
+        values = pc.if_else(pc.match_substring_regex(values, pattern), values, None)
+    return _bisect_cast(values, type)
+
+
+def _bisect_cast(values, type):
+    # 桁あふれなど正規表現で除外できない値は、二分して変換できない値だけをnullにする
+    try:
+        return pc.cast(values, type)
+    except pa.ArrowInvalid:
+        if len(values) == 1:
+            return pa.nulls(1, type)
+        middle = len(values) // 2
+        return pa.concat_arrays(
+            [
+                _bisect_cast(values[:middle], type),
+                _bisect_cast(values[middle:], type),
+            ]
+        )
+
+
+def _header_line(column_names):
+    line = io.StringIO()
+    csv.writer(line, lineterminator="\n").writerow(column_names)
+    return line.getvalue().encode("utf-8")
+
+
+def _format_column(values, timestamp_format=None):
+    # pandasのto_csvと同じ形式の文字列にする(欠損値は空文字列)
+    if pa.types.is_floating(values.type):
+        # pandasと同じくnumpyで変換する(4.0は"4.0"、0.00001は"1e-05")
+        numbers = values.to_numpy(zero_copy_only=False)
+        strings = numbers.astype(str)
+        strings[np.isnan(numbers)] = ""
+        return pa.array(strings, pa.string())
+    if timestamp_format is not None:
+        unit, time_format = timestamp_format
+        strings = pc.strftime(pc.cast(values, pa.timestamp(unit)), time_format)
+    elif pa.types.is_boolean(values.type):
+        strings = pc.if_else(values, "True", "False")
+    elif pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+        # クォートが必要な値だけをクォートする(csv.QUOTE_MINIMAL)
+        values = pc.cast(values, pa.string())
+        quoted = pc.binary_join_element_wise(
+            '"', pc.replace_substring(values, '"', '""'), '"', ""
+        )
+        needs_quoting = pc.match_substring_regex(values, NEEDS_QUOTING_PATTERN)
+        strings = pc.if_else(needs_quoting, quoted, values)
+    else:
+        strings = pc.cast(values, pa.string())
+    return pc.fill_null(pc.cast(strings, pa.string()), "")
+
+
+def _timestamp_format(values):
+    # pandas(datetime64)と同じく、列の全ての値を表せる最も短い形式にする
+    # (日付だけ・秒まで・ミリ秒・マイクロ秒・型の単位)。pyarrowの%Sは型の単位の
+    # 桁数まで小数を出力するため、形式に合わせた単位に変換してから出力する
+    for floor_unit, unit, time_format in [
+        ("day", "s", "%Y-%m-%d"),
+        ("second", "s", "%Y-%m-%d %H:%M:%S"),
+        ("millisecond", "ms", "%Y-%m-%d %H:%M:%S"),
+        ("microsecond", "us", "%Y-%m-%d %H:%M:%S"),
+    ]:
+        floored = pc.floor_temporal(values, unit=floor_unit)
+        if pc.all(pc.equal(values, floored)).as_py() is not False:
+            return unit, time_format
+    return values.type.unit, "%Y-%m-%d %H:%M:%S"
+
+
+def _write_rows(writer, table):
+    # バッチごとに行の文字列を作り、連結したバイト列をそのまま書き込む
+    # (日時の形式は、pandasと同じく列全体で1つに決める)
+    timestamp_formats = [
+        _timestamp_format(column)
+        if pa.types.is_timestamp(column.type) and column.type.tz is None
+        else None
+        for column in table.columns
+    ]
+    for batch in table.to_batches(max_chunksize=WRITE_BATCH_ROWS):
+        if batch.num_rows == 0:
+            continue
+        columns = [
+            _format_column(column, timestamp_format)
+            for column, timestamp_format in zip(batch.columns, timestamp_formats)
+        ]
+        if len(columns) == 1:
+            # 1列の場合、空の値は空行と区別するためにクォートする(csvモジュールと同じ)
+            columns[0] = pc.if_else(pc.equal(columns[0], ""), '""', columns[0])
+        lines = pc.binary_join_element_wise(
+            pc.binary_join_element_wise(*columns, ","), "", "\n"
+        )
+        offsets = np.frombuffer(lines.buffers()[1], np.int32)
+        offsets = offsets[lines.offset : lines.offset + len(lines) + 1]
+        writer.write(lines.buffers()[2][offsets[0] : offsets[-1]])
+
+
+class S3MultipartWriter:
+    """
+    書き込んだバイト列をパートサイズごとにマルチパートアップロードする
+
+    全体がパートサイズ未満の場合はput_objectでアップロードし、
+    例外が発生した場合はアップロードを中止する
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=DEFAULT_PART_SIZE):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.bytes_written = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_written += len(data)
+        if len(self.buffer) >= self.part_size:
+            self._upload_part()
+        return len(data)
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key
+            )
+            self.upload_id = response["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=self.buffer,
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self.buffer = bytearray()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.upload_id is None:
+            self.s3_client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer)
+            )
+            self.buffer = bytearray()
+            return
+        if self.buffer:
+            self._upload_part()
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+
+    def abort(self):
+        self.closed = True
+        if self.upload_id is not None:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+            )
+        self.buffer = bytearray()
+
+
+def write_csv_to_s3(s3_client, df, bucket, key, part_size=DEFAULT_PART_SIZE):
+    """
+    データフレームをCSVに変換しながらS3にマルチパートアップロードする
+
+    pyarrowでバッチごとにバイト列へ変換して書き込むため、
+    出力全体を文字列やバッファとして保持しない。
+    値の形式とクォートはpandasのto_csv(index=False)と同じになる
+
+    :param s3_client: S3のクライアント
+    :param df: pd.DataFrame : 出力するデータフレーム
+    :param bucket: str : バケット名
+    :param key: str : キー
+    :param part_size: int : マルチパートアップロードのパートサイズ
+    :return: int : 出力したバイト数
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with S3MultipartWriter(s3_client, bucket, key, part_size) as writer:
+        writer.write(_header_line(table.column_names))
+        _write_rows(writer, table)
+    return writer.bytes_written
+
+
+class RollingCsvWriter:
+    """
+    複数のテーブルを1つのCSVにまとめて出力し、target_sizeを超えたら次のファイルに切り替える
+
+    列名が前のテーブルと異なる場合も次のファイルに切り替える。
+    出力したファイルと、そのファイルに含まれる項目(write時に渡したitem)は
+    filesに記録する。アップロードに失敗したファイルはerrorにメッセージを記録し、
+    そのファイルに含まれる項目は全て失敗として扱う
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket,
+        key_format,
+        target_size=DEFAULT_TARGET_FILE_SIZE,
+        part_size=DEFAULT_PART_SIZE,
+    ):
+        """
+        :param s3_client: S3のクライアント
+        :param bucket: str : 出力先のバケット名
+        :param key_format: str : 出力先のキー({index}にファイルの連番が入る)
+        :param target_size: int : 1ファイルあたりの目安のサイズ(バイト)
+        :param part_size: int : マルチパートアップロードのパートサイズ
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key_format = key_format
+        self.target_size = target_size
+        self.part_size = part_size
+        self.files = []
+        self._writer = None
+        self._column_names = None
+        self._items = []
+
+    def write(self, table, item):
+        """
+        テーブルを現在のファイルに追記する
+
+        :param table: pa.Table : 出力するテーブル
+        :param item: 出力したファイルと対応づける項目
+        """
+        if self._writer is not None and table.column_names != self._column_names:
+            self._finish()
+        if self._writer is None:
+            key = self.key_format.format(index=len(self.files))
+            self._writer = S3MultipartWriter(
+                self.s3_client, self.bucket, key, self.part_size
+            )
+            self._column_names = table.column_names
+        self._items.append(item)
+        try:
+            if self._writer.bytes_written == 0:
+                self._writer.write(_header_line(table.column_names))
+            _write_rows(self._writer, table)
+        except Exception as e:
+            self._fail(e)
+            return
+        if self._writer.bytes_written >= self.target_size:
+            self._finish()
+
+    def close(self):
+        if self._writer is not None:
+            self._finish()
+
+    def _finish(self):
+        writer, items = self._writer, self._items
+        try:
+            writer.close()
+        except Exception as e:
+            self._fail(e)
+            return
+        self.files.append({"key": writer.key, "items": items, "error": None})
+        self._writer = None
+        self._items = []
+
+    def _fail(self, error):
+        writer, items = self._writer, self._items
+        self._writer = None
+        self._items = []
+        try:
+            writer.abort()
+        finally:
+            self.files.append({"key": writer.key, "items": items, "error": str(error)})
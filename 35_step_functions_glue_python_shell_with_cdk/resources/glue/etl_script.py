@@ -1,12 +1,18 @@
 import sys
 import traceback
 from datetime import datetime
-from io import StringIO
 from zoneinfo import ZoneInfo
 
 import boto3
-import pandas as pd
+import pyarrow as pa
 from awsglue.utils import getResolvedOptions
+from csv_io import ColumnSpec, read_csv_with_schema, write_csv_to_s3
+
+# 入力ファイルのスキーマ(型は解析時に指定し、満たさない行は隔離用のCSVに出力する)
+ZOO_SCHEMA = {
+    "name": ColumnSpec(pa.string()),
+    "arrival_year": ColumnSpec(pa.int64(), nullable=False),
+}
 
 
 def main():
@@ -29,30 +35,37 @@ def main():
         # Boto3クライアントの初期化
         s3_client = boto3.client("s3")
 
-        # S3からCSVファイルを読み込む
-        response = s3_client.get_object(Bucket=s3_input_bucket, Key=s3_input_key)
-        input_data = pd.read_csv(response["Body"])
+        # S3からCSVファイルをスキーマの型で読み込む(列はArrow型のまま保持する)
+        input_data, quarantine = read_csv_with_schema(
+            s3_client, s3_input_bucket, s3_input_key, ZOO_SCHEMA
+        )
 
         # 動物園に来てからの年数を計算して新しい列に追加
         current_year = datetime.now(ZoneInfo("Asia/Tokyo")).year
         input_data["years_in_zoo"] = current_year - input_data["arrival_year"]
 
-        # Pandas DataFrameをCSV文字列に変換
-        output_csv = input_data.to_csv(index=False)
-        output_file = StringIO(output_csv)
-
         current_time = datetime.now(ZoneInfo("Asia/Tokyo")).strftime(
             "%Y-%m-%d-%H-%M-%S"
         )
         # 現在の日時を取得し、ファイル名を生成
         output_filename = f"{s3_output_key}output_{current_time}.csv"
 
-        # 加工後のCSVをS3に保存
-        s3_client.put_object(
-            Bucket=s3_output_bucket,
-            Key=output_filename,
-            Body=output_file.getvalue(),
-        )
+        # スキーマを満たさない行は、ジョブを失敗させずに隔離用のCSVに出力
+        if quarantine.num_rows:
+            quarantine_filename = f"quarantine/output_{current_time}.csv"
+            write_csv_to_s3(
+                s3_client,
+                quarantine.to_pandas(),
+                s3_output_bucket,
+                quarantine_filename,
+            )
+            print(
+                f"Quarantined {quarantine.num_rows} rows to "
+                f"{s3_output_bucket}/{quarantine_filename}"
+            )
+
+        # 加工後のCSVを文字列に変換せず、バイト列のままS3に保存
+        write_csv_to_s3(s3_client, input_data, s3_output_bucket, output_filename)
     except Exception as e:
         tb = traceback.format_exc()
         print(f"Unexpected error: {str(e)}\nTraceback: {tb}")
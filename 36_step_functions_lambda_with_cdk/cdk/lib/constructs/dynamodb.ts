@@ -0,0 +1,24 @@
+import * as cdk from 'aws-cdk-lib';
+import { AttributeType, BillingMode, Table } from 'aws-cdk-lib/aws-dynamodb';
+import { Construct } from 'constructs';
+
+export interface DynamoDbConstructProps {
+  envName: string;
+  projectName: string;
+}
+
+export class DynamoDbConstruct extends Construct {
+  public readonly ledgerTable: Table;
+  constructor(scope: Construct, id: string, props: DynamoDbConstructProps) {
+    super(scope, id);
+
+    // 処理済みの入力ファイル(バケット/キー@ETag)を記録し、重複したイベントをスキップする
+    this.ledgerTable = new Table(this, 'LedgerTable', {
+      tableName: `${props.projectName}-${props.envName}-processed-objects`,
+      partitionKey: { name: 'object_id', type: AttributeType.STRING },
+      billingMode: BillingMode.PAY_PER_REQUEST,
+      timeToLiveAttribute: 'expires_at',
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+  }
+}
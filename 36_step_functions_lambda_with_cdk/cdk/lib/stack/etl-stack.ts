@@ -1,5 +1,6 @@
 import * as cdk from 'aws-cdk-lib';
 import type { Construct } from 'constructs';
+import { DynamoDbConstruct } from '../constructs/dynamodb';
 import { EventBridgeConstruct, type EventBridgeConstructProps } from '../constructs/eventbridge';
 import { LambdaConstruct, type LambdaConstructProps } from '../constructs/lambda';
 import { S3Construct } from '../constructs/s3';
@@ -20,11 +21,16 @@ export class ETLStack extends cdk.Stack {
       envName: props.envName,
       projectName: props.projectName,
     });
+    const dynamoDbConstruct = new DynamoDbConstruct(this, 'DynamoDb', {
+      envName: props.envName,
+      projectName: props.projectName,
+    });
     const lambdaConstruct = new LambdaConstruct(this, 'Lambda', {
       envName: props.envName,
       projectName: props.projectName,
       dataSourceBucketName: s3Construct.dataSourceBucket.bucketName,
       dataStoreBucketName: s3Construct.dataStoreBucket.bucketName,
+      ledgerTableName: dynamoDbConstruct.ledgerTable.tableName,
     } as LambdaConstructProps);
 
     const stepFunctionsConstruct = new StepFunctionsConstruct(this, 'StepFunctions', {
@@ -0,0 +1,188 @@
+"""
+etl_handlerのCSVの読み書きの処理時間とピークメモリ(RSS)を比較するベンチマーク
+
+ローカルで起動したmoto server(HTTP)に動物園のCSVを置き、新しいプロセスで
+以下の処理(読み込み・years_in_zooの追加・書き込み)を実行する
+
+- legacy: pd.read_csv -> to_csvで文字列に変換 -> StringIO -> put_object(従来の処理)
+- arrow: lib.csv_io(pyarrowで読み込み、バイト列のままマルチパートアップロード)
+
+実行方法(moto[server]が必要):
+    cd resources
+    python benchmarks/bench_csv_io.py --size-mb 1024
+"""
+
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+import boto3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "lambda"))
+
+from lib.csv_io import read_csv_from_s3, write_csv_to_s3
+
+BUCKET = "bench-bucket"
+INPUT_KEY = "input/zoo.csv"
+REGION = "us-east-1"
+SPECIES = ["lion", "tiger", "panda", "elephant", "giraffe", "penguin", "koala"]
+
+
+def make_csv(path, size_mb, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = 1_000_000
+    with pa_csv.CSVWriter(
+        path,
+        pa.schema(
+            [
+                ("id", pa.int64()),
+                ("name", pa.string()),
+                ("species", pa.string()),
+                ("arrival_year", pa.int64()),
+                ("weight", pa.float64()),
+            ]
+        ),
+        write_options=pa_csv.WriteOptions(quoting_style="none"),
+    ) as writer:
+        start = 0
+        while os.path.getsize(path) < size_mb * 1024 * 1024:
+            writer.write_table(
+                pa.table(
+                    {
+                        "id": np.arange(start, start + rows),
+                        "name": pd.Series(rng.integers(0, 100_000, rows))
+                        .map("animal_{}".format)
+                        .to_numpy(),
+                        "species": rng.choice(SPECIES, rows),
+                        "arrival_year": rng.integers(1990, 2025, rows),
+                        "weight": rng.random(rows).round(3) * 1000,
+                    }
+                )
+            )
+            start += rows
+    return start
+
+
+def start_moto_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-p", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    endpoint_url = f"http://127.0.0.1:{port}"
+    client = make_client(endpoint_url)
+    for _ in range(100):
+        try:
+            client.create_bucket(Bucket=BUCKET)
+            return server, endpoint_url
+        except Exception:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("moto server did not start")
+
+
+def make_client(endpoint_url):
+    return boto3.client("s3", region_name=REGION, endpoint_url=endpoint_url)
+
+
+def run_legacy(s3_client, output_key):
+    response = s3_client.get_object(Bucket=BUCKET, Key=INPUT_KEY)
+    input_data = pd.read_csv(response["Body"])
+    current_year = datetime.now(ZoneInfo("Asia/Tokyo")).year
+    input_data["years_in_zoo"] = current_year - input_data["arrival_year"]
+    output_csv = input_data.to_csv(index=False)
+    output_file = StringIO(output_csv)
+    s3_client.put_object(Bucket=BUCKET, Key=output_key, Body=output_file.getvalue())
+
+
+def run_arrow(s3_client, output_key):
+    input_data = read_csv_from_s3(s3_client, BUCKET, INPUT_KEY)
+    current_year = datetime.now(ZoneInfo("Asia/Tokyo")).year
+    input_data["years_in_zoo"] = current_year - input_data["arrival_year"]
+    write_csv_to_s3(s3_client, input_data, BUCKET, output_key)
+
+
+MODES = {"legacy": run_legacy, "arrow": run_arrow}
+
+
+def child(mode, endpoint_url):
+    s3_client = make_client(endpoint_url)
+    start = time.perf_counter()
+    MODES[mode](s3_client, f"output/{mode}.csv")
+    elapsed = time.perf_counter() - start
+    # Linuxのru_maxrssはKiB単位
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(json.dumps({"elapsed": elapsed, "peak_rss": peak_rss}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--mode", choices=list(MODES), help=argparse.SUPPRESS)
+    parser.add_argument("--endpoint-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    if args.mode:
+        child(args.mode, args.endpoint_url)
+        return
+
+    server, endpoint_url = start_moto_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "zoo.csv")
+            rows = make_csv(path, args.size_mb)
+            size = os.path.getsize(path)
+            make_client(endpoint_url).upload_file(path, BUCKET, INPUT_KEY)
+        print(f"input: {rows:,} rows, {size / 1024 / 1024:,.0f} MiB")
+        results = {}
+        for mode in MODES:
+            process = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--mode",
+                    mode,
+                    "--endpoint-url",
+                    endpoint_url,
+                ],
+                stdout=subprocess.PIPE,
+            )
+            if process.returncode != 0:
+                # メモリ不足で強制終了された場合など
+                print(f"{mode:>6}: failed (exit code {process.returncode})")
+                continue
+            results[mode] = json.loads(process.stdout.decode("utf-8").splitlines()[-1])
+            print(
+                f"{mode:>6}: {results[mode]['elapsed']:.1f}s, "
+                f"peak RSS {results[mode]['peak_rss'] / 1024 / 1024:,.0f} MiB"
+            )
+        if len(results) == len(MODES):
+            legacy, arrow = results["legacy"], results["arrow"]
+            print(
+                f"speedup: {legacy['elapsed'] / arrow['elapsed']:.1f}x, "
+                f"peak RSS: {arrow['peak_rss'] / legacy['peak_rss']:.0%} of legacy"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+スキーマの型を解析時に指定する読み込みと、型を推定してから検証する読み込みの
+処理時間を比較するベンチマーク
+
+motoでモックしたS3に動物園のCSVを置き、読み込みとスキーマの検証
+(型に合わない値・欠損値を含む行の分離)を行う
+
+- pandas: pd.read_csvで型を推定 -> pd.to_numericで変換して検証
+- arrow: read_csv_from_s3(pyarrow)で型を推定 -> pd.to_numericで変換して検証
+- schema: read_csv_with_schema(解析時に型を指定し、まとめて検証)
+
+入力は全ての値が正しいファイル(clean)と、末尾に型に合わない行が1行ある
+ファイル(dirty)の2種類
+
+実行方法(motoが必要):
+    cd resources
+    python benchmarks/bench_schema.py --size-mb 256
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import boto3
+import pandas as pd
+import pyarrow as pa
+from moto import mock_s3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "lambda"))
+
+from bench_csv_io import make_csv
+from lib.csv_io import ColumnSpec, read_csv_from_s3, read_csv_with_schema
+
+BUCKET = "bench-bucket"
+REGION = "us-east-1"
+SCHEMA = {
+    "id": ColumnSpec(pa.int64(), nullable=False),
+    "name": ColumnSpec(pa.string()),
+    "species": ColumnSpec(pa.string()),
+    "arrival_year": ColumnSpec(pa.int64(), nullable=False),
+    "weight": ColumnSpec(pa.float64()),
+}
+NUMERIC_COLUMNS = ["id", "arrival_year", "weight"]
+NOT_NULL_COLUMNS = ["id", "arrival_year"]
+
+
+def validate_post_hoc(df):
+    # 推定された型が数値でない列を変換し、変換できない値・欠損値を含む行を分離する
+    invalid = pd.Series(False, index=df.index)
+    for name in NUMERIC_COLUMNS:
+        values = pd.to_numeric(df[name], errors="coerce")
+        invalid |= values.isna() & df[name].notna()
+        if name in NOT_NULL_COLUMNS:
+            invalid |= values.isna()
+        df[name] = values
+    valid = df[~invalid].astype({name: "int64" for name in NOT_NULL_COLUMNS})
+    return valid, df[invalid]
+
+
+def run_pandas(s3_client, key):
+    body = s3_client.get_object(Bucket=BUCKET, Key=key)["Body"]
+    return validate_post_hoc(pd.read_csv(body))
+
+
+def run_arrow(s3_client, key):
+    return validate_post_hoc(read_csv_from_s3(s3_client, BUCKET, key))
+
+
+def run_schema(s3_client, key):
+    return read_csv_with_schema(s3_client, BUCKET, key, SCHEMA)
+
+
+MODES = {"pandas": run_pandas, "arrow": run_arrow, "schema": run_schema}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    # pandasのArrow型の変換で出力される警告(結果には影響しない)を表示しない
+    warnings.filterwarnings("ignore", category=RuntimeWarning)
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+    with mock_s3():
+        s3_client = boto3.client("s3", region_name=REGION)
+        s3_client.create_bucket(Bucket=BUCKET)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "zoo.csv")
+            rows = make_csv(path, args.size_mb)
+            s3_client.upload_file(path, BUCKET, "clean.csv")
+            with open(path, "a") as f:
+                f.write(f"{rows},animal_bad,lion,unknown,1.0\n")
+            s3_client.upload_file(path, BUCKET, "dirty.csv")
+        print(f"input: {rows:,} rows, {args.size_mb:,} MiB")
+
+        for key in ["clean.csv", "dirty.csv"]:
+            results = {}
+            for mode, run in MODES.items():
+                times = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    valid, quarantine = run(s3_client, key)
+                    times.append(time.perf_counter() - start)
+                    del valid, quarantine
+                results[mode] = min(times)
+            print(
+                f"{key:>9}: "
+                + ", ".join(f"{mode} {t:.2f}s" for mode, t in results.items())
+                + f" (schema is {results['pandas'] / results['schema']:.1f}x"
+                f" faster than pandas, {results['arrow'] / results['schema']:.1f}x"
+                " faster than arrow)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,97 @@
 import os
 import traceback
 from datetime import datetime
-from io import StringIO
 from zoneinfo import ZoneInfo
 
 import boto3
-import pandas as pd
+import pyarrow as pa
+from botocore.config import Config
+from lib.batch import (
+    DEFAULT_MAX_WORKERS,
+    failed_item_ids,
+    is_batch_event,
+    parse_batch_event,
+    plan_batches,
+    process_batch,
+    resolve_etags,
+)
+from lib.csv_io import (
+    DEFAULT_TARGET_FILE_SIZE,
+    ColumnSpec,
+    read_csv_with_schema,
+    write_csv_to_s3,
+)
 from lib.get_logger import GetLogger
+from lib.ledger import (
+    DEFAULT_TTL_DAYS,
+    DynamoDbLedger,
+    MemoryLedger,
+    object_id,
+    output_key_for,
+)
 
 get_logger = GetLogger(__name__)
 logger = get_logger.logger
 
+# Boto3クライアントはハンドラの外で初期化し、ウォームスタート時は
+# 認証情報の解決とTLS接続を再利用する
+client_config = Config(
+    retries={"max_attempts": 10, "mode": "adaptive"}, tcp_keepalive=True
+)
+s3_client = boto3.client("s3", config=client_config)
+
+# 処理済みの入力ファイルの記録(LEDGER_TABLE_NAMEがない場合はメモリ上に記録する)
+if os.getenv("LEDGER_TABLE_NAME"):
+    ledger = DynamoDbLedger(
+        boto3.client("dynamodb", config=client_config),
+        os.environ["LEDGER_TABLE_NAME"],
+        int(os.getenv("LEDGER_TTL_DAYS", DEFAULT_TTL_DAYS)),
+    )
+else:
+    ledger = MemoryLedger()
+
+# 入力ファイルのスキーマ(型は解析時に指定し、満たさない行は隔離用のCSVに出力する)
+ZOO_SCHEMA = {
+    "name": ColumnSpec(pa.string()),
+    "arrival_year": ColumnSpec(pa.int64(), nullable=False),
+}
+
+
+def read_zoo_csv(bucket, key, etag):
+    """
+    入力ファイルをZOO_SCHEMAの型で読み込む
+
+    スキーマを満たさない行はS3_QUARANTINE_KEY_PREFIX(デフォルトはquarantine/)の
+    CSVに出力し、残りの行のみ返す
+    """
+    input_data, quarantine = read_csv_with_schema(s3_client, bucket, key, ZOO_SCHEMA)
+    if quarantine.num_rows:
+        quarantine_key = output_key_for(
+            os.getenv("S3_QUARANTINE_KEY_PREFIX", "quarantine/"), bucket, key, etag
+        )
+        write_csv_to_s3(
+            s3_client,
+            quarantine.to_pandas(),
+            os.environ["S3_OUTPUT_BUCKET"],
+            quarantine_key,
+        )
+        logger.warning(
+            f"Quarantined {quarantine.num_rows} rows of {bucket}/{key} "
+            f"to {quarantine_key}"
+        )
+    return input_data
+
+
+def add_years_in_zoo(input_data):
+    # 動物園に来てからの年数を計算して新しい列に追加
+    current_year = datetime.now(ZoneInfo("Asia/Tokyo")).year
+    input_data["years_in_zoo"] = current_year - input_data["arrival_year"]
+    return input_data
+
 
 def main(event, context):
+    if is_batch_event(event):
+        return main_batch(event, context)
     try:
         # ジョブから渡されたパラメータを使用
         s3_input_bucket = event["detail"]["bucket"]["name"]
@@ -21,33 +100,35 @@ def main(event, context):
         s3_output_key = os.environ["S3_OUTPUT_KEY_PREFIX"]
         logger.info(f"s3_input_bucket:{s3_input_bucket}")
         logger.info(f"s3_input_key:{s3_input_key}")
-        # Boto3クライアントの初期化
-        s3_client = boto3.client("s3")
 
-        # S3からCSVファイルを読み込む
-        response = s3_client.get_object(Bucket=s3_input_bucket, Key=s3_input_key)
-        input_data = pd.read_csv(response["Body"])
+        # EventBridgeの再配信などで処理済みの入力ファイルの場合はスキップ
+        s3_input_etag = event["detail"]["object"].get("etag")
+        if s3_input_etag is None:
+            s3_input_etag = s3_client.head_object(
+                Bucket=s3_input_bucket, Key=s3_input_key
+            )["ETag"]
+        input_id = object_id(s3_input_bucket, s3_input_key, s3_input_etag)
+        processed_key = ledger.get(input_id)
+        if processed_key is not None:
+            logger.info(f"Skipped {input_id}: already processed to {processed_key}")
+            return {
+                "statusCode": 200,
+                "body": f"Skipped {input_id}: already processed to {processed_key}",
+            }
 
-        # 動物園に来てからの年数を計算して新しい列に追加
-        current_year = datetime.now(ZoneInfo("Asia/Tokyo")).year
-        input_data["years_in_zoo"] = current_year - input_data["arrival_year"]
+        # S3からCSVファイルを読み込む(列はArrow型のまま保持する)
+        input_data = read_zoo_csv(s3_input_bucket, s3_input_key, s3_input_etag)
 
-        # Pandas DataFrameをCSV文字列に変換
-        output_csv = input_data.to_csv(index=False)
-        output_file = StringIO(output_csv)
+        input_data = add_years_in_zoo(input_data)
 
-        current_time = datetime.now(ZoneInfo("Asia/Tokyo")).strftime(
-            "%Y-%m-%d-%H-%M-%S"
-        )
-        # 現在の日時を取得し、ファイル名を生成
-        output_filename = f"{s3_output_key}output_{current_time}.csv"
-
-        # 加工後のCSVをS3に保存
-        s3_client.put_object(
-            Bucket=s3_output_bucket,
-            Key=output_filename,
-            Body=output_file.getvalue(),
+        # 入力のキーとETagからファイル名を生成(同じ入力からは同じファイル名になる)
+        output_filename = output_key_for(
+            s3_output_key, s3_input_bucket, s3_input_key, s3_input_etag
         )
+
+        # 加工後のCSVを文字列に変換せず、バイト列のままS3に保存
+        write_csv_to_s3(s3_client, input_data, s3_output_bucket, output_filename)
+        ledger.mark(input_id, output_filename)
         logger.info(f"Successful put {s3_output_bucket}/{output_filename}")
         return {
             "statusCode": 200,
@@ -57,3 +138,91 @@ def main(event, context):
         tb = traceback.format_exc()
         logger.error(f"Unexpected error: {str(e)}\nTraceback: {tb}")
         raise e
+
+
+def main_batch(event, context):
+    """
+    SQSのバッチ、またはStep FunctionsのMap(ItemBatcher)で渡された複数ファイルを処理する
+
+    入力を並列に読み込み、BATCH_TARGET_FILE_SIZE_MBごとのCSVにまとめて出力する。
+    SQSの場合は失敗したメッセージをbatchItemFailuresで返し、そのメッセージのみ
+    再試行させる(ReportBatchItemFailuresを有効にする)。Mapの場合はファイルごとの
+    成功・失敗を返す。処理済みの入力ファイルはスキップし、成功として返す
+    """
+    try:
+        s3_output_bucket = os.environ["S3_OUTPUT_BUCKET"]
+        s3_output_key = os.environ["S3_OUTPUT_KEY_PREFIX"]
+        max_workers = int(os.getenv("BATCH_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+        target_size = int(
+            os.getenv("BATCH_TARGET_FILE_SIZE_MB", DEFAULT_TARGET_FILE_SIZE // 2**20)
+        ) * (2**20)
+        items, invalid = parse_batch_event(event)
+        logger.info(f"batch size:{len(items)}")
+
+        items, results = resolve_etags(s3_client, items, max_workers)
+        pending = []
+        for item in items:
+            processed_key = ledger.get(object_id(item.bucket, item.key, item.etag))
+            if processed_key is None:
+                pending.append(item)
+                continue
+            logger.info(f"Skipped {item.bucket}/{item.key}: already processed")
+            results.append({"item": item, "output": processed_key, "error": None})
+
+        # 未処理の入力ファイルからファイル名を生成し、出力する前に台帳に予約する
+        # (再試行でバッチの組み合わせが変わっても、予約したファイル名で出力し直す)
+        outputs = {}
+        for key_format, members in plan_batches(ledger, pending, s3_output_key):
+            processed = process_batch(
+                s3_client,
+                members,
+                add_years_in_zoo,
+                s3_output_bucket,
+                key_format,
+                target_size,
+                max_workers,
+                read=lambda item: read_zoo_csv(item.bucket, item.key, item.etag),
+            )
+            for result in processed:
+                item = result["item"]
+                input_id = object_id(item.bucket, item.key, item.etag)
+                if not result["error"]:
+                    ledger.mark(input_id, result["output"])
+                outputs[input_id] = result
+        for item in pending:
+            input_id = object_id(item.bucket, item.key, item.etag)
+            result = outputs.get(input_id)
+            if result is None:
+                # 別の実行で処理済みになった入力ファイル
+                result = {"output": ledger.get(input_id), "error": None}
+            results.append({**result, "item": item})
+    except Exception as e:
+        tb = traceback.format_exc()
+        logger.error(f"Unexpected error: {str(e)}\nTraceback: {tb}")
+        raise e
+
+    succeeded = []
+    failed = []
+    for failure in invalid:
+        logger.error(f"Failed {failure['item_id']}: {failure['error']}")
+        failed.append(failure)
+    for result in results:
+        item = result["item"]
+        if result["error"]:
+            logger.error(f"Failed {item.bucket}/{item.key}: {result['error']}")
+            failed.append(
+                {"bucket": item.bucket, "key": item.key, "error": result["error"]}
+            )
+        else:
+            succeeded.append(
+                {"bucket": item.bucket, "key": item.key, "output": result["output"]}
+            )
+    logger.info(f"succeeded:{len(succeeded)} failed:{len(failed)}")
+    if "Records" in event:
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": item_id}
+                for item_id in failed_item_ids(results, invalid)
+            ]
+        }
+    return {"statusCode": 200, "succeeded": succeeded, "failed": failed}
@@ -0,0 +1,215 @@
+import hashlib
+import posixpath
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# 処理済みの記録を保持する日数(DynamoDBのTTLで削除する)
+DEFAULT_TTL_DAYS = 30
+
+
+def object_id(bucket, key, etag):
+    """
+    入力ファイルの内容を識別するID(同じキーでも内容が変われば別のIDになる)
+
+    :param bucket: str : バケット名
+    :param key: str : キー
+    :param etag: str : ETag(前後のダブルクォートは除く)
+    :return: str : ID
+    """
+    etag = etag.strip('"')
+    return f"{bucket}/{key}@{etag}"
+
+
+def parse_object_id(value):
+    """
+    object_idからバケット名・キー・ETagを取り出す
+
+    :param value: str : object_idで作成したID
+    :return: tuple : (バケット名, キー, ETag)
+    """
+    bucket, rest = value.split("/", 1)
+    key, etag = rest.rsplit("@", 1)
+    return bucket, key, etag
+
+
+def _digest(*values):
+    return hashlib.sha256("\n".join(values).encode("utf-8")).hexdigest()[:16]
+
+
+def output_key_for(prefix, bucket, key, etag):
+    """
+    入力ファイルから決まる出力先のキー
+
+    同じ入力(キーとETag)からは常に同じキーになるため、重複して処理しても
+    同じファイルを上書きするだけになる
+
+    :param prefix: str : 出力先のキーのプレフィックス
+    :param bucket: str : 入力のバケット名
+    :param key: str : 入力のキー
+    :param etag: str : 入力のETag
+    :return: str : 出力先のキー
+    """
+    stem = posixpath.splitext(posixpath.basename(key))[0]
+    return f"{prefix}output_{stem}_{_digest(object_id(bucket, key, etag))}.csv"
+
+
+def batch_key_format(prefix, object_ids):
+    """
+    複数の入力をまとめて出力する場合の出力先のキー({index}にファイルの連番が入る)
+
+    :param prefix: str : 出力先のキーのプレフィックス
+    :param object_ids: list : 入力ファイルのIDのリスト
+    :return: str : 出力先のキーのフォーマット
+    """
+    return f"{prefix}output_batch_{_digest(*sorted(object_ids))}_{{index:04d}}.csv"
+
+
+class DynamoDbLedger:
+    """
+    処理済みの入力ファイルをDynamoDBのテーブルに記録する
+
+    テーブルのパーティションキーはobject_id(文字列)、TTLの属性はexpires_at。
+    複数の入力をまとめて出力する場合は、出力先のキーのフォーマットをobject_idとして
+    入力ファイルのIDのリスト(members)も記録する
+    """
+
+    def __init__(self, dynamodb_client, table_name, ttl_days=DEFAULT_TTL_DAYS):
+        self.dynamodb_client = dynamodb_client
+        self.table_name = table_name
+        self.ttl_days = ttl_days
+
+    def _get_item(self, object_id):
+        response = self.dynamodb_client.get_item(
+            TableName=self.table_name,
+            Key={"object_id": {"S": object_id}},
+            ConsistentRead=True,
+        )
+        return response.get("Item", {})
+
+    def _expires_at(self):
+        return {"N": str(int(time.time()) + self.ttl_days * 24 * 60 * 60)}
+
+    def get(self, object_id):
+        """
+        処理済みの場合は出力先のキーを返し、未処理の場合はNoneを返す
+        """
+        output_key = self._get_item(object_id).get("output_key")
+        return output_key["S"] if output_key else None
+
+    def planned_key(self, object_id):
+        """
+        reserveで予約した出力先のキーのフォーマットを返す(予約していない場合はNone)
+        """
+        planned_key = self._get_item(object_id).get("planned_key")
+        return planned_key["S"] if planned_key else None
+
+    def reserve(self, object_ids, key_format):
+        """
+        まとめて出力する入力ファイルと出力先のキーのフォーマットを、出力する前に記録する
+
+        入力ファイルのIDのリストを記録してから、入力ファイルごとに条件付きで予約する。
+        既に予約されている入力ファイルは除き、予約できた入力ファイルのIDのリストを返す
+        """
+        self.dynamodb_client.put_item(
+            TableName=self.table_name,
+            Item={
+                "object_id": {"S": key_format},
+                "members": {"L": [{"S": object_id} for object_id in object_ids]},
+                "expires_at": self._expires_at(),
+            },
+        )
+        reserved = []
+        for object_id in object_ids:
+            try:
+                self.dynamodb_client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        "object_id": {"S": object_id},
+                        "planned_key": {"S": key_format},
+                        "expires_at": self._expires_at(),
+                    },
+                    ConditionExpression="attribute_not_exists(object_id)",
+                )
+            except self.dynamodb_client.exceptions.ConditionalCheckFailedException:
+                continue
+            reserved.append(object_id)
+        return reserved
+
+    def members(self, key_format):
+        """
+        出力先のキーのフォーマットで予約した入力ファイルのIDのリスト(予約した順)
+        """
+        members = self._get_item(key_format).get("members", {"L": []})["L"]
+        object_ids = [member["S"] for member in members]
+        return [i for i in object_ids if self.planned_key(i) == key_format]
+
+    def mark(self, object_id, output_key):
+        """
+        処理済みとして記録する。既に記録されている場合はFalseを返す
+        """
+        try:
+            self.dynamodb_client.update_item(
+                TableName=self.table_name,
+                Key={"object_id": {"S": object_id}},
+                UpdateExpression=(
+                    "SET output_key = :output_key, processed_at = :processed_at, "
+                    "expires_at = :expires_at"
+                ),
+                ConditionExpression="attribute_not_exists(output_key)",
+                ExpressionAttributeValues={
+                    ":output_key": {"S": output_key},
+                    ":processed_at": {
+                        "S": datetime.now(ZoneInfo("Asia/Tokyo")).isoformat()
+                    },
+                    ":expires_at": self._expires_at(),
+                },
+            )
+        except self.dynamodb_client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+
+class MemoryLedger:
+    """
+    DynamoDBの代わりにメモリ上に記録する(ローカルでの実行・テスト用)
+
+    Lambdaではウォームスタートした同じ実行環境の中でのみ重複を検出できる
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._plans = {}
+        self._reservations = {}
+        self._lock = threading.Lock()
+
+    def get(self, object_id):
+        return self._records.get(object_id)
+
+    def planned_key(self, object_id):
+        return self._reservations.get(object_id)
+
+    def reserve(self, object_ids, key_format):
+        with self._lock:
+            self._plans[key_format] = list(object_ids)
+            reserved = []
+            for object_id in object_ids:
+                if object_id not in self._reservations:
+                    self._reservations[object_id] = key_format
+                    reserved.append(object_id)
+            return reserved
+
+    def members(self, key_format):
+        return [
+            object_id
+            for object_id in self._plans.get(key_format, [])
+            if self._reservations.get(object_id) == key_format
+        ]
+
+    def mark(self, object_id, output_key):
+        with self._lock:
+            if object_id in self._records:
+                return False
+            self._records[object_id] = output_key
+            return True
@@ -0,0 +1,164 @@
+import io
+import os
+import sys
+
+import boto3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from moto import mock_s3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "lambda"))
+
+from lib.csv_io import (
+    MIN_PART_SIZE,
+    ColumnSpec,
+    RollingCsvWriter,
+    S3MultipartWriter,
+    read_csv_from_s3,
+    read_csv_with_schema,
+    write_csv_to_s3,
+)
+
+BUCKET = "output-bucket"
+
+
+@pytest.fixture
+def s3_client():
+    with mock_s3():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket=BUCKET)
+        yield conn
+
+
+def get_text(s3_client, key):
+    return s3_client.get_object(Bucket=BUCKET, Key=key)["Body"].read().decode()
+
+
+def sample_frame():
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "weight": [4.0, 1e-05, np.nan, 1e15],
+            "is_open": [True, False, True, False],
+            "name": ["Tom", 'a,"b"', None, "x\ny"],
+            "arrival": pd.to_datetime(
+                [
+                    "2020-01-01 09:00:00",
+                    "2020-01-02 03:04:05",
+                    None,
+                    "2020-01-03 00:00:00",
+                ]
+            ),
+            "birthday": pd.to_datetime(
+                ["2019-01-01", None, "2019-03-01", "2019-04-01"]
+            ),
+        }
+    )
+
+
+def test_write_csv_matches_pandas_to_csv(s3_client):
+    df = sample_frame()
+
+    size = write_csv_to_s3(s3_client, df, BUCKET, "out.csv")
+
+    # 小数の".0"・True/False・必要な値だけのクォート・日時の形式がpandasと同じ
+    expected = df.to_csv(index=False)
+    assert get_text(s3_client, "out.csv") == expected
+    assert size == len(expected.encode("utf-8"))
+
+
+def test_write_csv_round_trip(s3_client):
+    df = sample_frame()
+    write_csv_to_s3(s3_client, df, BUCKET, "out.csv")
+
+    result = read_csv_from_s3(s3_client, BUCKET, "out.csv")
+    # Arrow型で読み込んだデータフレームを書き込んでも、同じCSVになる
+    write_csv_to_s3(s3_client, result, BUCKET, "again.csv")
+
+    assert get_text(s3_client, "again.csv") == get_text(s3_client, "out.csv")
+    assert result["name"].tolist()[:2] == ["Tom", 'a,"b"']
+    assert pd.isna(result["name"][2])
+    assert result["weight"][0] == 4.0
+
+
+BASELINE_CSV = (
+    "name,arrival,offset_at,local_time,count,weight,flag,note,plus\n"
+    "Tom,2024-01-05T10:30:00,2024-01-05T10:30:00+09:00,10:30,10,"
+    '25891675.029296335,True,"a,b",+5\n'
+    "Ann,2024-01-05 10:30,2024-01-05T01:30:00Z,10:30:00,,0.1,,None,007\n"
+    "Bob,2024-01-05,,,7,1e-05,false,<NA>,3\n"
+)
+
+
+def test_read_write_matches_pandas_baseline(s3_client):
+    s3_client.put_object(Bucket=BUCKET, Key="in.csv", Body=BASELINE_CSV)
+
+    df = read_csv_from_s3(s3_client, BUCKET, "in.csv")
+    write_csv_to_s3(s3_client, df, BUCKET, "out.csv")
+    schema = {"name": ColumnSpec(pa.string()), "count": ColumnSpec(pa.float64())}
+    schema_df, quarantine = read_csv_with_schema(s3_client, BUCKET, "in.csv", schema)
+    write_csv_to_s3(s3_client, schema_df, BUCKET, "schema.csv")
+
+    # 日時・UTCオフセットは入力のまま、欠損値のある整数は"10.0"、小数はpandasと
+    # 同じ値で出力される(pandasの既定の読み込み・書き込みと同じバイト列)
+    expected = pd.read_csv(io.StringIO(BASELINE_CSV)).to_csv(index=False)
+    assert get_text(s3_client, "out.csv") == expected
+    assert get_text(s3_client, "schema.csv") == expected
+    assert quarantine.num_rows == 0
+
+
+def test_write_csv_single_column_keeps_empty_rows(s3_client):
+    df = pd.DataFrame({"name": ["a", None, "b"]})
+
+    write_csv_to_s3(s3_client, df, BUCKET, "out.csv")
+
+    assert get_text(s3_client, "out.csv") == df.to_csv(index=False)
+
+
+def test_multipart_writer_uploads_parts(s3_client):
+    data = os.urandom(MIN_PART_SIZE * 2 + 1024)
+
+    with S3MultipartWriter(s3_client, BUCKET, "big.bin", MIN_PART_SIZE) as writer:
+        for start in range(0, len(data), 1024 * 1024):
+            writer.write(data[start : start + 1024 * 1024])
+
+    assert len(writer.parts) == 3
+    body = s3_client.get_object(Bucket=BUCKET, Key="big.bin")["Body"].read()
+    assert body == data
+
+
+def test_multipart_writer_aborts_on_error(s3_client):
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter(s3_client, BUCKET, "big.bin", MIN_PART_SIZE) as writer:
+            writer.write(b"x" * MIN_PART_SIZE)
+            raise RuntimeError("failed")
+
+    assert s3_client.list_multipart_uploads(Bucket=BUCKET).get("Uploads") is None
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=BUCKET)
+
+
+def test_rolling_writer_rolls_over_by_size_and_columns(s3_client):
+    writer = RollingCsvWriter(s3_client, BUCKET, "out/{index:04d}.csv", 100)
+    small = pa.table({"id": list(range(5)), "name": ["animal"] * 5})
+    large = pa.table({"id": list(range(20)), "name": ["animal"] * 20})
+    other = pa.table({"id": [1], "kind": ["cat"]})
+
+    writer.write(small, "a")
+    writer.write(large, "b")
+    writer.write(small, "c")
+    writer.write(other, "d")
+    writer.close()
+
+    # bの書き込みで目安のサイズを超えるため切り替わり、列名が異なるdも別のファイルになる
+    assert [(f["key"], f["items"], f["error"]) for f in writer.files] == [
+        ("out/0000.csv", ["a", "b"], None),
+        ("out/0001.csv", ["c"], None),
+        ("out/0002.csv", ["d"], None),
+    ]
+    first = get_text(s3_client, "out/0000.csv")
+    assert first.startswith("id,name\n")
+    assert first.count("id,name") == 1
+    assert len(first.splitlines()) == 1 + 5 + 20
+    assert get_text(s3_client, "out/0002.csv") == "id,kind\n1,cat\n"
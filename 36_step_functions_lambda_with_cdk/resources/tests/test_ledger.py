@@ -0,0 +1,294 @@
+import json
+import os
+import sys
+
+import boto3
+import pandas as pd
+import pytest
+from moto import mock_dynamodb, mock_s3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "lambda"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import etl_handler
+from lib.ledger import (
+    DynamoDbLedger,
+    MemoryLedger,
+    batch_key_format,
+    object_id,
+    output_key_for,
+)
+
+INPUT_BUCKET = "input-bucket"
+OUTPUT_BUCKET = "output-bucket"
+TABLE_NAME = "processed-objects"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    with mock_s3():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket=INPUT_BUCKET)
+        conn.create_bucket(Bucket=OUTPUT_BUCKET)
+        monkeypatch.setenv("S3_OUTPUT_BUCKET", OUTPUT_BUCKET)
+        monkeypatch.setenv("S3_OUTPUT_KEY_PREFIX", "output/")
+        monkeypatch.setattr(etl_handler, "s3_client", conn)
+        monkeypatch.setattr(etl_handler, "ledger", MemoryLedger())
+        yield conn
+
+
+@pytest.fixture
+def dynamodb_ledger():
+    with mock_dynamodb():
+        conn = boto3.client("dynamodb", region_name="us-east-1")
+        conn.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "object_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "object_id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield DynamoDbLedger(conn, TABLE_NAME)
+
+
+def put_csv(s3_client, key, rows=3):
+    body = "id,name,arrival_year\n" + "".join(
+        f"{i},animal_{i},{2000 + i}\n" for i in range(rows)
+    )
+    return s3_client.put_object(Bucket=INPUT_BUCKET, Key=key, Body=body.encode())[
+        "ETag"
+    ]
+
+
+def eventbridge_event(key, etag=None):
+    detail = {"bucket": {"name": INPUT_BUCKET}, "object": {"key": key}}
+    if etag is not None:
+        detail["object"]["etag"] = etag.strip('"')
+    return {"detail": detail}
+
+
+def sqs_event(keys, etags=None):
+    etags = etags or {}
+    return {
+        "Records": [
+            {
+                "messageId": f"m{i}",
+                "body": json.dumps(eventbridge_event(key, etags.get(key))),
+            }
+            for i, key in enumerate(keys)
+        ]
+    }
+
+
+def output_keys(s3_client):
+    response = s3_client.list_objects_v2(Bucket=OUTPUT_BUCKET)
+    return sorted(obj["Key"] for obj in response.get("Contents", []))
+
+
+def test_output_key_is_derived_from_input_and_etag():
+    key = output_key_for("output/", "bkt", "in/zoo.csv", '"abc"')
+
+    assert key == output_key_for("output/", "bkt", "in/zoo.csv", "abc")
+    assert key.startswith("output/output_zoo_")
+    assert key != output_key_for("output/", "bkt", "in/zoo.csv", "def")
+    assert key != output_key_for("output/", "bkt", "other/zoo.csv", "abc")
+
+
+def test_batch_key_format_ignores_order():
+    ids = [object_id("bkt", "a.csv", "1"), object_id("bkt", "b.csv", "2")]
+
+    assert batch_key_format("output/", ids) == batch_key_format("output/", ids[::-1])
+    assert batch_key_format("output/", ids).endswith("_{index:04d}.csv")
+
+
+@pytest.mark.parametrize("ledger_type", ["memory", "dynamodb"])
+def test_ledger_marks_once(ledger_type, request):
+    if ledger_type == "memory":
+        ledger = MemoryLedger()
+    else:
+        ledger = request.getfixturevalue("dynamodb_ledger")
+
+    assert ledger.get("bkt/a.csv@1") is None
+    assert ledger.mark("bkt/a.csv@1", "output/a.csv") is True
+    assert ledger.mark("bkt/a.csv@1", "output/other.csv") is False
+    assert ledger.get("bkt/a.csv@1") == "output/a.csv"
+
+
+@pytest.mark.parametrize("ledger_type", ["memory", "dynamodb"])
+def test_ledger_reserves_planned_key_once(ledger_type, request):
+    if ledger_type == "memory":
+        ledger = MemoryLedger()
+    else:
+        ledger = request.getfixturevalue("dynamodb_ledger")
+
+    assert ledger.reserve(["bkt/a.csv@1", "bkt/b.csv@2"], "k1") == [
+        "bkt/a.csv@1",
+        "bkt/b.csv@2",
+    ]
+    # 既に予約された入力ファイルは別の出力先に予約できない
+    assert ledger.reserve(["bkt/b.csv@2", "bkt/c.csv@3"], "k2") == ["bkt/c.csv@3"]
+    assert ledger.planned_key("bkt/b.csv@2") == "k1"
+    assert ledger.members("k1") == ["bkt/a.csv@1", "bkt/b.csv@2"]
+    assert ledger.members("k2") == ["bkt/c.csv@3"]
+    # 予約しただけでは処理済みにならない
+    assert ledger.get("bkt/a.csv@1") is None
+    assert ledger.mark("bkt/a.csv@1", "output/a.csv") is True
+    assert ledger.get("bkt/a.csv@1") == "output/a.csv"
+
+
+def test_handler_outputs_do_not_collide_within_a_second(s3_client):
+    put_csv(s3_client, "in/a.csv")
+    put_csv(s3_client, "in/b.csv", rows=5)
+
+    etl_handler.main(eventbridge_event("in/a.csv"), None)
+    etl_handler.main(eventbridge_event("in/b.csv"), None)
+
+    assert len(output_keys(s3_client)) == 2
+
+
+def test_handler_skips_redelivered_event(s3_client, monkeypatch, dynamodb_ledger):
+    monkeypatch.setattr(etl_handler, "ledger", dynamodb_ledger)
+    etag = put_csv(s3_client, "in/zoo.csv")
+    event = eventbridge_event("in/zoo.csv", etag)
+
+    first = etl_handler.main(event, None)
+    # 再配信では入力ファイルを読み込まない
+    s3_client.delete_object(Bucket=INPUT_BUCKET, Key="in/zoo.csv")
+    second = etl_handler.main(event, None)
+
+    assert first["body"].startswith("Successful put")
+    assert second["body"].startswith("Skipped")
+    assert output_keys(s3_client) == [
+        output_key_for("output/", INPUT_BUCKET, "in/zoo.csv", etag)
+    ]
+
+
+def test_handler_reprocesses_changed_object(s3_client):
+    put_csv(s3_client, "in/zoo.csv")
+    etl_handler.main(eventbridge_event("in/zoo.csv"), None)
+    put_csv(s3_client, "in/zoo.csv", rows=10)
+
+    response = etl_handler.main(eventbridge_event("in/zoo.csv"), None)
+
+    assert response["body"].startswith("Successful put")
+    assert len(output_keys(s3_client)) == 2
+
+
+def test_batch_skips_processed_objects(s3_client):
+    etags = {key: put_csv(s3_client, key) for key in ["in/a.csv", "in/b.csv"]}
+
+    first = etl_handler.main(sqs_event(["in/a.csv", "in/b.csv"], etags), None)
+    written = output_keys(s3_client)
+    # 再配信では入力ファイルを読み込まない
+    s3_client.delete_object(Bucket=INPUT_BUCKET, Key="in/a.csv")
+    s3_client.delete_object(Bucket=INPUT_BUCKET, Key="in/b.csv")
+    second = etl_handler.main(sqs_event(["in/a.csv", "in/b.csv"], etags), None)
+
+    assert first == second == {"batchItemFailures": []}
+    assert output_keys(s3_client) == written
+
+    # 未処理のファイルだけが処理される
+    etags["in/c.csv"] = put_csv(s3_client, "in/c.csv")
+    etl_handler.main(sqs_event(["in/a.csv", "in/b.csv", "in/c.csv"], etags), None)
+    added = sorted(set(output_keys(s3_client)) - set(written))
+    assert len(added) == 1
+    output = s3_client.get_object(Bucket=OUTPUT_BUCKET, Key=added[0])["Body"]
+    assert len(pd.read_csv(output)) == 3
+
+
+def test_batch_output_keys_are_deterministic(s3_client, monkeypatch):
+    for key in ["in/a.csv", "in/b.csv"]:
+        put_csv(s3_client, key)
+    event = sqs_event(["in/a.csv", "in/b.csv"])
+
+    etl_handler.main(event, None)
+    written = output_keys(s3_client)
+    monkeypatch.setattr(etl_handler, "ledger", MemoryLedger())
+    etl_handler.main(event, None)
+
+    assert output_keys(s3_client) == written
+    assert len(written) == 1
+
+
+def test_batch_retry_in_other_batches_does_not_duplicate(
+    s3_client, monkeypatch, dynamodb_ledger
+):
+    monkeypatch.setattr(etl_handler, "ledger", dynamodb_ledger)
+    etags = {key: put_csv(s3_client, key) for key in ["in/a.csv", "in/b.csv"]}
+
+    # 出力してから処理済みを記録するまでの間にLambdaが終了した場合
+    def crash(object_id, output_key):
+        raise RuntimeError("timeout")
+
+    monkeypatch.setattr(dynamodb_ledger, "mark", crash)
+    with pytest.raises(RuntimeError):
+        etl_handler.main(sqs_event(["in/a.csv", "in/b.csv"], etags), None)
+    written = output_keys(s3_client)
+    monkeypatch.delattr(dynamodb_ledger, "mark")
+
+    # SQSの再試行で別の組み合わせのバッチになっても、予約したファイルに出力し直す
+    etags["in/c.csv"] = put_csv(s3_client, "in/c.csv")
+    first = etl_handler.main(sqs_event(["in/a.csv", "in/c.csv"], etags), None)
+    second = etl_handler.main(sqs_event(["in/b.csv"], etags), None)
+
+    assert first == second == {"batchItemFailures": []}
+    keys = output_keys(s3_client)
+    assert len(written) == 1 and written[0] in keys
+    assert len(keys) == 2
+    rows = [
+        len(pd.read_csv(s3_client.get_object(Bucket=OUTPUT_BUCKET, Key=k)["Body"]))
+        for k in keys
+    ]
+    assert sorted(rows) == [3, 6]
+
+
+def test_batch_reports_missing_object(s3_client):
+    put_csv(s3_client, "in/a.csv")
+
+    response = etl_handler.main(sqs_event(["in/a.csv", "in/missing.csv"]), None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m1"}]}
+
+
+def test_batch_reports_malformed_message(s3_client):
+    put_csv(s3_client, "in/a.csv")
+    event = sqs_event(["in/a.csv"])
+    event["Records"].append({"messageId": "bad", "body": "not json"})
+    event["Records"].append({"messageId": "no-key", "body": json.dumps({})})
+
+    response = etl_handler.main(event, None)
+
+    # 正常なメッセージは処理され、解析できないメッセージだけが再試行される
+    assert response == {
+        "batchItemFailures": [{"itemIdentifier": "bad"}, {"itemIdentifier": "no-key"}]
+    }
+    assert len(output_keys(s3_client)) == 1
+
+
+def test_batch_ignores_s3_test_event(s3_client):
+    put_csv(s3_client, "in/a.csv")
+    event = sqs_event(["in/a.csv"])
+    test_event = {
+        "Service": "Amazon S3",
+        "Event": "s3:TestEvent",
+        "Time": "2025-01-01T00:00:00.000Z",
+        "Bucket": INPUT_BUCKET,
+    }
+    event["Records"].append({"messageId": "test", "body": json.dumps(test_event)})
+
+    response = etl_handler.main(event, None)
+
+    # テストメッセージは入力ファイルがないため、再試行せずに削除させる
+    assert response == {"batchItemFailures": []}
+    assert len(output_keys(s3_client)) == 1
+
+
+def test_map_batch_reports_malformed_item(s3_client):
+    put_csv(s3_client, "in/a.csv")
+    event = {"Items": [{"bucket": INPUT_BUCKET, "key": "in/a.csv"}, {"key": "x"}]}
+
+    response = etl_handler.main(event, None)
+
+    assert [item["key"] for item in response["succeeded"]] == ["in/a.csv"]
+    assert response["failed"] == [
+        {"item_id": "1", "error": "Invalid message: KeyError('bucket')"}
+    ]
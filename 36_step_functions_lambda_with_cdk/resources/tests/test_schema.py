@@ -0,0 +1,110 @@
+import os
+import sys
+
+import boto3
+import pandas as pd
+import pyarrow as pa
+import pytest
+from moto import mock_s3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "lambda"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import etl_handler
+from lib.csv_io import (
+    QUARANTINE_REASON_COLUMN,
+    ColumnSpec,
+    SchemaError,
+    read_csv_with_schema,
+)
+from lib.ledger import MemoryLedger
+
+BUCKET = "test-bucket"
+SCHEMA = {
+    "id": ColumnSpec(pa.int64(), nullable=False),
+    "name": ColumnSpec(pa.string()),
+    "arrival_year": ColumnSpec(pa.int64(), nullable=False),
+    "weight": ColumnSpec(pa.float64()),
+}
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    with mock_s3():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket=BUCKET)
+        monkeypatch.setenv("S3_OUTPUT_BUCKET", BUCKET)
+        monkeypatch.setenv("S3_OUTPUT_KEY_PREFIX", "output/")
+        monkeypatch.setattr(etl_handler, "s3_client", conn)
+        monkeypatch.setattr(etl_handler, "ledger", MemoryLedger())
+        yield conn
+
+
+def put(s3_client, key, body):
+    s3_client.put_object(Bucket=BUCKET, Key=key, Body=body.encode())
+
+
+def test_schema_types_are_applied_at_parse_time(s3_client):
+    put(s3_client, "in.csv", "id,name,arrival_year,weight,extra\n1,a,2001,,x\n")
+
+    df, quarantine = read_csv_with_schema(s3_client, BUCKET, "in.csv", SCHEMA)
+
+    assert str(df["arrival_year"].dtype) == "int64[pyarrow]"
+    assert str(df["weight"].dtype) == "double[pyarrow]"
+    assert str(df["extra"].dtype) == "string[pyarrow]"
+    assert quarantine.num_rows == 0
+    assert quarantine.column_names[-1] == QUARANTINE_REASON_COLUMN
+
+
+def test_invalid_rows_are_quarantined(s3_client):
+    put(
+        s3_client,
+        "in.csv",
+        "id,name,arrival_year,weight\n"
+        "1,a,2001,1.5\n"
+        "2,b,unknown,2\n"
+        "3,c,,heavy\n"
+        "4,d, +2004 ,1e3\n"
+        "99999999999999999999,e,2005,3\n",
+    )
+
+    df, quarantine = read_csv_with_schema(s3_client, BUCKET, "in.csv", SCHEMA)
+
+    assert df["id"].tolist() == [1, 4]
+    assert df["arrival_year"].tolist() == [2001, 2004]
+    assert str(df["arrival_year"].dtype) == "int64[pyarrow]"
+    assert quarantine.column("id").to_pylist() == ["2", "3", "99999999999999999999"]
+    assert quarantine.column("arrival_year").to_pylist() == ["unknown", None, "2005"]
+    assert quarantine.column(QUARANTINE_REASON_COLUMN).to_pylist() == [
+        "arrival_year",
+        "arrival_year,weight",
+        "id",
+    ]
+
+
+def test_missing_column_raises(s3_client):
+    put(s3_client, "in.csv", "id,name\n1,a\n")
+
+    with pytest.raises(SchemaError, match="arrival_year, weight"):
+        read_csv_with_schema(s3_client, BUCKET, "in.csv", SCHEMA)
+
+
+def test_handler_writes_quarantine_output(s3_client):
+    put(s3_client, "in/zoo.csv", "id,name,arrival_year\n1,a,2001\n2,b,unknown\n")
+
+    etl_handler.main(
+        {"detail": {"bucket": {"name": BUCKET}, "object": {"key": "in/zoo.csv"}}},
+        None,
+    )
+
+    keys = [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=BUCKET)["Contents"]]
+    (output_key,) = [key for key in keys if key.startswith("output/")]
+    (quarantine_key,) = [key for key in keys if key.startswith("quarantine/")]
+    output = pd.read_csv(s3_client.get_object(Bucket=BUCKET, Key=output_key)["Body"])
+    quarantine = pd.read_csv(
+        s3_client.get_object(Bucket=BUCKET, Key=quarantine_key)["Body"]
+    )
+    assert output["id"].tolist() == [1]
+    assert "years_in_zoo" in output.columns
+    assert quarantine["arrival_year"].tolist() == ["unknown"]
+    assert quarantine[QUARANTINE_REASON_COLUMN].tolist() == ["arrival_year"]
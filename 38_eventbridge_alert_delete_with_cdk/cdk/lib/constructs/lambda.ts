@@ -8,6 +8,7 @@ export interface LambdaConstructProps {
   projectName: string;
   dataSourceBucketName: string;
   dataStoreBucketName: string;
+  ledgerTableName: string;
 }
 
 export class LambdaConstruct extends Construct {
@@ -38,6 +39,7 @@ export class LambdaConstruct extends Construct {
       environment: {
         S3_OUTPUT_BUCKET: props.dataStoreBucketName,
         S3_OUTPUT_KEY_PREFIX: 'output/',
+        LEDGER_TABLE_NAME: props.ledgerTableName,
       },
       architecture: lambda.Architecture.ARM_64,
     });
@@ -46,7 +48,8 @@ export class LambdaConstruct extends Construct {
     lambdaRole.addToPolicy(
       new iam.PolicyStatement({
         effect: iam.Effect.ALLOW,
-        actions: ['s3:ListBucket', 's3:GetObject', 's3:PutObject'],
+        // マルチパートアップロードを中止する場合はs3:AbortMultipartUploadが必要
+        actions: ['s3:ListBucket', 's3:GetObject', 's3:PutObject', 's3:AbortMultipartUpload'],
         resources: [
           `arn:aws:s3:::${props.dataStoreBucketName}`,
           `arn:aws:s3:::${props.dataStoreBucketName}/*`,
@@ -55,5 +58,15 @@ export class LambdaConstruct extends Construct {
         ],
       })
     );
+    // 処理済みの入力ファイルの記録の参照・登録
+    lambdaRole.addToPolicy(
+      new iam.PolicyStatement({
+        effect: iam.Effect.ALLOW,
+        actions: ['dynamodb:GetItem', 'dynamodb:PutItem', 'dynamodb:UpdateItem'],
+        resources: [
+          `arn:aws:dynamodb:${cdk.Stack.of(this).region}:${cdk.Stack.of(this).account}:table/${props.ledgerTableName}`,
+        ],
+      })
+    );
   }
 }
@@ -0,0 +1,235 @@
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import unquote_plus
+
+import pyarrow as pa
+from lib.csv_io import DEFAULT_TARGET_FILE_SIZE, RollingCsvWriter, read_csv_from_s3
+from lib.ledger import batch_key_format, object_id, parse_object_id
+
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass
+class BatchItem:
+    """
+    バッチで処理する1つの入力ファイル
+
+    :param item_id: str : 失敗を報告する単位のID(SQSのmessageId / Mapのインデックス)
+    :param bucket: str : 入力のバケット名
+    :param key: str : 入力のキー
+    :param etag: str : 入力のETag(イベントに含まれない場合はresolve_etagsで取得する)
+    """
+
+    item_id: str
+    bucket: str
+    key: str
+    etag: str = None
+
+
+def is_batch_event(event):
+    """
+    SQSのバッチ(Records)またはStep FunctionsのMapのバッチ(Items)のイベントか判定する
+    """
+    return "Records" in event or "Items" in event
+
+
+def _object_locations(message):
+    # S3のイベント通知を設定したときに送られるテストメッセージ(入力ファイルはない)
+    if message.get("Event") == "s3:TestEvent":
+        return []
+    # EventBridgeのS3イベント
+    if "detail" in message:
+        detail = message["detail"]
+        return [
+            (
+                detail["bucket"]["name"],
+                detail["object"]["key"],
+                detail["object"].get("etag"),
+            )
+        ]
+    # S3のイベント通知(キーはURLエンコードされている)
+    if "Records" in message:
+        return [
+            (
+                record["s3"]["bucket"]["name"],
+                unquote_plus(record["s3"]["object"]["key"]),
+                record["s3"]["object"].get("eTag"),
+            )
+            for record in message["Records"]
+            if "s3" in record
+        ]
+    # {"bucket": ..., "key": ...}
+    return [(message["bucket"], message["key"], message.get("etag"))]
+
+
+def parse_batch_event(event):
+    """
+    バッチのイベントから入力ファイルの一覧を取得する
+
+    SQSのメッセージ・Mapの項目は、EventBridgeのS3イベント・S3のイベント通知・
+    {"bucket": ..., "key": ...}のいずれか。解析できないメッセージ(JSONでない本文や
+    バケット・キーのないメッセージ)はバッチ全体を失敗させず、そのメッセージだけを
+    失敗として返す。S3のテストメッセージ(s3:TestEvent)は入力ファイルなしとして扱う
+
+    :param event: dict : SQSのイベント、またはItemBatcherで渡されるMapのイベント
+    :return: tuple : (BatchItemのリスト, 解析できなかったメッセージのリスト)
+                     解析できなかったメッセージは{"item_id": ID, "error": エラー}
+    """
+    if "Records" in event:
+        messages = [(r["messageId"], r["body"]) for r in event["Records"]]
+    else:
+        messages = [(str(i), message) for i, message in enumerate(event["Items"])]
+
+    items = []
+    failures = []
+    for item_id, message in messages:
+        try:
+            if isinstance(message, str):
+                message = json.loads(message)
+            locations = _object_locations(message)
+        except Exception as e:
+            failures.append({"item_id": item_id, "error": f"Invalid message: {e!r}"})
+            continue
+        for bucket, key, etag in locations:
+            items.append(BatchItem(item_id, bucket, key, etag))
+    return items, failures
+
+
+def resolve_etags(s3_client, items, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    ETagがイベントに含まれていない入力ファイルのETagをhead_objectで取得する
+
+    :param s3_client: S3のクライアント
+    :param items: list : BatchItemのリスト(etagを更新する)
+    :param max_workers: int : 並列に取得するファイル数
+    :return: tuple : (ETagを取得できたBatchItemのリスト,
+                      取得できなかった入力ファイルの結果のリスト)
+    """
+
+    def head(item):
+        if item.etag is None:
+            response = s3_client.head_object(Bucket=item.bucket, Key=item.key)
+            item.etag = response["ETag"]
+
+    resolved = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(item, executor.submit(head, item)) for item in items]
+        for item, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failures.append({"item": item, "output": None, "error": str(e)})
+                continue
+            resolved.append(item)
+    return resolved, failures
+
+
+def process_batch(
+    s3_client,
+    items,
+    transform,
+    output_bucket,
+    key_format,
+    target_size=DEFAULT_TARGET_FILE_SIZE,
+    max_workers=DEFAULT_MAX_WORKERS,
+    read=None,
+):
+    """
+    複数の入力ファイルを並列に読み込んで加工し、target_sizeごとのCSVにまとめて出力する
+
+    読み込みと加工はスレッドプールで並列に行い、出力は入力の順に行うため、
+    同じ入力からは同じファイルが出力される。
+    メモリに保持する入力は、max_workersの2倍までに制限する
+
+    :param s3_client: S3のクライアント
+    :param items: list : BatchItemのリスト
+    :param transform: function : 読み込んだデータフレームを加工する関数
+    :param output_bucket: str : 出力先のバケット名
+    :param key_format: str : 出力先のキー({index}にファイルの連番が入る)
+    :param target_size: int : 1ファイルあたりの目安のサイズ(バイト)
+    :param max_workers: int : 並列に読み込むファイル数
+    :param read: function : BatchItemを受け取りデータフレームを返す関数
+                            (デフォルトはread_csv_from_s3で読み込む)
+    :return: list : 入力ファイルごとの結果
+                    ({"item": BatchItem, "output": 出力先のキー, "error": エラー})
+    """
+
+    def load(item):
+        if read is None:
+            df = read_csv_from_s3(s3_client, item.bucket, item.key)
+        else:
+            df = read(item)
+        df = transform(df)
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+    results = []
+    writer = RollingCsvWriter(s3_client, output_bucket, key_format, target_size)
+
+    def write(item, future):
+        try:
+            table = future.result()
+        except Exception as e:
+            results.append({"item": item, "output": None, "error": str(e)})
+            return
+        writer.write(table, item)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = deque()
+        for item in items:
+            running.append((item, executor.submit(load, item)))
+            if len(running) >= max_workers * 2:
+                write(*running.popleft())
+        while running:
+            write(*running.popleft())
+    writer.close()
+    for file in writer.files:
+        for item in file["items"]:
+            results.append(
+                {"item": item, "output": file["key"], "error": file["error"]}
+            )
+    return results
+
+
+def plan_batches(ledger, items, prefix):
+    """
+    未処理の入力ファイルを、まとめて出力する出力先ごとのグループに分ける
+
+    出力する前に出力先と入力ファイルの組み合わせを台帳に予約し、再試行では予約した
+    組み合わせのまま出力し直す。出力してから処理済みを記録するまでの間にLambdaが
+    終了し、SQSの再試行で別の組み合わせのバッチになっても、同じ入力が別のファイルに
+    重複して出力されない。イベントに含まれない入力ファイルは予約から復元する
+
+    :param ledger: DynamoDbLedger / MemoryLedger : 処理済みの記録
+    :param items: list : 未処理のBatchItemのリスト
+    :param prefix: str : 出力先のキーのプレフィックス
+    :return: list : (出力先のキーのフォーマット, BatchItemのリスト)のリスト
+                    復元したBatchItemのitem_idはNone
+    """
+    present = {object_id(item.bucket, item.key, item.etag): item for item in items}
+    unplanned = [i for i in present if ledger.planned_key(i) is None]
+    if unplanned:
+        ledger.reserve(unplanned, batch_key_format(prefix, unplanned))
+
+    plans = []
+    for key_format in dict.fromkeys(ledger.planned_key(i) for i in present):
+        # 別の実行で予約せずに処理済みになった入力ファイル
+        if key_format is None:
+            continue
+        members = [
+            present.get(i) or BatchItem(None, *parse_object_id(i))
+            for i in ledger.members(key_format)
+        ]
+        plans.append((key_format, members))
+    return plans
+
+
+def failed_item_ids(results, failures=()):
+    """
+    失敗した入力ファイルを含むitem_idと、解析できなかったitem_idの一覧(重複なし)
+    """
+    item_ids = [f["item_id"] for f in failures]
+    item_ids += [r["item"].item_id for r in results if r["error"]]
+    return list(dict.fromkeys(item_ids))
@@ -62,6 +62,10 @@ export class GlueConstruct extends Construct {
         // "--extra-py-files": `s3://${props.sysBucketName}/common/data_processing.py,s3://${props.sysBucketName}/common/get_logger.py`,
         '--S3_OUTPUT_BUCKET': props.dataStoreBucketName,
         '--S3_OUTPUT_KEY': 'output/',
+        // 出力形式(csv / parquet)とParquetの圧縮形式(snappy / zstd)
+        // Hive形式でパーティション分割する場合は'--PARTITION_COLUMN'を指定する
+        '--OUTPUT_FORMAT': 'csv',
+        '--PARQUET_COMPRESSION': 'snappy',
       },
     });
   }
@@ -0,0 +1,99 @@
+"""
+S3クライアントを毎回作成する場合と、get_clientで共有する場合の処理時間を比較するベンチマーク
+
+ローカルで起動したmoto server(HTTP)に対してget_objectを順に実行する
+
+- fresh: 呼び出しごとにboto3.clientを作成する(ハンドラ内でクライアントを作成する場合)
+- pooled: get_clientでキャッシュしたクライアントを使い回す
+
+実行方法(moto[server]が必要):
+    cd resources
+    python benchmarks/bench_clients.py --calls 1000
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from common.aws_clients import clear_clients, get_client
+
+BUCKET = "bench-bucket"
+KEY = "object.txt"
+REGION = "us-east-1"
+
+
+def start_moto_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-p", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    endpoint_url = f"http://127.0.0.1:{port}"
+    client = boto3.client("s3", region_name=REGION, endpoint_url=endpoint_url)
+    for _ in range(100):
+        try:
+            client.create_bucket(Bucket=BUCKET)
+            client.put_object(Bucket=BUCKET, Key=KEY, Body=b"x" * 1024)
+            return server, endpoint_url
+        except Exception:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("moto server did not start")
+
+
+def fresh_client(endpoint_url):
+    return boto3.client("s3", region_name=REGION, endpoint_url=endpoint_url)
+
+
+def pooled_client(endpoint_url):
+    return get_client("s3", region_name=REGION, endpoint_url=endpoint_url)
+
+
+def run(name, make_client, endpoint_url, calls):
+    clear_clients()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        t = time.perf_counter()
+        s3_client = make_client(endpoint_url)
+        s3_client.get_object(Bucket=BUCKET, Key=KEY)["Body"].read()
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{name:>6}: {elapsed:.3f}s ({calls / elapsed:,.0f} calls/s), "
+        f"p50 {latencies[len(latencies) // 2] * 1e3:.2f}ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f}ms"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+    server, endpoint_url = start_moto_server()
+    try:
+        fresh = run("fresh", fresh_client, endpoint_url, args.calls)
+        pooled = run("pooled", pooled_client, endpoint_url, args.calls)
+        print(f"speedup: {fresh / pooled:.1f}x")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+ETLジョブの出力形式(CSV / Parquet)ごとの処理時間と出力サイズを比較するベンチマーク
+
+S3はmotoで置き換え、同じCSVを入力としてprocess_streamingで出力した場合の
+処理時間(読み込み・加工・書き込み)、出力したバイト数、出力を読み戻す時間を出力する
+
+実行方法:
+    cd resources
+    python benchmarks/bench_formats.py --rows 500000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import boto3
+import numpy as np
+import pandas as pd
+from moto import mock_s3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from common.data_processing import process_streaming, read_from_s3
+
+BUCKET = "bench-bucket"
+CASES = [
+    ("csv", {"output_format": "csv"}, "output.csv"),
+    (
+        "parquet-snappy",
+        {"output_format": "parquet", "compression": "snappy"},
+        "output-snappy.parquet",
+    ),
+    (
+        "parquet-zstd",
+        {"output_format": "parquet", "compression": "zstd"},
+        "output-zstd.parquet",
+    ),
+    (
+        "parquet-hive",
+        {"output_format": "parquet", "partition_column": "category"},
+        "output-hive/",
+    ),
+]
+
+
+def make_csv(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2000-01-01", "D")
+    df = pd.DataFrame(
+        {
+            "id": np.arange(rows),
+            "name": pd.Series(rng.integers(0, 1000, rows)).map("name_{}".format),
+            "category": rng.choice(["a", "b", "c", "d"], rows),
+            "value": rng.random(rows).round(4),
+            "arrival_date": (
+                start + rng.integers(0, 9000, rows).astype("timedelta64[D]")
+            ).astype(str),
+        }
+    )
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def output_bytes(s3_client, prefix):
+    paginator = s3_client.get_paginator("list_objects_v2")
+    return sum(
+        obj["Size"]
+        for page in paginator.paginate(Bucket=BUCKET, Prefix=prefix)
+        for obj in page.get("Contents", [])
+    )
+
+
+def read_back(s3_client, prefix):
+    paginator = s3_client.get_paginator("list_objects_v2")
+    rows = 0
+    for page in paginator.paginate(Bucket=BUCKET, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            rows += len(read_from_s3(s3_client, BUCKET, obj["Key"]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with mock_s3():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET)
+        data = make_csv(args.rows)
+        s3_client.put_object(Bucket=BUCKET, Key="input.csv", Body=data)
+        print(f"input: {args.rows:,} rows, {len(data):,} bytes")
+        for name, options, key in CASES:
+            start = time.perf_counter()
+            process_streaming(
+                s3_client,
+                BUCKET,
+                "input.csv",
+                BUCKET,
+                key,
+                chunksize=args.chunksize,
+                **options,
+            )
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            rows = read_back(s3_client, key)
+            read_elapsed = time.perf_counter() - start
+            assert rows == args.rows
+            size = output_bytes(s3_client, key)
+            print(
+                f"{name:>15}: write {elapsed:.3f}s, "
+                f"{size:>12,} bytes ({size / len(data):.0%} of input), "
+                f"read back {read_elapsed:.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+etl_script.pyの起動時間(main関数に入るまで)を比較するベンチマーク
+
+新しいPythonプロセスを起動し、etl_script.pyのモジュールレベルの処理
+(awsglue以外のimportとモジュールの列挙)にかかる時間を計測する
+
+- before: 全てのモジュールを列挙し、pandasなどをimport時に読み込む(従来の動作)
+- after: モジュールを列挙せず、pandasなどは初めて使う時点で読み込む
+
+実行方法:
+    cd resources
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+STARTUP_CODE = """
+import sys
+from common.startup import ImportProfiler, print_importable_modules
+profiler = ImportProfiler()
+profiler.start()
+if {list_modules}:
+    print_importable_modules()
+from common.aws_clients import get_client
+from common.data_processing import get_current_time, process_streaming
+from common.get_logger import setup_logging
+logger = setup_logging()
+if {profile}:
+    profiler.log(logger, "startup", top=10)
+"""
+
+MODES = {
+    "before": {"eager": True, "list_modules": True},
+    "after": {"eager": False, "list_modules": False},
+}
+
+
+def run(mode, profile=False):
+    env = dict(os.environ, COMMON_EAGER_IMPORTS="1" if mode["eager"] else "0")
+    code = STARTUP_CODE.format(list_modules=mode["list_modules"], profile=profile)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=RESOURCES_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, result.stdout.decode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--profile", action="store_true", help="importの内訳(JSON)も出力する"
+    )
+    args = parser.parse_args()
+
+    # 1回目はファイルシステムのキャッシュを温めるため計測しない
+    for mode in MODES.values():
+        run(mode)
+    results = {}
+    for name, mode in MODES.items():
+        times = [run(mode)[0] for _ in range(args.runs)]
+        results[name] = statistics.median(times)
+        print(
+            f"{name:>6}: median {results[name] * 1e3:7.1f}ms, "
+            f"min {min(times) * 1e3:7.1f}ms ({args.runs} runs)"
+        )
+        if args.profile:
+            output = run(mode, profile=True)[1]
+            print([line for line in output.splitlines() if "import_profile" in line][0])
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+years_since_arrivalの計算方法(pendulum / vectorized)の処理時間を比較するベンチマーク
+
+両方の結果が一致することも確認する
+
+実行方法:
+    cd resources
+    python benchmarks/bench_years_since_arrival.py --rows 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pendulum
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from common.data_processing import YEARS_SINCE_ARRIVAL_METHODS
+
+
+def make_arrival_dates(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("1990-01-01T00:00:00", "s")
+    seconds = rng.integers(0, 50 * 365 * 24 * 60 * 60, rows)
+    values = (start + seconds.astype("timedelta64[s]")).astype(str)
+    # 日付のみ・UTC・オフセット付きの値を混在させる
+    kind = rng.integers(0, 4, rows)
+    dates = pd.Series(values)
+    dates[kind == 0] = dates[kind == 0].str.slice(0, 10)
+    dates[kind == 2] = dates[kind == 2] + "Z"
+    dates[kind == 3] = dates[kind == 3] + "+09:00"
+    return dates
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    arrival_dates = make_arrival_dates(args.rows)
+    now = pendulum.now("Asia/Tokyo")
+    results = {}
+    elapsed = {}
+    for method, calculate in YEARS_SINCE_ARRIVAL_METHODS.items():
+        start = time.perf_counter()
+        results[method] = calculate(arrival_dates, now)
+        elapsed[method] = time.perf_counter() - start
+        print(
+            f"{method:>10}: {elapsed[method]:.3f}s "
+            f"({args.rows / elapsed[method]:,.0f} rows/s)"
+        )
+    assert results["vectorized"].equals(results["pendulum"].astype(np.int64))
+    print(f"speedup: {elapsed['pendulum'] / elapsed['vectorized']:.1f}x (identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import threading
+
+import boto3
+from botocore.config import Config
+
+# 並列にリクエストする場合もコネクションを使い回せるようにプールを広げる
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+DEFAULT_CLIENT_CONFIG = Config(
+    max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+    # スロットリング時はクライアント側でも送信レートを下げて再試行する
+    retries={"max_attempts": 10, "mode": "adaptive"},
+    # アイドル中のコネクションが切断されないようにする
+    tcp_keepalive=True,
+)
+
+_session = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    """
+    プロセス内で共有するboto3のセッションを取得する
+
+    認証情報の解決はセッションごとに行われるため、1つのセッションを使い回す
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session()
+        return _session
+
+
+def get_client(service, region_name=None, endpoint_url=None):
+    """
+    (サービス, リージョン, エンドポイント)ごとにキャッシュしたクライアントを取得する
+
+    モジュールレベルでキャッシュするため、Lambdaのウォームスタートや同じプロセス内の
+    2回目以降の呼び出しでは、認証情報の解決とTLS接続を再利用する。
+    クライアントはスレッドセーフなのでスレッド間で共有してよい
+
+    :param service: str : サービス名(例: s3)
+    :param region_name: str : リージョン(Noneの場合は環境の既定値)
+    :param endpoint_url: str : エンドポイント(Noneの場合はAWSのエンドポイント)
+    :return: botocore.client.BaseClient : クライアント
+    """
+    key = (service, region_name, endpoint_url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    session = get_session()
+    # セッションからのクライアント作成はスレッドセーフではないため、ロック内で行う
+    with _lock:
+        if key not in _clients:
+            _clients[key] = session.client(
+                service,
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=DEFAULT_CLIENT_CONFIG,
+            )
+        return _clients[key]
+
+
+def clear_clients():
+    """
+    キャッシュしたセッションとクライアントを破棄する(認証情報の切り替え・テスト用)
+    """
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
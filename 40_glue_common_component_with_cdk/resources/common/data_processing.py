@@ -1,12 +1,42 @@
+from datetime import datetime
 from io import StringIO
-
-import pandas as pd
-import pendulum
+from urllib.parse import quote
 
 from common.get_logger import setup_logging
+from common.lazy_import import lazy_import
+
+# 読み込みに時間がかかるため、初めて使う時点でimportする
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+pendulum = lazy_import("pendulum")
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
 
 logger = setup_logging()
 
+# マルチパートアップロードのパートサイズの下限(最後のパートを除く)
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+# ストリーミング処理で1回に読み込む行数
+DEFAULT_CHUNK_SIZE = 100_000
+# ストリーミング処理の進捗をINFOで出力するチャンク数の間隔
+PROGRESS_LOG_INTERVAL = 10
+# 拡張子とファイル形式の対応(一致しない場合はCSVとして扱う)
+FILE_FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".csv": "csv",
+}
+OUTPUT_FORMATS = ("csv", "parquet")
+PARQUET_COMPRESSIONS = ("snappy", "zstd")
+# Parquetの1行グループあたりの行数
+DEFAULT_ROW_GROUP_SIZE = DEFAULT_CHUNK_SIZE
+# Hive形式のパーティションで値が欠損している場合のディレクトリ名
+HIVE_DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
 
 def get_current_time():
     current_time = pendulum.now("Asia/Tokyo")
@@ -22,6 +52,59 @@ def read_csv_from_s3(s3_client, bucket, key):
     return df
 
 
+def detect_format(key):
+    """
+    S3のキーの拡張子からファイル形式を判定する
+
+    :param key: str : S3のキー
+    :return: str : csv / parquet / arrow(不明な拡張子はcsv)
+    """
+    lower_key = key.lower()
+    for extension, file_format in FILE_FORMATS.items():
+        if lower_key.endswith(extension):
+            return file_format
+    return "csv"
+
+
+def read_parquet_from_s3(s3_client, bucket, key):
+    logger.info(f"Reading Parquet from S3. Bucket: {bucket}, Key: {key}")
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    table = pq.read_table(pa.BufferReader(response["Body"].read()))
+    df = table.to_pandas()
+    logger.info(f"Successfully read Parquet. Shape: {df.shape}")
+    return df
+
+
+def _open_arrow_ipc(data):
+    # Arrow IPCのファイル形式(Feather V2)は先頭がマジックナンバー、
+    # それ以外はストリーム形式として読み込む
+    if data[:6] == b"ARROW1":
+        return pa.ipc.open_file(pa.BufferReader(data))
+    return pa.ipc.open_stream(pa.BufferReader(data))
+
+
+def read_arrow_from_s3(s3_client, bucket, key):
+    logger.info(f"Reading Arrow IPC from S3. Bucket: {bucket}, Key: {key}")
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    df = _open_arrow_ipc(response["Body"].read()).read_all().to_pandas()
+    logger.info(f"Successfully read Arrow IPC. Shape: {df.shape}")
+    return df
+
+
+READERS = {
+    "csv": read_csv_from_s3,
+    "parquet": read_parquet_from_s3,
+    "arrow": read_arrow_from_s3,
+}
+
+
+def read_from_s3(s3_client, bucket, key):
+    """
+    拡張子から判定した形式(CSV / Parquet / Arrow IPC)でS3のファイルを読み込む
+    """
+    return READERS[detect_format(key)](s3_client, bucket, key)
+
+
 def write_csv_to_s3(s3_client, df, bucket, key):
     logger.info(f"Writing CSV to S3. Bucket: {bucket}, Key: {key}")
     csv_buffer = StringIO()
@@ -30,24 +113,789 @@ def write_csv_to_s3(s3_client, df, bucket, key):
     logger.info("Successfully wrote CSV to S3.")
 
 
+# 欠損値を扱えないため、後続のチャンクでは欠損値を持てる型として読み込む
+NULLABLE_DTYPES = {"int64": "Int64", "uint64": "UInt64", "bool": "boolean"}
+
+
+def infer_csv_dtypes(s3_client, bucket, key, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    CSVの先頭chunksize行から列の型を推定する
+
+    整数と真偽値の列は、後続の行に欠損値があっても型が変わらないよう
+    欠損値を持てる型(Int64 / UInt64 / boolean)にする
+
+    :return: dict : 列名と型の対応
+    """
+    body = s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+    try:
+        head = pd.read_csv(body, nrows=chunksize)
+    finally:
+        body.close()
+    return {
+        column: NULLABLE_DTYPES.get(dtype.name, dtype)
+        for column, dtype in head.dtypes.items()
+    }
+
+
+def iter_csv_chunks_from_s3(
+    s3_client, bucket, key, chunksize=DEFAULT_CHUNK_SIZE, dtype=None
+):
+    """
+    CSVをchunksize行ごとのデータフレームで読み込む
+
+    pandasはチャンクごとに型を推定するため、そのままでは欠損値が後続のチャンクに
+    だけある整数の列が、チャンクによって3と3.0のように異なる型で出力される。
+    型を指定しない場合は先頭のチャンクから推定した型をすべてのチャンクに使う
+
+    :param dtype: dict : 列名と型の対応(指定しない場合は先頭のチャンクから推定する)
+    """
+    logger.info(
+        f"Reading CSV from S3 in chunks. Bucket: {bucket}, Key: {key}, "
+        f"Chunk size: {chunksize}"
+    )
+    if dtype is None:
+        dtype = infer_csv_dtypes(s3_client, bucket, key, chunksize)
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    body = response["Body"]
+    try:
+        # Bodyをそのまま渡すと、パーサーが必要な分だけ読み込む
+        with pd.read_csv(body, chunksize=chunksize, dtype=dtype) as reader:
+            for chunk in reader:
+                yield chunk
+    finally:
+        body.close()
+
+
+def iter_arrow_chunks_from_s3(s3_client, bucket, key, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    ParquetまたはArrow IPCのファイルをchunksize行ごとのデータフレームで読み込む
+
+    ParquetのフッターとArrow IPCのファイル形式はランダムアクセスが必要なため、
+    オブジェクト全体(圧縮されたまま)を読み込んでからバッチ単位で変換する
+    """
+    file_format = detect_format(key)
+    logger.info(
+        f"Reading {file_format} from S3 in chunks. Bucket: {bucket}, Key: {key}, "
+        f"Chunk size: {chunksize}"
+    )
+    data = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    if file_format == "parquet":
+        batches = pq.ParquetFile(pa.BufferReader(data)).iter_batches(chunksize)
+    else:
+        batches = _open_arrow_ipc(data).read_all().to_batches(chunksize)
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+def iter_chunks_from_s3(
+    s3_client, bucket, key, chunksize=DEFAULT_CHUNK_SIZE, dtype=None
+):
+    """
+    拡張子から判定した形式でS3のファイルをチャンク単位で読み込む
+
+    :param dtype: dict : CSVの列名と型の対応(ParquetとArrow IPCでは使わない)
+    """
+    if detect_format(key) == "csv":
+        return iter_csv_chunks_from_s3(s3_client, bucket, key, chunksize, dtype)
+    return iter_arrow_chunks_from_s3(s3_client, bucket, key, chunksize)
+
+
+class S3MultipartWriter:
+    """
+    書き込んだバイト列をパートサイズごとにマルチパートアップロードする
+
+    メモリに保持するのは1パート分のバッファのみ。全体がパートサイズ未満の場合は
+    put_objectでアップロードし、例外が発生した場合はアップロードを中止する
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=DEFAULT_PART_SIZE):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.bytes_written = 0
+        # pyarrowのPythonFileでラップして書き込み先にするために参照される
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_written += len(data)
+        if len(self.buffer) >= self.part_size:
+            self._upload_part()
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key
+            )
+            self.upload_id = response["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=self.buffer,
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self.buffer = bytearray()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.upload_id is None:
+            self.s3_client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer)
+            )
+            self.buffer = bytearray()
+            return
+        if self.buffer:
+            self._upload_part()
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+
+    def abort(self):
+        self.closed = True
+        if self.upload_id is not None:
+            logger.info(f"Aborting multipart upload. Key: {self.key}")
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+            )
+        self.buffer = bytearray()
+
+
+def write_csv_chunks_to_s3(s3_client, chunks, bucket, key, part_size=DEFAULT_PART_SIZE):
+    logger.info(f"Writing CSV chunks to S3. Bucket: {bucket}, Key: {key}")
+    rows = 0
+    with S3MultipartWriter(s3_client, bucket, key, part_size) as writer:
+        for i, df in enumerate(chunks):
+            # ヘッダーは最初のチャンクのみ出力
+            writer.write(df.to_csv(index=False, header=i == 0).encode("utf-8"))
+            rows += len(df)
+    logger.info(
+        f"Successfully wrote CSV to S3. Rows: {rows}, Bytes: {writer.bytes_written}, "
+        f"Parts: {len(writer.parts) or 1}"
+    )
+    return rows
+
+
+def _validate_parquet_options(compression, row_group_size):
+    if compression not in PARQUET_COMPRESSIONS:
+        raise ValueError(f"unknown compression: {compression}")
+    if row_group_size < 1:
+        raise ValueError("row_group_size must be at least 1")
+
+
+def _is_all_null(column):
+    return len(column) > 0 and column.null_count == len(column)
+
+
+def unify_arrow_schema(tables):
+    """
+    チャンクごとに推定された列の型をまとめて、Parquetに出力する列の型を決める
+
+    全て欠損値の列(pandasではfloat64やobjectになる)は他のチャンクの型に合わせ、
+    どのチャンクでも型が決まらない列は、後のチャンクの値も変換できる文字列とする
+
+    :param tables: list : pyarrow.Tableのリスト
+    :return: pyarrow.Schema : 列の型
+    """
+    schemas = [
+        pa.schema(
+            [
+                pa.field(field.name, pa.null()) if _is_all_null(column) else field
+                for field, column in zip(table.schema, table.columns)
+            ]
+        )
+        for table in tables
+    ]
+    if not schemas:
+        return pa.schema([])
+    # int64とfloat64のように異なる数値型は、両方を表せる型にまとめる
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+    return pa.schema(
+        [
+            pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+            for field in schema
+        ]
+    )
+
+
+def _cast_table(table, schema):
+    # 全て欠損値の列は元の型によらず、欠損値の列として変換する
+    columns = [
+        pa.nulls(table.num_rows, field.type)
+        if _is_all_null(column)
+        else column.cast(field.type)
+        for field, column in zip(schema, table.select(schema.names).columns)
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ParquetChunkWriter:
+    """
+    テーブルを行グループ単位にまとめてParquetで書き込む
+
+    行グループがrow_group_size行になるよう、チャンクをまたいで行をまとめて書き込む。
+    schemaを指定しない場合は、最初の行グループを書き込むまでに受け取ったテーブルから
+    unify_arrow_schemaで列の型を決める
+    """
+
+    def __init__(self, sink, compression, row_group_size, schema=None):
+        self.sink = sink
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.schema = schema
+        self.writer = None
+        self.pending = []
+        self.pending_rows = 0
+
+    def write(self, table):
+        self.pending.append(table)
+        self.pending_rows += table.num_rows
+        if self.pending_rows < self.row_group_size:
+            return
+        combined = self._combine_pending()
+        full_rows = self.pending_rows - self.pending_rows % self.row_group_size
+        self._get_writer().write_table(
+            combined.slice(0, full_rows), self.row_group_size
+        )
+        self.pending = [combined.slice(full_rows)]
+        self.pending_rows -= full_rows
+
+    def _combine_pending(self):
+        if self.schema is None:
+            self.schema = unify_arrow_schema(self.pending)
+        return pa.concat_tables([_cast_table(t, self.schema) for t in self.pending])
+
+    def _get_writer(self):
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(
+                self.sink, self.schema, compression=self.compression
+            )
+        return self.writer
+
+    def close(self):
+        if self.pending_rows:
+            combined = self._combine_pending()
+            self._get_writer().write_table(combined, self.row_group_size)
+        elif self.schema is None:
+            # 入力が空の場合も、受け取った列で読めるParquetファイルを出力する
+            self.schema = unify_arrow_schema(self.pending)
+        writer = self._get_writer()
+        self.pending = []
+        self.pending_rows = 0
+        writer.close()
+
+
+def _write_parquet_tables(sink, tables, compression, row_group_size, schema=None):
+    writer = ParquetChunkWriter(sink, compression, row_group_size, schema)
+    for table in tables:
+        writer.write(table)
+    writer.close()
+
+
+def _to_arrow_tables(chunks, counter):
+    for df in chunks:
+        counter["rows"] += len(df)
+        yield pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_parquet_chunks_to_s3(
+    s3_client,
+    chunks,
+    bucket,
+    key,
+    compression="snappy",
+    row_group_size=DEFAULT_ROW_GROUP_SIZE,
+    part_size=DEFAULT_PART_SIZE,
+    schema=None,
+):
+    """
+    データフレームのチャンクを1つのParquetファイルとしてマルチパートアップロードする
+
+    schemaを指定しない場合、列の型は最初の行グループに含まれるチャンクから
+    unify_arrow_schemaで決める(変換できない場合はpyarrowの例外を送出する)
+
+    :param compression: str : snappy / zstd
+    :param row_group_size: int : 1行グループあたりの行数
+    :param schema: pyarrow.Schema : 出力する列の型
+    :return: int : 出力した行数
+    """
+    _validate_parquet_options(compression, row_group_size)
+    logger.info(
+        f"Writing Parquet chunks to S3. Bucket: {bucket}, Key: {key}, "
+        f"Compression: {compression}, Row group size: {row_group_size}"
+    )
+    counter = {"rows": 0}
+    with S3MultipartWriter(s3_client, bucket, key, part_size) as writer:
+        _write_parquet_tables(
+            pa.PythonFile(writer, mode="w"),
+            _to_arrow_tables(chunks, counter),
+            compression,
+            row_group_size,
+            schema,
+        )
+    logger.info(
+        f"Successfully wrote Parquet to S3. Rows: {counter['rows']}, "
+        f"Bytes: {writer.bytes_written}, Parts: {len(writer.parts) or 1}"
+    )
+    return counter["rows"]
+
+
+def partition_path(column, value):
+    """
+    Hive形式のパーティションのディレクトリ名({列名}={値})を作成する
+    """
+    if pd.isna(value):
+        return f"{column}={HIVE_DEFAULT_PARTITION}"
+    return f"{column}={quote(str(value), safe='')}"
+
+
+def write_partitioned_parquet_chunks_to_s3(
+    s3_client,
+    chunks,
+    bucket,
+    prefix,
+    partition_column,
+    compression="snappy",
+    row_group_size=DEFAULT_ROW_GROUP_SIZE,
+    part_size=DEFAULT_PART_SIZE,
+    schema=None,
+):
+    """
+    データフレームのチャンクをHive形式でパーティション分割したParquetで出力する
+
+    {prefix}{列名}={値}/part-00000.parquet に値ごとに1ファイル出力する。
+    行はパーティションごとにチャンクをまたいでまとめ、row_group_size行ごとに
+    行グループとして書き込む。パーティション列はファイルには含めない
+
+    メモリには値ごとに1行グループ未満の行と1パート分のバッファを保持するため、
+    値の種類が多い列には向かない
+
+    :param prefix: str : 出力先のプレフィックス
+    :param partition_column: str : パーティション分割に使う列
+    :param schema: pyarrow.Schema : 出力する列の型(パーティション列を除く)
+    :return: int : 出力した行数
+    """
+    _validate_parquet_options(compression, row_group_size)
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    logger.info(
+        f"Writing partitioned Parquet to S3. Bucket: {bucket}, Prefix: {prefix}, "
+        f"Partition column: {partition_column}, Compression: {compression}"
+    )
+    rows = 0
+    # パーティションのディレクトリ名 -> (S3MultipartWriter, ParquetChunkWriter)
+    writers = {}
+    try:
+        for df in chunks:
+            if partition_column not in df.columns:
+                raise ValueError(f"partition column not found: {partition_column}")
+            for value, group in df.groupby(partition_column, dropna=False, sort=False):
+                directory = partition_path(partition_column, value)
+                if directory not in writers:
+                    key = f"{prefix}{directory}/part-00000.parquet"
+                    s3_writer = S3MultipartWriter(s3_client, bucket, key, part_size)
+                    writers[directory] = (
+                        s3_writer,
+                        ParquetChunkWriter(
+                            pa.PythonFile(s3_writer, mode="w"),
+                            compression,
+                            row_group_size,
+                            schema,
+                        ),
+                    )
+                writers[directory][1].write(
+                    pa.Table.from_pandas(
+                        group.drop(columns=partition_column), preserve_index=False
+                    )
+                )
+            rows += len(df)
+        for s3_writer, parquet_writer in writers.values():
+            parquet_writer.close()
+            s3_writer.close()
+    except BaseException:
+        for s3_writer, _ in writers.values():
+            if not s3_writer.closed:
+                s3_writer.abort()
+        raise
+    logger.info(
+        f"Successfully wrote partitioned Parquet to S3. Rows: {rows}, "
+        f"Files: {len(writers)}, "
+        f"Bytes: {sum(w.bytes_written for w, _ in writers.values())}"
+    )
+    return rows
+
+
+def write_parquet_to_s3(
+    s3_client,
+    df,
+    bucket,
+    key,
+    compression="snappy",
+    row_group_size=DEFAULT_ROW_GROUP_SIZE,
+    partition_column=None,
+    schema=None,
+):
+    """
+    データフレームをParquetでS3に出力する
+
+    partition_columnを指定した場合、keyをプレフィックスとしてHive形式で
+    パーティション分割する
+    """
+    if partition_column:
+        return write_partitioned_parquet_chunks_to_s3(
+            s3_client,
+            [df],
+            bucket,
+            key,
+            partition_column,
+            compression,
+            row_group_size,
+            schema=schema,
+        )
+    return write_parquet_chunks_to_s3(
+        s3_client, [df], bucket, key, compression, row_group_size, schema=schema
+    )
+
+
+def process_streaming(
+    s3_client,
+    input_bucket,
+    input_key,
+    output_bucket,
+    output_key,
+    output_format="csv",
+    chunksize=DEFAULT_CHUNK_SIZE,
+    part_size=DEFAULT_PART_SIZE,
+    compression="snappy",
+    row_group_size=DEFAULT_ROW_GROUP_SIZE,
+    partition_column=None,
+    schema=None,
+    dtype=None,
+):
+    """
+    入力(CSV / Parquet / Arrow IPC)をチャンク単位で加工し、CSVまたはParquetで出力する
+
+    :param output_format: str : csv / parquet
+    :param compression: str : Parquetの圧縮形式(snappy / zstd)
+    :param row_group_size: int : Parquetの1行グループあたりの行数
+    :param partition_column: str : Hive形式でパーティション分割する列
+                                   (指定した場合、output_keyはプレフィックス)
+    :param schema: pyarrow.Schema : Parquetに出力する列の型
+                                    (指定しない場合はチャンクの型から決める)
+    :param dtype: dict : CSVの列名と型の対応(指定しない場合は先頭のチャンクから推定する)
+    :return: int : 出力した行数
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format: {output_format}")
+    if partition_column and output_format != "parquet":
+        raise ValueError("partition_column is only supported for parquet output")
+    # 入力をチャンク単位で読み込み・加工・アップロードするため、
+    # メモリ使用量はファイルサイズによらずチャンクとパート1つ分程度になる
+    # 経過年数の基準日時はすべてのチャンクで同じにする
+    now = pendulum.now()
+    chunks = _process_chunks(
+        iter_chunks_from_s3(s3_client, input_bucket, input_key, chunksize, dtype), now
+    )
+    if output_format == "csv":
+        return write_csv_chunks_to_s3(
+            s3_client, chunks, output_bucket, output_key, part_size
+        )
+    if partition_column:
+        return write_partitioned_parquet_chunks_to_s3(
+            s3_client,
+            chunks,
+            output_bucket,
+            output_key,
+            partition_column,
+            compression,
+            row_group_size,
+            part_size,
+            schema,
+        )
+    return write_parquet_chunks_to_s3(
+        s3_client,
+        chunks,
+        output_bucket,
+        output_key,
+        compression,
+        row_group_size,
+        part_size,
+        schema,
+    )
+
+
+def _process_chunks(chunks, now):
+    # process_dataのログはチャンクごとに出力されるためDEBUGとし、
+    # 進捗はPROGRESS_LOG_INTERVALチャンクごとにINFOで出力する
+    rows = 0
+    for i, chunk in enumerate(chunks, start=1):
+        rows += len(chunk)
+        yield process_data(chunk, now=now)
+        if i % PROGRESS_LOG_INTERVAL == 0:
+            logger.info(f"Processed {i} chunks. Rows: {rows}")
+
+
+def process_csv_streaming(
+    s3_client,
+    input_bucket,
+    input_key,
+    output_bucket,
+    output_key,
+    chunksize=DEFAULT_CHUNK_SIZE,
+    part_size=DEFAULT_PART_SIZE,
+):
+    return process_streaming(
+        s3_client,
+        input_bucket,
+        input_key,
+        output_bucket,
+        output_key,
+        chunksize=chunksize,
+        part_size=part_size,
+    )
+
+
 def calculate_years_since_arrival(arrival_date, reference_date):
     return reference_date.diff(pendulum.parse(arrival_date)).in_years()
 
 
-def process_data(df):
-    logger.info("Starting data processing")
-    logger.info(f"Input data shape: {df.shape}")
+# ベクトル化して計算する日時の形式(日付、または日付と時刻とUTCオフセット)
+# これ以外の形式はpendulumで1行ずつ計算する
+ISO_DATETIME_PATTERN = (
+    r"\d{4}-\d{2}-\d{2}"
+    r"(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,9})?)?(?:Z|[+-]\d{2}(?::?\d{2})?)?)?"
+)
+# 日時のうちUTCオフセットより前の部分と、UTCオフセット
+ISO_DATETIME_BODY_PATTERN = r"^\d{4}-\d{2}-\d{2}(?:[T ][\d:.]+)?"
+ISO_OFFSET_PATTERN = r"(?:Z|[+-]\d{2}(?::?\d{2})?)$"
+DAYS_PER_MONTHS = (
+    (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31),
+    (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31),
+)
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 1_000_000
 
-    # 現在の日付を取得
-    now = pendulum.now()
+
+def _tz_name(tzinfo):
+    for attr in ("key", "name", "zone"):
+        if hasattr(tzinfo, attr):
+            return getattr(tzinfo, attr)
+    return ""
+
+
+def _is_leap(year):
+    return (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+
+
+def _trunc_divmod(value, divisor):
+    # 0方向に切り捨てる除算(余りは被除数と同じ符号)
+    quotient = np.sign(value) * (np.abs(value) // divisor)
+    return quotient, value - quotient * divisor
+
+
+def _datetime_fields(values):
+    # datetime64[us]の配列から年・月・日・時・分・秒・マイクロ秒を取り出す
+    months = values.astype("datetime64[M]")
+    days = values.astype("datetime64[D]")
+    time_of_day = (values - days).astype(np.int64)
+    return {
+        "year": months.astype(np.int64) // 12 + 1970,
+        "month": months.astype(np.int64) % 12 + 1,
+        "day": (days - months).astype(np.int64) + 1,
+        "hour": time_of_day // 3_600_000_000,
+        "minute": time_of_day // 60_000_000 % 60,
+        "second": time_of_day // 1_000_000 % 60,
+        "microsecond": time_of_day % 1_000_000,
+    }
+
+
+def _adjust_offset(fields, offset, adjust):
+    # 時・分・秒のみUTCに補正し、日は1日だけ繰り上げ・繰り下げる(月・年はそのまま)
+    hours, offset = _trunc_divmod(offset, 3600)
+    minutes, seconds = _trunc_divmod(offset, 60)
+    day = fields["day"].copy()
+    hour = fields["hour"] - np.where(adjust, hours, 0)
+    minute = fields["minute"] - np.where(adjust, minutes, 0)
+    second = fields["second"] - np.where(adjust, seconds, 0)
+
+    minute = minute - (second < 0) + (second > 60)
+    second = np.where(
+        second < 0, second + 60, np.where(second > 60, second - 60, second)
+    )
+    hour = hour - (minute < 0) + (minute > 60)
+    minute = np.where(
+        minute < 0, minute + 60, np.where(minute > 60, minute - 60, minute)
+    )
+    day = day - (hour < 0) + (hour > 24)
+    hour = np.where(hour < 0, hour + 24, np.where(hour > 24, hour - 24, hour))
+    adjusted = dict(fields, hour=hour, minute=minute, second=second)
+    adjusted["day"] = np.where(adjust, day, fields["day"])
+    return adjusted
+
+
+def calculate_years_since_arrival_vectorized(arrival_dates, reference_date):
+    # reference_date.diff(pendulum.parse(x)).in_years()と同じ結果をNumPyで計算する
+    # pendulum 3の拡張モジュールのprecise_diffと同じ規則で計算するため、
+    # 以下の挙動も再現している
+    # - 差は絶対値(到着日が未来の場合も正の年数)
+    # - タイムゾーン名が異なる場合は時刻のみUTCに補正し、日付は日のみ1日ずらす
+    #   (月末から繰り上がっても月は変わらない)
+    # - 日の差が負の場合は月を繰り下げるが、前月と当月の日数の差と一致する場合
+    #   (例: 1/31→2/28)はちょうど1か月とみなして繰り下げない
+    # ISO_DATETIME_PATTERNに一致しない値・日時として不正な値・欠損値は
+    # pendulumで計算し、エラーも同じく送出する
+    values = arrival_dates.astype("string")
+    is_iso = values.str.fullmatch(ISO_DATETIME_PATTERN).fillna(False)
+    suffix = values.str.replace(ISO_DATETIME_BODY_PATTERN, "", regex=True)
+    # UTCオフセットを除いた壁時計の時刻を解析する(日付のみの値はそのまま)
+    body = values.where(
+        values.str.len() == 10,
+        values.str.replace(ISO_OFFSET_PATTERN, "", regex=True),
+    )
+    # format="ISO8601"はpandas 2.0以降。それより前のpandasでは全ての値を
+    # pendulumで計算する(結果は同じ)
+    wall = pd.to_datetime(body.where(is_iso), format="ISO8601", errors="coerce")
+    offset_names = {"": "UTC"}
+    offset_seconds = {"": 0}
+    for offset in suffix[is_iso].unique():
+        if offset in offset_names:
+            continue
+        try:
+            parsed = pendulum.parse(f"2000-01-01T00:00:00{offset}")
+        except Exception:
+            continue
+        offset_names[offset] = _tz_name(parsed.tzinfo)
+        offset_seconds[offset] = int(parsed.utcoffset().total_seconds())
+    # オフセットのない値はpendulum.parseと同じくUTCとみなす
+    arrival_tz = suffix.map(offset_names).to_numpy(dtype=object, na_value="")
+    arrival_offset = suffix.map(offset_seconds).fillna(0).to_numpy(np.int64)
+    is_valid = (is_iso & wall.notna() & suffix.isin(offset_names)).to_numpy(bool)
+
+    # Interval.__init__と同じく、タイムゾーン付きのdatetimeに変換した値で計算する
+    reference = datetime(
+        reference_date.year,
+        reference_date.month,
+        reference_date.day,
+        reference_date.hour,
+        reference_date.minute,
+        reference_date.second,
+        reference_date.microsecond,
+        tzinfo=reference_date.tzinfo,
+    )
+    reference_offset = int(reference.utcoffset().total_seconds())
+    reference_wall = np.datetime64(reference.replace(tzinfo=None), "us")
+    reference_instant = np.datetime64(
+        reference_date.in_timezone("UTC").naive(), "us"
+    ).astype(np.int64)
+
+    arrival_wall = wall.to_numpy(dtype="datetime64[us]")
+    arrival_wall = np.where(is_valid, arrival_wall, reference_wall)
+    arrival_instant = arrival_wall.astype(np.int64) - arrival_offset * 1_000_000
+
+    # diff(abs=True)は早い方を起点にする
+    arrival_first = reference_instant > arrival_instant
+    wall1 = np.where(arrival_first, arrival_wall, reference_wall)
+    wall2 = np.where(arrival_first, reference_wall, arrival_wall)
+    offset1 = np.where(arrival_first, arrival_offset, reference_offset)
+    offset2 = np.where(arrival_first, reference_offset, arrival_offset)
+    in_same_tz = (arrival_tz == _tz_name(reference.tzinfo)) & (arrival_tz != "")
+    same_date = wall1.astype("datetime64[D]") == wall2.astype("datetime64[D]")
+    fields1 = _adjust_offset(
+        _datetime_fields(wall1), offset1, (~in_same_tz & (offset1 != 0)) | same_date
+    )
+    fields2 = _adjust_offset(
+        _datetime_fields(wall2), offset2, (~in_same_tz & (offset2 != 0)) | same_date
+    )
+
+    # 補正後の年月日時分秒の辞書順で前後を比較し、逆の場合は入れ替えて符号を反転する
+    def sort_keys(fields):
+        date_key = (fields["year"] * 100 + fields["month"]) * 100 + fields["day"]
+        time_key = (
+            (fields["hour"] * 100 + fields["minute"]) * 100 + fields["second"]
+        ) * 1_000_000 + fields["microsecond"]
+        return date_key, time_key
+
+    date_key1, time_key1 = sort_keys(fields1)
+    date_key2, time_key2 = sort_keys(fields2)
+    swap = (date_key1 > date_key2) | (
+        (date_key1 == date_key2) & (time_key1 > time_key2)
+    )
+    start = {k: np.where(swap, fields2[k], v) for k, v in fields1.items()}
+    end = {k: np.where(swap, v, fields2[k]) for k, v in fields1.items()}
+
+    microsecond_diff = end["microsecond"] - start["microsecond"]
+    second_diff = end["second"] - start["second"] - (microsecond_diff < 0)
+    minute_diff = end["minute"] - start["minute"] - (second_diff < 0)
+    hour_diff = end["hour"] - start["hour"] - (minute_diff < 0)
+    day_diff = end["day"] - start["day"] - (hour_diff < 0)
+
+    last_month = np.where(end["month"] == 1, 12, end["month"] - 1)
+    last_month_year = np.where(end["month"] == 1, end["year"] - 1, end["year"])
+    days_per_months = np.array(DAYS_PER_MONTHS)
+    days_in_last_month = days_per_months[
+        _is_leap(last_month_year).astype(int), last_month
+    ]
+    days_in_month = days_per_months[_is_leap(end["year"]).astype(int), end["month"]]
+    month_borrow = (day_diff < 0) & (day_diff != days_in_month - days_in_last_month)
+    month_diff = end["month"] - start["month"] - month_borrow
+    years = end["year"] - start["year"] - (month_diff < 0)
+    years = np.where(swap, -years, years)
+
+    result = pd.Series(years, index=arrival_dates.index, dtype=np.int64)
+    if not is_valid.all():
+        result[~is_valid] = arrival_dates[~is_valid].apply(
+            lambda x: calculate_years_since_arrival(x, reference_date)
+        )
+    return result
+
+
+YEARS_SINCE_ARRIVAL_METHODS = {
+    "vectorized": calculate_years_since_arrival_vectorized,
+    # 1行ずつpendulumで計算する(検証用)
+    "pendulum": lambda arrival_dates, reference_date: arrival_dates.apply(
+        lambda x: calculate_years_since_arrival(x, reference_date)
+    ),
+}
+
+
+def process_data(df, method="vectorized", now=None):
+    if method not in YEARS_SINCE_ARRIVAL_METHODS:
+        raise ValueError(f"unknown method: {method}")
+    logger.debug("Starting data processing")
+    logger.debug(f"Input data shape: {df.shape}")
+
+    # 現在の日付を取得(ストリーミング処理では呼び出し元で1回だけ取得したものを使う)
+    if now is None:
+        now = pendulum.now()
 
     if "arrival_date" in df.columns:
         # 到着からの経過年数を計算
-        df["years_since_arrival"] = df["arrival_date"].apply(
-            lambda x: calculate_years_since_arrival(x, now)
+        df["years_since_arrival"] = YEARS_SINCE_ARRIVAL_METHODS[method](
+            df["arrival_date"], now
         )
-        logger.info("Added years since arrival")
+        logger.debug("Added years since arrival")
 
-    logger.info(f"Processed data shape: {df.shape}")
-    logger.info("Data processing complete")
+    logger.debug(f"Processed data shape: {df.shape}")
+    logger.debug("Data processing complete")
     return df
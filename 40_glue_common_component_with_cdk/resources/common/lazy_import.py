@@ -0,0 +1,63 @@
+import os
+import sys
+
+# 1を指定すると遅延せずにその場でimportする(起動時間の比較・デバッグ用)
+EAGER_IMPORTS_ENV = "COMMON_EAGER_IMPORTS"
+
+
+class LazyModule:
+    """
+    属性に初めてアクセスした時点でimportするモジュールの代理オブジェクト
+
+    pandasなど読み込みに時間がかかるモジュールを使う処理が実行されるまで
+    importを遅らせ、ジョブの起動時間を短くする
+    """
+
+    def __init__(self, name):
+        """
+        :param name: str : モジュール名(例: pyarrow.parquet)
+        """
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            name = self.__dict__["_name"]
+            # importlib.import_moduleではなく__import__を使い、
+            # ImportProfilerで計測できるようにする
+            __import__(name)
+            module = sys.modules[name]
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    モジュールを初めて使う時点でimportする
+
+    既にimport済みの場合と、環境変数COMMON_EAGER_IMPORTS=1の場合は
+    その場でimportしたモジュールを返す
+
+    :param name: str : モジュール名
+    :return: LazyModule : モジュールの代理オブジェクト(またはモジュール)
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    module = LazyModule(name)
+    if os.environ.get(EAGER_IMPORTS_ENV) == "1":
+        return module._load()
+    return module
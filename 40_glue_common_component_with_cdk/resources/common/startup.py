@@ -0,0 +1,142 @@
+import builtins
+import itertools
+import json
+import pkgutil
+import sys
+import time
+
+# 起動時の処理を有効にするジョブ引数(--PROFILE_STARTUP true のように指定する)
+PROFILE_STARTUP_FLAG = "PROFILE_STARTUP"
+LIST_MODULES_FLAG = "LIST_MODULES"
+TRUE_VALUES = ("true", "1", "yes")
+
+
+def flag_enabled(argv, name):
+    """
+    ジョブ引数のフラグが有効か判定する
+
+    getResolvedOptionsを使う前(awsglueのimport前)に判定できるよう、
+    sys.argvを直接参照する
+
+    :param argv: list : sys.argv
+    :param name: str : 引数名(先頭の--は不要)
+    :return: bool : --{name} の値がtrue / 1 / yesの場合True
+    """
+    option = f"--{name}"
+    for i, arg in enumerate(argv):
+        if arg == option:
+            return i + 1 < len(argv) and argv[i + 1].lower() in TRUE_VALUES
+        if arg.startswith(option + "="):
+            return arg.split("=", 1)[1].lower() in TRUE_VALUES
+    return False
+
+
+def print_importable_modules():
+    # sys.path上の全てのモジュールを列挙するため時間がかかる。デバッグ時のみ使う
+    print("--- Importable Python Modules ---")
+    for module in pkgutil.iter_modules():
+        print(module.name)
+
+
+class ImportProfiler:
+    """
+    importにかかった時間をモジュールごとに計測する
+
+    python -X importtimeと同じく、モジュールごとの自身の時間(self)と
+    配下のimportを含めた時間(cumulative)を記録する。
+    builtins.__import__を置き換えて計測するため、importlib.import_moduleで
+    直接importされたモジュールは親のselfに含まれる
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.started_at = None
+        self._stack = []
+        self._original_import = None
+
+    def start(self):
+        if self._original_import is not None:
+            return
+        self.started_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self):
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        loaded = len(sys.modules)
+        # 配下で計測したimportのcumulativeの合計
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = self._stack.pop()
+            # import済みのモジュールのみの場合は記録せず、呼び出し元のselfに含める
+            if len(sys.modules) > loaded:
+                if self._stack:
+                    self._stack[-1] += cumulative
+                self.entries.append(
+                    {
+                        "module": _loaded_module_name(
+                            _resolve_name(name, globals, level), fromlist, loaded
+                        ),
+                        "self_us": int((cumulative - children) * 1e6),
+                        "cumulative_us": int(cumulative * 1e6),
+                        "depth": len(self._stack),
+                    }
+                )
+
+    def log(self, logger, phase, top=30):
+        """
+        前回の出力以降に記録したimportの内訳を1行のJSONでログに出力する
+
+        :param logger: logging.Logger : 出力先のロガー
+        :param phase: str : 計測した区間の名前(startup / job など)
+        :param top: int : 出力するモジュール数の上限(cumulativeの降順)
+        """
+        entries, self.entries = self.entries, []
+        top_level = [entry for entry in entries if entry["depth"] == 0]
+        logger.info(
+            json.dumps(
+                {
+                    "event": "import_profile",
+                    "phase": phase,
+                    "elapsed_ms": round(
+                        (time.perf_counter() - self.started_at) * 1e3, 1
+                    ),
+                    "import_ms": round(
+                        sum(entry["cumulative_us"] for entry in top_level) / 1e3, 1
+                    ),
+                    "import_count": len(entries),
+                    "imports": sorted(
+                        entries, key=lambda entry: entry["cumulative_us"], reverse=True
+                    )[:top],
+                }
+            )
+        )
+
+
+def _resolve_name(name, globals, level):
+    if level == 0 or not globals:
+        return name
+    package = globals.get("__package__") or globals.get("__name__", "")
+    base = package.rsplit(".", level - 1)[0] if level > 1 else package
+    return f"{base}.{name}" if name else base
+
+
+def _loaded_module_name(name, fromlist, loaded):
+    # from a import b のようにサブモジュールを読み込んだ場合は、そのモジュール名とする
+    # (sys.modulesは追加された順のため、loaded以降が今回読み込まれたモジュール)
+    new_modules = list(itertools.islice(sys.modules, loaded, None))
+    if name in new_modules or not new_modules:
+        return name
+    for item in fromlist or ():
+        if f"{name}.{item}" in new_modules:
+            return f"{name}.{item}"
+    return new_modules[0]
@@ -1,29 +1,54 @@
-import pkgutil
 import sys
 import traceback
 
-import boto3
-
-
-def print_importable_modules():
-    print("--- Importable Python Modules ---")
-    for module in pkgutil.iter_modules():
-        print(module.name)
-
+from common.startup import (
+    LIST_MODULES_FLAG,
+    PROFILE_STARTUP_FLAG,
+    ImportProfiler,
+    flag_enabled,
+    print_importable_modules,
+)
 
-print_importable_modules()
+# --PROFILE_STARTUP true の場合、以降のimportにかかった時間を計測してログに出力する
+profiler = ImportProfiler() if flag_enabled(sys.argv, PROFILE_STARTUP_FLAG) else None
+if profiler is not None:
+    profiler.start()
 
 from awsglue.utils import getResolvedOptions  # noqa: E402
+from common.aws_clients import get_client  # noqa: E402
 from common.data_processing import (  # noqa: E402
+    DEFAULT_ROW_GROUP_SIZE,
     get_current_time,
-    process_data,
-    read_csv_from_s3,
-    write_csv_to_s3,
+    process_streaming,
 )
 from common.get_logger import setup_logging  # noqa: E402
 
 logger = setup_logging()
 
+# sys.path上の全モジュールの列挙は時間がかかるため、--LIST_MODULES true の場合のみ行う
+if flag_enabled(sys.argv, LIST_MODULES_FLAG):
+    print_importable_modules()
+
+# 省略可能なジョブ引数と既定値
+OPTIONAL_ARGS = {
+    # 出力形式(csv / parquet)
+    "OUTPUT_FORMAT": "csv",
+    # Parquetの圧縮形式(snappy / zstd)
+    "PARQUET_COMPRESSION": "snappy",
+    # Parquetの1行グループあたりの行数
+    "PARQUET_ROW_GROUP_SIZE": str(DEFAULT_ROW_GROUP_SIZE),
+    # Hive形式でパーティション分割する列(空の場合は分割しない)
+    "PARTITION_COLUMN": "",
+}
+
+
+def get_optional_args(argv):
+    # getResolvedOptionsは指定されていない引数を渡すとエラーになるため、
+    # 指定された引数のみ取得して既定値とマージする
+    names = [name for name in OPTIONAL_ARGS if f"--{name}" in argv]
+    args = getResolvedOptions(argv, names) if names else {}
+    return {**OPTIONAL_ARGS, **args}
+
 
 def main():
     try:
@@ -40,24 +65,44 @@ def main():
         s3_input_key = args["S3_INPUT_KEY"]
         s3_output_bucket = args["S3_OUTPUT_BUCKET"]
         s3_output_key = args["S3_OUTPUT_KEY_PREFIX"]
+        options = get_optional_args(sys.argv)
+        output_format = options["OUTPUT_FORMAT"]
+        partition_column = options["PARTITION_COLUMN"] or None
+        if profiler is not None:
+            profiler.log(logger, "startup")
         logger.info(f"Reading input data from s3://{s3_input_bucket}/{s3_input_key}")
 
-        s3_client = boto3.client("s3")
-
-        input_data = read_csv_from_s3(s3_client, s3_input_bucket, s3_input_key)
-
-        logger.info("Processing data...")
-        processed_data = process_data(input_data)
+        s3_client = get_client("s3")
 
         current_time = get_current_time().strftime("%Y-%m-%d-%H-%M-%S")
-        output_filename = f"{s3_output_key}output_{current_time}.csv"
+        if partition_column:
+            # パーティション分割する場合は出力先のプレフィックスになる
+            output_filename = f"{s3_output_key}output_{current_time}/"
+        else:
+            output_filename = f"{s3_output_key}output_{current_time}.{output_format}"
 
         logger.info(
             f"Writing processed data to s3://{s3_output_bucket}/{output_filename}"
         )
-        write_csv_to_s3(s3_client, processed_data, s3_output_bucket, output_filename)
+        # 入力ファイル全体をメモリに載せないよう、チャンク単位で加工して出力する
+        # 入力の形式(CSV / Parquet / Arrow IPC)はS3_INPUT_KEYの拡張子で判定する
+        process_streaming(
+            s3_client,
+            s3_input_bucket,
+            s3_input_key,
+            s3_output_bucket,
+            output_filename,
+            output_format=output_format,
+            compression=options["PARQUET_COMPRESSION"],
+            row_group_size=int(options["PARQUET_ROW_GROUP_SIZE"]),
+            partition_column=partition_column,
+        )
 
         logger.info("ETL process completed successfully")
+        if profiler is not None:
+            # pandasなど処理中に初めて使ったモジュールのimport
+            profiler.log(logger, "job")
+            profiler.stop()
 
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
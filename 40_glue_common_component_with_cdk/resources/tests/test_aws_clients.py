@@ -0,0 +1,56 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from common.aws_clients import (
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    clear_clients,
+    get_client,
+    get_session,
+)
+
+
+@pytest.fixture(autouse=True)
+def clients():
+    clear_clients()
+    yield
+    clear_clients()
+
+
+def test_get_client_caches_per_service_and_region():
+    s3_client = get_client("s3", region_name="us-east-1")
+
+    assert get_client("s3", region_name="us-east-1") is s3_client
+    assert get_client("s3", region_name="ap-northeast-1") is not s3_client
+    assert get_client("sqs", region_name="us-east-1") is not s3_client
+
+
+def test_get_client_applies_default_config():
+    config = get_client("s3", region_name="us-east-1").meta.config
+
+    assert config.max_pool_connections == DEFAULT_MAX_POOL_CONNECTIONS
+    assert config.retries["mode"] == "adaptive"
+    assert config.tcp_keepalive is True
+
+
+def test_get_client_creates_one_client_across_threads():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(
+            executor.map(lambda _: get_client("s3", region_name="us-east-1"), range(32))
+        )
+
+    assert all(client is clients[0] for client in clients)
+
+
+def test_clear_clients_discards_session_and_clients():
+    session = get_session()
+    s3_client = get_client("s3", region_name="us-east-1")
+
+    clear_clients()
+
+    assert get_session() is not session
+    assert get_client("s3", region_name="us-east-1") is not s3_client
@@ -0,0 +1,513 @@
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import boto3
+import pandas as pd
+import pendulum
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_s3
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from common.data_processing import (
+    MIN_PART_SIZE,
+    YEARS_SINCE_ARRIVAL_METHODS,
+    S3MultipartWriter,
+    detect_format,
+    process_csv_streaming,
+    process_data,
+    process_streaming,
+    read_csv_from_s3,
+    read_from_s3,
+    write_parquet_chunks_to_s3,
+    write_partitioned_parquet_chunks_to_s3,
+)
+
+
+@pytest.fixture
+def s3_client():
+    with mock_s3():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="test-bucket")
+        yield conn
+
+
+@pytest.fixture(scope="module")
+def moto_server_client():
+    # インプロセスのmotoはget_objectでオブジェクト全体をメモリに載せるため、
+    # メモリ使用量の計測では別プロセスのmoto serverを使う
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-p", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    conn = boto3.client(
+        "s3",
+        region_name="us-east-1",
+        endpoint_url=f"http://127.0.0.1:{port}",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+    try:
+        for _ in range(100):
+            try:
+                conn.create_bucket(Bucket="test-bucket")
+                break
+            except Exception:
+                time.sleep(0.1)
+        else:
+            pytest.skip("moto server did not start")
+        yield conn
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def make_csv(rows, arrival_date=True):
+    if not arrival_date:
+        lines = ["id,name,value"]
+        # tracemallocのオーバーヘッドを抑えるため、1行を長くして行数を減らす
+        lines.extend(f"{i},{'x' * 100}_{i % 1000},{i * 0.5}" for i in range(rows))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+    lines = ["id,name,value,arrival_date"]
+    for i in range(rows):
+        lines.append(f"{i},name_{i % 1000},{i * 0.5},20{10 + i % 10}-0{1 + i % 9}-15")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_process_csv_streaming_matches_in_memory(s3_client):
+    s3_client.put_object(Bucket="test-bucket", Key="input.csv", Body=make_csv(2500))
+
+    rows = process_csv_streaming(
+        s3_client, "test-bucket", "input.csv", "test-bucket", "output.csv", 1000
+    )
+
+    assert rows == 2500
+    expected = process_data(read_csv_from_s3(s3_client, "test-bucket", "input.csv"))
+    actual = read_csv_from_s3(s3_client, "test-bucket", "output.csv")
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_process_csv_streaming_header_only(s3_client):
+    s3_client.put_object(Bucket="test-bucket", Key="input.csv", Body=make_csv(0))
+
+    rows = process_csv_streaming(
+        s3_client, "test-bucket", "input.csv", "test-bucket", "output.csv"
+    )
+
+    assert rows == 0
+    body = s3_client.get_object(Bucket="test-bucket", Key="output.csv")["Body"]
+    assert body.read().decode("utf-8").splitlines()[0].startswith("id,name,value")
+
+
+NULLS_IN_LATER_CHUNK_CSV = (
+    "id,count,flag\n1,3,True\n2,4,False\n3,5,True\n4,,\n5,6,False\n"
+)
+
+
+def test_process_streaming_keeps_types_when_nulls_appear_later(s3_client):
+    s3_client.put_object(
+        Bucket="test-bucket", Key="input.csv", Body=NULLS_IN_LATER_CHUNK_CSV
+    )
+
+    process_streaming(
+        s3_client, "test-bucket", "input.csv", "test-bucket", "output.csv", chunksize=3
+    )
+
+    # 欠損値が2つ目のチャンクにしかなくても、すべてのチャンクで同じ型で出力される
+    body = s3_client.get_object(Bucket="test-bucket", Key="output.csv")["Body"]
+    assert body.read().decode("utf-8") == (
+        "id,count,flag\n1,3,True\n2,4,False\n3,5,True\n4,,\n5,6,False\n"
+    )
+
+
+def test_process_streaming_uses_explicit_dtype(s3_client):
+    s3_client.put_object(
+        Bucket="test-bucket", Key="input.csv", Body=NULLS_IN_LATER_CHUNK_CSV
+    )
+
+    process_streaming(
+        s3_client,
+        "test-bucket",
+        "input.csv",
+        "test-bucket",
+        "output.csv",
+        chunksize=3,
+        dtype={"count": "float64"},
+    )
+
+    body = s3_client.get_object(Bucket="test-bucket", Key="output.csv")["Body"]
+    assert body.read().decode("utf-8").splitlines()[1:5] == [
+        "1,3.0,True",
+        "2,4.0,False",
+        "3,5.0,True",
+        "4,,",
+    ]
+
+
+def test_process_streaming_uses_same_reference_date(s3_client, monkeypatch):
+    s3_client.put_object(Bucket="test-bucket", Key="input.csv", Body=make_csv(30))
+    calls = []
+    real_now = pendulum.now
+    monkeypatch.setattr(pendulum, "now", lambda *args: calls.append(args) or real_now())
+
+    process_streaming(
+        s3_client, "test-bucket", "input.csv", "test-bucket", "output.csv", chunksize=10
+    )
+
+    # 基準日時はチャンクごとではなく1回だけ取得する
+    assert len(calls) == 1
+
+
+def test_multipart_writer_uploads_parts(s3_client):
+    data = os.urandom(MIN_PART_SIZE * 2 + 123)
+
+    with S3MultipartWriter(
+        s3_client, "test-bucket", "output.bin", MIN_PART_SIZE
+    ) as writer:
+        for i in range(0, len(data), 1024 * 1024):
+            writer.write(data[i : i + 1024 * 1024])
+
+    assert len(writer.parts) == 3
+    body = s3_client.get_object(Bucket="test-bucket", Key="output.bin")["Body"]
+    assert body.read() == data
+
+
+def test_multipart_writer_aborts_on_error(s3_client):
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter(s3_client, "test-bucket", "output.bin") as writer:
+            writer.write(b"x" * MIN_PART_SIZE)
+            raise RuntimeError("failed")
+
+    assert "Uploads" not in s3_client.list_multipart_uploads(Bucket="test-bucket")
+    with pytest.raises(s3_client.exceptions.NoSuchKey):
+        s3_client.get_object(Bucket="test-bucket", Key="output.bin")
+
+
+def test_multipart_writer_rejects_small_part_size(s3_client):
+    with pytest.raises(ValueError):
+        S3MultipartWriter(s3_client, "test-bucket", "output.bin", 1024)
+
+
+@pytest.mark.parametrize(
+    "key, expected",
+    [
+        ("input/data.csv", "csv"),
+        ("input/DATA.PARQUET", "parquet"),
+        ("input/data.pq", "parquet"),
+        ("input/data.arrow", "arrow"),
+        ("input/data.feather", "arrow"),
+        ("input/data", "csv"),
+    ],
+)
+def test_detect_format(key, expected):
+    assert detect_format(key) == expected
+
+
+@pytest.mark.parametrize("compression", ["snappy", "zstd"])
+def test_process_streaming_writes_parquet(s3_client, compression):
+    s3_client.put_object(Bucket="test-bucket", Key="input.csv", Body=make_csv(2500))
+
+    rows = process_streaming(
+        s3_client,
+        "test-bucket",
+        "input.csv",
+        "test-bucket",
+        "output.parquet",
+        output_format="parquet",
+        chunksize=1000,
+        compression=compression,
+        row_group_size=1200,
+    )
+
+    assert rows == 2500
+    body = s3_client.get_object(Bucket="test-bucket", Key="output.parquet")["Body"]
+    metadata = pq.ParquetFile(pa.BufferReader(body.read())).metadata
+    # 行グループはチャンクをまたいでrow_group_size行ずつまとめられる
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [
+        1200,
+        1200,
+        100,
+    ]
+    assert metadata.row_group(0).column(0).compression == compression.upper()
+    expected = process_data(read_csv_from_s3(s3_client, "test-bucket", "input.csv"))
+    actual = read_from_s3(s3_client, "test-bucket", "output.parquet")
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("key", ["input.parquet", "input.arrow"])
+def test_process_streaming_reads_arrow_formats(s3_client, key):
+    df = pd.read_csv(io.BytesIO(make_csv(2500)))
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if key.endswith(".parquet"):
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    s3_client.put_object(
+        Bucket="test-bucket", Key=key, Body=sink.getvalue().to_pybytes()
+    )
+
+    rows = process_streaming(
+        s3_client, "test-bucket", key, "test-bucket", "output.csv", chunksize=1000
+    )
+
+    assert rows == 2500
+    actual = read_csv_from_s3(s3_client, "test-bucket", "output.csv")
+    pd.testing.assert_frame_equal(actual, process_data(df), check_dtype=False)
+
+
+def test_process_streaming_writes_hive_partitions(s3_client):
+    s3_client.put_object(Bucket="test-bucket", Key="input.csv", Body=make_csv(2500))
+
+    rows = process_streaming(
+        s3_client,
+        "test-bucket",
+        "input.csv",
+        "test-bucket",
+        "output",
+        output_format="parquet",
+        chunksize=1000,
+        partition_column="arrival_date",
+    )
+
+    assert rows == 2500
+    keys = [
+        obj["Key"]
+        for obj in s3_client.list_objects_v2(Bucket="test-bucket", Prefix="output/")[
+            "Contents"
+        ]
+    ]
+    # make_csvのarrival_dateは90通りで、チャンクをまたいで値ごとに1ファイル
+    assert len(keys) == 90
+    assert "output/arrival_date=2010-01-15/part-00000.parquet" in keys
+    frames = [read_from_s3(s3_client, "test-bucket", key) for key in keys]
+    assert all("arrival_date" not in df.columns for df in frames)
+    assert sum(len(df) for df in frames) == 2500
+
+
+def get_parquet_file(s3_client, key):
+    body = s3_client.get_object(Bucket="test-bucket", Key=key)["Body"].read()
+    return pq.ParquetFile(pa.BufferReader(body))
+
+
+def test_write_parquet_chunks_all_null_first_chunk(s3_client):
+    chunks = [
+        pd.DataFrame({"id": [1, 2], "name": [float("nan")] * 2}),
+        pd.DataFrame({"id": [3.0, None], "name": ["a", None]}),
+    ]
+
+    # 最初のチャンクだけで行グループを書き込む場合も、後のチャンクの文字列を出力できる
+    rows = write_parquet_chunks_to_s3(
+        s3_client, chunks, "test-bucket", "output.parquet", row_group_size=2
+    )
+
+    assert rows == 4
+    table = get_parquet_file(s3_client, "output.parquet").read()
+    assert table.schema.field("id").type == pa.int64()
+    assert table.schema.field("name").type == pa.string()
+    assert table.column("id").to_pylist() == [1, 2, 3, None]
+    assert table.column("name").to_pylist() == [None, None, "a", None]
+
+
+def test_write_parquet_chunks_unifies_types_in_row_group(s3_client):
+    chunks = [
+        pd.DataFrame({"value": [1, 2]}),
+        pd.DataFrame({"value": [0.5, None]}),
+    ]
+
+    write_parquet_chunks_to_s3(s3_client, chunks, "test-bucket", "output.parquet")
+
+    table = get_parquet_file(s3_client, "output.parquet").read()
+    assert table.schema.field("value").type == pa.float64()
+    assert table.column("value").to_pylist() == [1.0, 2.0, 0.5, None]
+
+
+def test_write_parquet_chunks_with_schema(s3_client):
+    schema = pa.schema([("id", pa.int32()), ("name", pa.string())])
+    chunks = [
+        pd.DataFrame({"id": [1], "name": [None]}),
+        pd.DataFrame({"id": [2], "name": ["b"]}),
+    ]
+
+    write_parquet_chunks_to_s3(
+        s3_client,
+        chunks,
+        "test-bucket",
+        "output.parquet",
+        row_group_size=1,
+        schema=schema,
+    )
+
+    table = get_parquet_file(s3_client, "output.parquet").read()
+    assert table.schema.remove_metadata() == schema
+    assert table.column("name").to_pylist() == [None, "b"]
+
+
+def test_write_partitioned_parquet_buffers_rows_per_partition(s3_client):
+    chunks = [
+        pd.DataFrame({"day": ["a", "b", "a"], "value": [1, 2, 3]}),
+        pd.DataFrame({"day": ["a", None, "b"], "value": [4, 5, 6]}),
+        pd.DataFrame({"day": ["a"], "value": [7]}),
+    ]
+
+    rows = write_partitioned_parquet_chunks_to_s3(
+        s3_client, chunks, "test-bucket", "output", "day", row_group_size=3
+    )
+
+    assert rows == 7
+    keys = sorted(
+        obj["Key"]
+        for obj in s3_client.list_objects_v2(Bucket="test-bucket")["Contents"]
+    )
+    assert keys == [
+        "output/day=__HIVE_DEFAULT_PARTITION__/part-00000.parquet",
+        "output/day=a/part-00000.parquet",
+        "output/day=b/part-00000.parquet",
+    ]
+    parquet_file = get_parquet_file(s3_client, "output/day=a/part-00000.parquet")
+    metadata = parquet_file.metadata
+    # 値aの行はチャンクをまたいでrow_group_size行ずつ行グループにまとめられる
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [
+        3,
+        1,
+    ]
+    assert parquet_file.read().column("value").to_pylist() == [1, 3, 4, 7]
+
+
+def test_write_partitioned_parquet_aborts_on_error(s3_client):
+    def chunks():
+        yield pd.DataFrame({"day": ["a"], "value": [1]})
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        write_partitioned_parquet_chunks_to_s3(
+            s3_client, chunks(), "test-bucket", "output", "day"
+        )
+
+    assert "Contents" not in s3_client.list_objects_v2(Bucket="test-bucket")
+
+
+def test_process_streaming_logs_progress_every_interval(s3_client, caplog):
+    s3_client.put_object(Bucket="test-bucket", Key="input.csv", Body=make_csv(2500))
+
+    with caplog.at_level("INFO"):
+        process_streaming(
+            s3_client,
+            "test-bucket",
+            "input.csv",
+            "test-bucket",
+            "output.csv",
+            chunksize=100,
+        )
+
+    # チャンクごとのログはDEBUGのため出力されず、進捗は10チャンクごとに出力される
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Starting data processing" not in messages
+    assert [m for m in messages if m.startswith("Processed ")] == [
+        "Processed 10 chunks. Rows: 1000",
+        "Processed 20 chunks. Rows: 2000",
+    ]
+
+
+def test_process_streaming_rejects_unknown_options(s3_client):
+    with pytest.raises(ValueError):
+        process_streaming(
+            s3_client, "b", "input.csv", "b", "output.json", output_format="json"
+        )
+    with pytest.raises(ValueError):
+        process_streaming(
+            s3_client, "b", "input.csv", "b", "output", partition_column="arrival_date"
+        )
+
+
+def peak_memory(s3_client, key):
+    tracemalloc.start()
+    try:
+        process_csv_streaming(
+            s3_client,
+            "test-bucket",
+            key,
+            "test-bucket",
+            f"output/{key}",
+            chunksize=20_000,
+            part_size=MIN_PART_SIZE,
+        )
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_memory_is_flat(moto_server_client):
+    sizes = {}
+    for key, rows in [("small.csv", 60_000), ("large.csv", 240_000)]:
+        data = make_csv(rows, arrival_date=False)
+        sizes[key] = len(data)
+        moto_server_client.upload_fileobj(io.BytesIO(data), "test-bucket", key)
+        del data
+
+    small = peak_memory(moto_server_client, "small.csv")
+    large = peak_memory(moto_server_client, "large.csv")
+
+    # 入力が4倍になってもピークメモリはほぼ変わらず、パートサイズ程度に収まる
+    assert sizes["large.csv"] > 3 * MIN_PART_SIZE
+    assert large < small * 1.5
+    assert large < 3 * MIN_PART_SIZE
+
+
+ARRIVAL_DATES = [
+    "2020-02-29",
+    "2021-02-28",
+    "2000-01-31",
+    "2023-03-31T23:59:59",
+    "2024-02-29T00:00:00Z",
+    "2019-12-31T23:30:00+09:00",
+    "2019-01-01T00:30:00-05:30",
+    "2026-10-18T08:59:59.999999+09:00",
+    "2030-01-01",
+    "2026-10-18",
+    "20200115",
+    "2020-01-15T10:00:00+0900",
+]
+
+
+@pytest.mark.parametrize(
+    "reference_date",
+    [
+        pendulum.datetime(2026, 10, 18, 9, 0, tz="Asia/Tokyo"),
+        pendulum.datetime(2024, 2, 29, 23, 59, 59, tz="UTC"),
+        pendulum.datetime(2025, 2, 28, 12, 0, tz="America/New_York"),
+    ],
+)
+def test_years_since_arrival_vectorized_matches_pendulum(reference_date):
+    arrival_dates = pd.Series(ARRIVAL_DATES)
+
+    vectorized = YEARS_SINCE_ARRIVAL_METHODS["vectorized"](
+        arrival_dates, reference_date
+    )
+    expected = YEARS_SINCE_ARRIVAL_METHODS["pendulum"](arrival_dates, reference_date)
+
+    assert vectorized.tolist() == expected.tolist()
+
+
+def test_years_since_arrival_vectorized_raises_like_pendulum():
+    arrival_dates = pd.Series(["2020-01-15", "2020-13-01"])
+
+    with pytest.raises(ValueError):
+        YEARS_SINCE_ARRIVAL_METHODS["vectorized"](arrival_dates, pendulum.now())
+
+
+def test_process_data_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        process_data(pd.DataFrame({"arrival_date": ["2020-01-15"]}), method="numba")
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from common.lazy_import import LazyModule, lazy_import
+from common.startup import ImportProfiler, flag_enabled
+
+RESOURCES_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["etl_script.py", "--PROFILE_STARTUP", "true"], True),
+        (["etl_script.py", "--PROFILE_STARTUP=1"], True),
+        (["etl_script.py", "--PROFILE_STARTUP", "false"], False),
+        (["etl_script.py", "--PROFILE_STARTUP"], False),
+        (["etl_script.py", "--S3_INPUT_KEY", "PROFILE_STARTUP"], False),
+    ],
+)
+def test_flag_enabled(argv, expected):
+    assert flag_enabled(argv, "PROFILE_STARTUP") is expected
+
+
+def test_data_processing_import_does_not_load_heavy_modules():
+    code = (
+        "import sys\n"
+        "import common.data_processing\n"
+        "print(sorted(m for m in ('numpy', 'pandas', 'pendulum', 'pyarrow') "
+        "if m in sys.modules))\n"
+    )
+    env = dict(os.environ, COMMON_EAGER_IMPORTS="0")
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=RESOURCES_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    assert result.stdout.decode("utf-8").splitlines()[-1] == "[]"
+
+
+@pytest.fixture
+def sample_package(tmp_path, monkeypatch):
+    package = tmp_path / "sample_startup_pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("from . import child\nVALUE = 1\n")
+    (package / "child.py").write_text("import time\ntime.sleep(0.01)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "sample_startup_pkg"
+    for name in ("sample_startup_pkg", "sample_startup_pkg.child"):
+        sys.modules.pop(name, None)
+
+
+def test_lazy_module_imports_on_first_access(sample_package):
+    module = lazy_import(sample_package)
+
+    assert isinstance(module, LazyModule)
+    assert sample_package not in sys.modules
+    assert module.VALUE == 1
+    assert sample_package in sys.modules
+    assert lazy_import(sample_package) is sys.modules[sample_package]
+
+
+def test_import_profiler_logs_breakdown(sample_package, caplog):
+    profiler = ImportProfiler()
+    profiler.start()
+    try:
+        lazy_import(sample_package).VALUE
+    finally:
+        profiler.stop()
+
+    with caplog.at_level(logging.INFO):
+        profiler.log(logging.getLogger("test"), "startup")
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["event"] == "import_profile"
+    assert record["phase"] == "startup"
+    entries = {entry["module"]: entry for entry in record["imports"]}
+    parent = entries[sample_package]
+    child = entries[f"{sample_package}.child"]
+    assert parent["depth"] == 0
+    assert child["depth"] == 1
+    assert child["cumulative_us"] >= 10_000
+    assert parent["cumulative_us"] >= child["cumulative_us"]
+    assert parent["self_us"] < child["cumulative_us"]
+    assert profiler.entries == []
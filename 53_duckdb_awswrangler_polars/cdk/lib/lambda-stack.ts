@@ -28,12 +28,14 @@ export class LambdaStack extends cdk.Stack {
     const awswranglerLambdaName = `${props.projectName}-${props.envName}-awswrangler-handler`;
     const duckdbLambdaName = `${props.projectName}-${props.envName}-duckdb-handler`;
     const polarsLambdaName = `${props.projectName}-${props.envName}-polars-handler`;
+    const pyarrowLambdaName = `${props.projectName}-${props.envName}-pyarrow-handler`;
     const source_bucket = '<your_s3_bucket>';
     const filename = 'large_sample';
     const source_key = `src/${filename}.csv`;
     const destination_bucket = '<your_s3_bucket>';
     const destination_key = `target/${filename}/${filename}.parquet`;
 
+    // httpfs拡張もレイヤーに同梱し、コールドスタート時にダウンロードしない
     const duckdbLayer = new PythonLayerVersion(this, 'DuckdbLayer', {
       entry: path.join(__dirname, '../layers/duckdb'),
       compatibleRuntimes: [lambda.Runtime.PYTHON_3_13],
@@ -43,6 +45,12 @@ export class LambdaStack extends cdk.Stack {
       bundling: {
         assetHashType: cdk.AssetHashType.SOURCE,
         outputPathSuffix: 'python',
+        commandHooks: {
+          beforeBundling: () => [],
+          afterBundling: (_inputDir: string, outputDir: string) => [
+            `cd ${outputDir} && python -c "import duckdb; duckdb.connect(config={'extension_directory': 'duckdb_extensions'}).install_extension('httpfs')"`,
+          ],
+        },
       },
     });
 
@@ -58,23 +66,25 @@ export class LambdaStack extends cdk.Stack {
       },
     });
 
+    const awsSdkPandasLayer = lambda.LayerVersion.fromLayerVersionArn(
+      this,
+      'AwsSdkPandasLayer',
+      'arn:aws:lambda:ap-northeast-1:336392948345:layer:AWSSDKPandas-Python313-Arm64:1'
+    );
+
+    // 全てのLambdaで共通のconverter.lambda_handlerを使い、環境変数engineでエンジンを選択
     new lambda.Function(this, 'AwswranglerLambda', {
       functionName: awswranglerLambdaName,
       runtime: lambda.Runtime.PYTHON_3_13,
       code: lambda.Code.fromAsset('../resources/lambda'),
-      handler: 'aws_wrangler_test.lambda_handler',
+      handler: 'converter.lambda_handler',
       memorySize: 10240,
       ephemeralStorageSize: cdk.Size.gibibytes(10),
       timeout: cdk.Duration.seconds(900),
       role: lambdaRole,
-      layers: [
-        lambda.LayerVersion.fromLayerVersionArn(
-          this,
-          'AwsSdkPandasLayer',
-          'arn:aws:lambda:ap-northeast-1:336392948345:layer:AWSSDKPandas-Python313-Arm64:1'
-        ),
-      ],
+      layers: [awsSdkPandasLayer],
       environment: {
+        engine: 'awswrangler',
         source_bucket: source_bucket,
         source_key: source_key,
         destination_bucket: destination_bucket,
@@ -87,17 +97,20 @@ export class LambdaStack extends cdk.Stack {
       functionName: duckdbLambdaName,
       runtime: lambda.Runtime.PYTHON_3_13,
       code: lambda.Code.fromAsset('../resources/lambda'),
-      handler: 'duckdb_test.lambda_handler',
+      handler: 'converter.lambda_handler',
       memorySize: 10240,
       ephemeralStorageSize: cdk.Size.gibibytes(10),
       timeout: cdk.Duration.seconds(900),
       role: lambdaRole,
       layers: [duckdbLayer],
       environment: {
+        engine: 'duckdb',
         source_bucket: source_bucket,
         source_key: source_key,
         destination_bucket: destination_bucket,
         destination_key: destination_key,
+        // レイヤーは/opt/pythonに展開される
+        DUCKDB_EXTENSION_DIRECTORY: '/opt/python/duckdb_extensions',
       },
       architecture: lambda.Architecture.ARM_64,
     });
@@ -106,13 +119,35 @@ export class LambdaStack extends cdk.Stack {
       functionName: polarsLambdaName,
       runtime: lambda.Runtime.PYTHON_3_13,
       code: lambda.Code.fromAsset('../resources/lambda'),
-      handler: 'polars_test.lambda_handler',
+      handler: 'converter.lambda_handler',
       memorySize: 10240,
       ephemeralStorageSize: cdk.Size.gibibytes(10),
       timeout: cdk.Duration.seconds(900),
       role: lambdaRole,
       layers: [polarsLayer],
       environment: {
+        engine: 'polars',
+        source_bucket: source_bucket,
+        source_key: source_key,
+        destination_bucket: destination_bucket,
+        destination_key: destination_key,
+      },
+      architecture: lambda.Architecture.ARM_64,
+    });
+
+    // pyarrowはAWS SDK for pandasのレイヤーに含まれる
+    new lambda.Function(this, 'PyarrowLambda', {
+      functionName: pyarrowLambdaName,
+      runtime: lambda.Runtime.PYTHON_3_13,
+      code: lambda.Code.fromAsset('../resources/lambda'),
+      handler: 'converter.lambda_handler',
+      memorySize: 10240,
+      ephemeralStorageSize: cdk.Size.gibibytes(10),
+      timeout: cdk.Duration.seconds(900),
+      role: lambdaRole,
+      layers: [awsSdkPandasLayer],
+      environment: {
+        engine: 'pyarrow',
         source_bucket: source_bucket,
         source_key: source_key,
         destination_bucket: destination_bucket,
@@ -168,6 +203,7 @@ export class LambdaStack extends cdk.Stack {
         '--file_bucket': source_bucket,
         '--file_key': 'src/bigdata_sample.csv',
         '--total_raws': '1000000',
+        '--output_format': 'csv',
         '--additional-python-modules': 'duckdb',
       },
       timeout: cdk.Duration.minutes(30),
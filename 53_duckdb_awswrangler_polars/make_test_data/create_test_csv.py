@@ -1,158 +1,323 @@
+import argparse
 import os
-import random
-import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 
-import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
+# 会社名のサンプル
+COMPANIES = [
+    "Acme Corp",
+    "Globex",
+    "Initech",
+    "Umbrella Corp",
+    "Stark Industries",
+    "Wayne Enterprises",
+    "Cyberdyne Systems",
+    "Soylent Corp",
+    "Massive Dynamic",
+    "Weyland-Yutani",
+    "Oscorp",
+    "Gekko & Co",
+    "Wonka Industries",
+    "Duff Brewing",
+]
 
-def create_sample_csv(filename="sample_data.csv", rows=1000000):
+# 製品カテゴリ
+CATEGORIES = [
+    "Electronics",
+    "Clothing",
+    "Food",
+    "Home Goods",
+    "Office Supplies",
+    "Sporting Goods",
+    "Toys",
+    "Books",
+    "Health",
+    "Automotive",
+]
+
+# 国名
+COUNTRIES = [
+    "USA",
+    "Canada",
+    "UK",
+    "Germany",
+    "France",
+    "Japan",
+    "China",
+    "Australia",
+    "Brazil",
+    "India",
+    "Mexico",
+    "Spain",
+    "Italy",
+    "Russia",
+]
+
+# 都市名
+CITIES = [
+    "New York",
+    "London",
+    "Tokyo",
+    "Paris",
+    "Berlin",
+    "Sydney",
+    "Toronto",
+    "Shanghai",
+    "Mumbai",
+    "Rio de Janeiro",
+    "Mexico City",
+    "Madrid",
+    "Rome",
+    "Moscow",
+]
+
+# メールドメイン
+EMAIL_DOMAINS = [
+    "gmail.com",
+    "yahoo.com",
+    "hotmail.com",
+    "outlook.com",
+    "company.com",
+    "example.org",
+    "business.net",
+    "mail.co",
+    "webmail.info",
+    "protonmail.com",
+]
+
+# 名前
+FIRST_NAMES = [
+    "John",
+    "Jane",
+    "Robert",
+    "Mary",
+    "David",
+    "Sarah",
+    "Michael",
+    "Lisa",
+    "James",
+    "Emily",
+]
+
+# 姓
+LAST_NAMES = [
+    "Smith",
+    "Johnson",
+    "Williams",
+    "Jones",
+    "Brown",
+    "Davis",
+    "Miller",
+    "Wilson",
+    "Moore",
+    "Taylor",
+    "Anderson",
+    "Thomas",
+    "Jackson",
+    "White",
+]
+
+# ステータス
+STATUSES = ["Completed", "Pending", "Cancelled", "Refunded", "Shipped"]
+
+COLUMNS = [
+    "customer_id",
+    "full_name",
+    "email",
+    "phone",
+    "company",
+    "purchase_amount",
+    "category",
+    "country",
+    "city",
+    "status",
+]
+SCHEMA = pa.schema([(name, pa.string()) for name in COLUMNS])
+
+# 1回に生成して書き込む行数
+DEFAULT_CHUNK_ROWS = 250_000
+# この行数を超える場合は、デフォルトで複数のプロセスで生成する
+PARALLEL_THRESHOLD_ROWS = 10_000_000
+# 値にカンマ・クォートを含まないため、クォートせずに出力する
+CSV_WRITE_OPTIONS = pa_csv.WriteOptions(include_header=False, quoting_style="none")
+
+
+def _choice(rng, values, rows):
+    # インデックスの配列で選択する
+    return pa.array(values).take(rng.integers(0, len(values), rows))
+
+
+def _randint(rng, low, high, rows):
+    # low以上high以下の整数を文字列にする(random.randintと同じく両端を含む)
+    return pc.cast(pa.array(rng.integers(low, high + 1, rows)), pa.string())
+
+
+def _join(*parts):
+    return pc.binary_join_element_wise(*parts, "")
+
+
+def generate_chunk(seed, chunk_index, rows):
     """
-    より一般的な文字列データを含むCSVファイルを作成する関数
+    1つのチャンクのデータを生成する
+
+    乱数はseedとchunk_indexから初期化するため、プロセス数によらず同じseedからは
+    同じデータになる
 
     Parameters:
-    filename (str): 作成するCSVファイルの名前
+    seed (int): 乱数のシード
+    chunk_index (int): チャンクの番号
     rows (int): 行数
+
+    Returns:
+    pa.Table: 生成したデータ(全ての列が文字列)
     """
-    print(f"{rows}行のデータを生成中...")
+    rng = np.random.default_rng([seed, chunk_index])
+    columns = {
+        "customer_id": _join("CUST-", _randint(rng, 10000, 99999, rows)),
+        "full_name": _join(
+            _choice(rng, FIRST_NAMES, rows), " ", _choice(rng, LAST_NAMES, rows)
+        ),
+        "email": _join(
+            "user",
+            _randint(rng, 100, 999, rows),
+            "@",
+            _choice(rng, EMAIL_DOMAINS, rows),
+        ),
+        "phone": _join(
+            "+",
+            _randint(rng, 1, 9, rows),
+            "-",
+            _randint(rng, 100, 999, rows),
+            "-",
+            _randint(rng, 100, 999, rows),
+            "-",
+            _randint(rng, 1000, 9999, rows),
+        ),
+        "company": _choice(rng, COMPANIES, rows),
+        "purchase_amount": _join(
+            "$",
+            _randint(rng, 10, 1000, rows),
+            ".",
+            pc.utf8_lpad(_randint(rng, 0, 99, rows), 2, "0"),
+        ),
+        "category": _choice(rng, CATEGORIES, rows),
+        "country": _choice(rng, COUNTRIES, rows),
+        "city": _choice(rng, CITIES, rows),
+        "status": _choice(rng, STATUSES, rows),
+    }
+    return pa.table(columns, schema=SCHEMA)
 
-    # 会社名のサンプル
-    companies = [
-        "Acme Corp",
-        "Globex",
-        "Initech",
-        "Umbrella Corp",
-        "Stark Industries",
-        "Wayne Enterprises",
-        "Cyberdyne Systems",
-        "Soylent Corp",
-        "Massive Dynamic",
-        "Weyland-Yutani",
-        "Oscorp",
-        "Gekko & Co",
-        "Wonka Industries",
-        "Duff Brewing",
-    ]
 
-    # 製品カテゴリ
-    categories = [
-        "Electronics",
-        "Clothing",
-        "Food",
-        "Home Goods",
-        "Office Supplies",
-        "Sporting Goods",
-        "Toys",
-        "Books",
-        "Health",
-        "Automotive",
-    ]
+def _generate_part(seed, chunk_index, rows, file_format):
+    table = generate_chunk(seed, chunk_index, rows)
+    if file_format == "parquet":
+        return table
+    # CSVはプロセス間で受け渡すデータを小さくするため、バイト列にしてから返す
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(table, sink, CSV_WRITE_OPTIONS)
+    return sink.getvalue()
 
-    # 国名
-    countries = [
-        "USA",
-        "Canada",
-        "UK",
-        "Germany",
-        "France",
-        "Japan",
-        "China",
-        "Australia",
-        "Brazil",
-        "India",
-        "Mexico",
-        "Spain",
-        "Italy",
-        "Russia",
-    ]
 
-    # 都市名
-    cities = [
-        "New York",
-        "London",
-        "Tokyo",
-        "Paris",
-        "Berlin",
-        "Sydney",
-        "Toronto",
-        "Shanghai",
-        "Mumbai",
-        "Rio de Janeiro",
-        "Mexico City",
-        "Madrid",
-        "Rome",
-        "Moscow",
-    ]
+def _iter_parts(chunks, file_format, workers):
+    # チャンクの順に返す(メモリに保持するチャンクはworkersの2倍までに制限する)
+    if workers == 1:
+        for chunk in chunks:
+            yield _generate_part(*chunk, file_format)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running = deque()
+        for chunk in chunks:
+            running.append(executor.submit(_generate_part, *chunk, file_format))
+            if len(running) >= workers * 2:
+                yield running.popleft().result()
+        while running:
+            yield running.popleft().result()
 
-    # メールドメイン
-    email_domains = [
-        "gmail.com",
-        "yahoo.com",
-        "hotmail.com",
-        "outlook.com",
-        "company.com",
-        "example.org",
-        "business.net",
-        "mail.co",
-        "webmail.info",
-        "protonmail.com",
-    ]
 
-    # ランダムデータの生成
-    data = {
-        "customer_id": [f"CUST-{random.randint(10000, 99999)}" for _ in range(rows)],
-        "full_name": [
-            (
-                f"{random.choice(['John', 'Jane', 'Robert', 'Mary', 'David', 'Sarah', 'Michael', 'Lisa', 'James', 'Emily'])}"  # noqa: E501
-                f" {random.choice(['Smith', 'Johnson', 'Williams', 'Jones', 'Brown', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor', 'Anderson', 'Thomas', 'Jackson', 'White'])}"  # noqa: E501
-            )
-            for _ in range(rows)
-        ],
-        "email": [
-            f"user{random.randint(100, 999)}@{random.choice(email_domains)}"
-            for _ in range(rows)
-        ],
-        "phone": [
-            (
-                f"+{random.randint(1, 9)}-{random.randint(100, 999)}"
-                f"-{random.randint(100, 999)}-{random.randint(1000, 9999)}"
-            )
-            for _ in range(rows)
-        ],
-        "company": [random.choice(companies) for _ in range(rows)],
-        "purchase_amount": [
-            f"${random.randint(10, 1000)}.{random.randint(0, 99):02d}"
-            for _ in range(rows)
-        ],
-        "category": [random.choice(categories) for _ in range(rows)],
-        "country": [random.choice(countries) for _ in range(rows)],
-        "city": [random.choice(cities) for _ in range(rows)],
-        "status": [
-            random.choice(["Completed", "Pending", "Cancelled", "Refunded", "Shipped"])
-            for _ in range(rows)
-        ],
-    }
+@contextmanager
+def _open_writer(filename, file_format):
+    if file_format == "parquet":
+        with pq.ParquetWriter(filename, SCHEMA, compression="snappy") as writer:
+            yield writer.write_table
+        return
+    with open(filename, "wb") as f:
+        # pyarrowのCSVライターはヘッダーを常にクォートするため、ヘッダーは直接書き込む
+        f.write((",".join(COLUMNS) + "\n").encode("utf-8"))
+        yield f.write
+
 
-    # DataFrameの作成
-    df = pd.DataFrame(data)
+def create_sample_csv(
+    filename="sample_data.csv",
+    rows=1000000,
+    seed=0,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    workers=None,
+    file_format=None,
+):
+    """
+    より一般的な文字列データを含むCSV(またはParquet)ファイルを作成する関数
 
-    # CSVに保存
-    df.to_csv(filename, index=False)
+    chunk_rowsごとにNumPyの乱数でまとめて生成して書き込むため、全体をメモリに
+    保持しない。同じseedとchunk_rowsからは、workersによらず同じファイルになる
+
+    Parameters:
+    filename (str): 作成するファイルの名前
+    rows (int): 行数
+    seed (int): 乱数のシード
+    chunk_rows (int): 1回に生成して書き込む行数
+    workers (int): 生成するプロセス数(デフォルトはPARALLEL_THRESHOLD_ROWSを
+        超える場合はCPU数、それ以外は1)
+    file_format (str): csvまたはparquet(デフォルトは拡張子が.parquetの場合はparquet)
+    """
+    print(f"{rows}行のデータを生成中...")
+    if file_format is None:
+        file_format = "parquet" if filename.endswith(".parquet") else "csv"
+    if file_format not in ("csv", "parquet"):
+        raise ValueError(f"file_format must be csv or parquet: {file_format}")
+    if workers is None:
+        workers = os.cpu_count() if rows > PARALLEL_THRESHOLD_ROWS else 1
+
+    chunks = [
+        (seed, chunk_index, min(chunk_rows, rows - start))
+        for chunk_index, start in enumerate(range(0, rows, chunk_rows))
+    ]
+    with _open_writer(filename, file_format) as write:
+        for part in _iter_parts(chunks, file_format, workers):
+            write(part)
 
     # ファイルサイズの確認
     file_size = os.path.getsize(filename) / (1024 * 1024)  # MBに変換
     print(f"ファイル '{filename}' の作成が完了しました。")
-    print(f"行数: {rows}、列数: {len(df.columns)}")
+    print(f"行数: {rows}、列数: {len(COLUMNS)}")
     print(f"ファイルサイズ: {file_size:.2f} MB")
 
     return filename
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("使用方法: python create_sample_data.py <ファイル名> <行数>")
-        sys.exit(1)
-
-    filename = sys.argv[1]
-    rows = int(sys.argv[2])
+    parser = argparse.ArgumentParser(
+        usage="python create_test_csv.py <ファイル名> <行数> [options]"
+    )
+    parser.add_argument("filename")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--format", choices=["csv", "parquet"], dest="file_format")
+    args = parser.parse_args()
 
-    create_sample_csv(filename, rows)
+    create_sample_csv(
+        args.filename,
+        args.rows,
+        seed=args.seed,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        file_format=args.file_format,
+    )
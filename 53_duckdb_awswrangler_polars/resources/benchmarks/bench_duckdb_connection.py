@@ -0,0 +1,121 @@
+"""
+Lambdaの呼び出しごとにDuckDBの接続を作成する場合と、lambda/duckdb_connection.pyで
+コンテナごとに1つの接続を再利用する場合のレイテンシを比較するベンチマーク
+
+モードごとに新しいプロセスで--invocations回の呼び出しを模擬し、1回目(コールドスタート、
+duckdbのimportを含む)と2回目以降(ウォームスタート)の時間を表示する。
+1回の呼び出しでは、接続の取得・拡張機能のロードの後に小さなCSVを読み込む
+
+- fresh: 呼び出しごとにduckdb.connectして拡張機能をロードする(これまでの処理)
+- warm: DuckDbConnectionで初期化済みの接続を再利用する
+
+実行方法(--extensions httpfsの場合は、コールドスタートにダウンロードを含めて計測する):
+    cd resources
+    python benchmarks/bench_duckdb_connection.py --invocations 20
+    python benchmarks/bench_duckdb_connection.py --extensions httpfs
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+MODES = ["fresh", "warm"]
+
+
+def invoke_fresh(extensions, csv_path):
+    import duckdb
+
+    con = duckdb.connect(":memory:", config={"home_directory": "/tmp"})
+    try:
+        for name in extensions:
+            con.load_extension(name)
+        return con.execute(
+            f"SELECT count(*) FROM read_csv_auto('{csv_path}')"
+        ).fetchone()
+    finally:
+        con.close()
+
+
+def invoke_warm(connection, csv_path):
+    with connection.session() as con:
+        return con.execute(
+            f"SELECT count(*) FROM read_csv_auto('{csv_path}')"
+        ).fetchone()
+
+
+def child(mode, invocations, extensions, csv_path):
+    # importの時間をコールドスタートに含めるため、1回目の呼び出しの中でimportする
+    times = []
+    connection = None
+    for _ in range(invocations):
+        start = time.perf_counter()
+        if mode == "fresh":
+            invoke_fresh(extensions, csv_path)
+        else:
+            if connection is None:
+                sys.path.append(LAMBDA_DIR)
+                from duckdb_connection import DuckDbConnection
+
+                connection = DuckDbConnection(extensions=extensions, s3_secret=False)
+            invoke_warm(connection, csv_path)
+        times.append(time.perf_counter() - start)
+    print(json.dumps(times))
+
+
+def run_mode(mode, invocations, extensions, csv_path):
+    process = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--child",
+            mode,
+            "--invocations",
+            str(invocations),
+            "--csv",
+            csv_path,
+            "--extensions",
+            *extensions,
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return json.loads(process.stdout.decode("utf-8").splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invocations", type=int, default=20)
+    parser.add_argument("--extensions", nargs="*", default=["parquet", "json"])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.invocations, args.extensions, args.csv)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "input.csv")
+        with open(csv_path, "w") as f:
+            f.write("id,value\n")
+            f.writelines(f"{i},{i * 0.5}\n" for i in range(args.rows))
+
+        print(f"extensions: {', '.join(args.extensions) or '-'}")
+        for mode in MODES:
+            times = run_mode(mode, args.invocations, args.extensions, csv_path)
+            warm = times[1:] or times
+            print(
+                f"{mode:>5}: cold {times[0] * 1000:8.1f} ms, "
+                f"warm median {statistics.median(warm) * 1000:6.1f} ms, "
+                f"max {max(warm) * 1000:6.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+glue/create_duckdb_csv.pyのデータ生成を、行数とスレッド数の組み合わせごとに
+計測するベンチマーク
+
+ローカルの一時ディレクトリに--formatsの形式で出力し、経過時間・1秒あたりの行数・
+出力サイズを表示する
+
+実行方法:
+    cd resources
+    python benchmarks/bench_duckdb_generator.py --rows 1000000 10000000 \
+        --threads 1 2 4 8 --formats csv parquet partitioned
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "glue"))
+
+from create_duckdb_csv import (
+    OUTPUT_FORMATS,
+    available_cpus,
+    connect,
+    generate_and_upload_data,
+)
+
+
+def output_size(path):
+    # partitionedの場合はディレクトリの合計
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    return os.path.getsize(path)
+
+
+def run(rows, threads, output_format, tmp_dir):
+    con = connect(threads)
+    con.execute("SET enable_progress_bar=false;")
+    extension = "csv" if output_format == "csv" else "parquet"
+    path = os.path.join(tmp_dir, f"{output_format}_{rows}_{threads}.{extension}")
+    try:
+        start = time.perf_counter()
+        generate_and_upload_data(con, path, rows, output_format=output_format)
+        return time.perf_counter() - start, output_size(path)
+    finally:
+        con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 10000000])
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=sorted({1, available_cpus()}),
+    )
+    parser.add_argument(
+        "--formats", nargs="+", choices=list(OUTPUT_FORMATS), default=["csv"]
+    )
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"available CPUs: {available_cpus()}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for output_format in args.formats:
+            for rows in args.rows:
+                for threads in args.threads:
+                    wall_time, size = min(
+                        run(rows, threads, output_format, tmp_dir)
+                        for _ in range(args.runs)
+                    )
+                    print(
+                        f"{output_format:>11} {rows:>12,} rows {threads:>3} threads: "
+                        f"{wall_time:7.2f}s, {rows / wall_time:13,.0f} rows/s, "
+                        f"output {size / 1024 / 1024:9,.1f} MiB"
+                    )
+
+
+if __name__ == "__main__":
+    main()
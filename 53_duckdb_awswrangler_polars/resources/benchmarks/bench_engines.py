@@ -0,0 +1,275 @@
+"""
+CSVからParquetへの変換をエンジンごとに比較するベンチマーク
+
+make_test_data/create_test_csv.pyで指定したサイズのCSVを生成し(--data-dirに
+キャッシュする)、エンジンごとに新しいプロセスで変換して以下を記録する
+
+- wall_time: 経過時間(秒)
+- cpu_time: CPU時間(秒、全スレッド分)
+- peak_rss: ピークメモリ(バイト)
+- output_bytes: 出力したParquetのサイズ(バイト)
+
+結果は--outputのファイル(拡張子が.jsonの場合はJSON、.csvの場合はCSV)に追記する。
+--baselineに以前の結果を指定すると、エンジン・サイズごとの経過時間とピークメモリが
+--toleranceの割合を超えて悪化した場合に終了コード1で終了する
+
+実行方法(インストールされていないエンジンはskippedとして記録する):
+    cd resources
+    python benchmarks/bench_engines.py --sizes-mb 100 1000 10000 --output results.json
+    python benchmarks/bench_engines.py --output new.json --baseline results.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "lambda"))
+
+from converter import ENGINES, get_engine, measure
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+CREATE_TEST_CSV = os.path.join(
+    BENCHMARKS_DIR, "..", "..", "make_test_data", "create_test_csv.py"
+)
+# create_test_csv.pyの1MBあたりの行数(README: 922000行で約100MB)
+ROWS_PER_MB = 9220
+RESULT_FIELDS = [
+    "timestamp",
+    "engine",
+    "engine_version",
+    "input_mb",
+    "input_bytes",
+    "rows",
+    "run",
+    "status",
+    "wall_time",
+    "cpu_time",
+    "peak_rss",
+    "output_bytes",
+    "error",
+    "python",
+    "machine",
+    "cpu_count",
+]
+COMPARED_METRICS = ["wall_time", "peak_rss"]
+
+
+def prepare_input(data_dir, size_mb):
+    """
+    指定したサイズのCSVを生成する(生成済みの場合はそのまま使う)
+
+    Linuxではピークメモリ(ru_maxrss)がfork時の親プロセスの値を引き継ぐため、
+    生成は別のプロセスで行い、計測するプロセスの親のメモリを小さく保つ
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"sample_{size_mb}mb.csv")
+    rows = size_mb * ROWS_PER_MB
+    if not os.path.exists(path):
+        subprocess.run([sys.executable, CREATE_TEST_CSV, path, str(rows)], check=True)
+    return path, rows
+
+
+def output_size(path):
+    # エンジンによってはディレクトリに出力するため、ディレクトリの場合は合計する
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    return os.path.getsize(path)
+
+
+def remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def child(engine_name, source_path, destination_path):
+    engine = get_engine(engine_name)
+    with measure() as metrics:
+        engine.convert(source_path, destination_path)
+    metrics["output_bytes"] = output_size(destination_path)
+    print(json.dumps(metrics))
+
+
+def run_engine(engine, source_path, destination_path, timeout):
+    """
+    新しいプロセスでエンジンを実行し、計測結果を返す
+    """
+    remove(destination_path)
+    try:
+        process = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--child",
+                engine.name,
+                source_path,
+                destination_path,
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {"status": "failed", "error": f"timeout after {timeout}s"}
+    finally:
+        remove(destination_path)
+    if process.returncode != 0:
+        # メモリ不足で強制終了された場合など
+        error = process.stderr.decode("utf-8", "replace").strip().splitlines()
+        return {
+            "status": "failed",
+            "error": error[-1] if error else f"exit code {process.returncode}",
+        }
+    metrics = json.loads(process.stdout.decode("utf-8").splitlines()[-1])
+    return {"status": "ok", **metrics}
+
+
+def load_results(path):
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+    with open(path, newline="") as f:
+        records = list(csv.DictReader(f))
+    for record in records:
+        for field in ["input_mb", "wall_time", "cpu_time", "peak_rss"]:
+            if record.get(field):
+                record[field] = float(record[field])
+    return records
+
+
+def save_results(path, records):
+    """
+    結果をファイルに追記する
+    """
+    if path.endswith(".json"):
+        previous = load_results(path) if os.path.exists(path) else []
+        with open(path, "w") as f:
+            json.dump(previous + records, f, indent=2, ensure_ascii=False)
+        return
+    new_file = not os.path.exists(path)
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(records)
+
+
+def best_by_case(records):
+    # エンジン・サイズごとに、成功した実行の中で最も良い値を取る
+    best = {}
+    for record in records:
+        if record["status"] != "ok":
+            continue
+        case = best.setdefault((record["engine"], int(record["input_mb"])), {})
+        for metric in COMPARED_METRICS:
+            value = float(record[metric])
+            case[metric] = min(case.get(metric, value), value)
+    return best
+
+
+def find_regressions(records, baseline, tolerance):
+    """
+    以前の結果と比較し、tolerance(割合)を超えて悪化した値の一覧を返す
+    """
+    regressions = []
+    current = best_by_case(records)
+    for case, previous in best_by_case(baseline).items():
+        if case not in current:
+            continue
+        for metric in COMPARED_METRICS:
+            if current[case][metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{case[0]} {case[1]}MB {metric}: "
+                    f"{previous[metric]:,.2f} -> {current[case][metric]:,.2f}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument(
+        "--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES)
+    )
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--data-dir", default=os.path.join(BENCHMARKS_DIR, "data"))
+    parser.add_argument("--output", default="bench_engines_results.json")
+    parser.add_argument("--baseline", help="比較する以前の結果のファイル")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--timeout", type=int, help="1回の変換のタイムアウト(秒)")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    records = []
+    for size_mb in args.sizes_mb:
+        source_path, rows = prepare_input(args.data_dir, size_mb)
+        input_bytes = os.path.getsize(source_path)
+        for name in args.engines:
+            engine = get_engine(name)
+            for run in range(args.runs):
+                record = {
+                    "timestamp": datetime.now(ZoneInfo("Asia/Tokyo")).isoformat(),
+                    "engine": name,
+                    "engine_version": None,
+                    "input_mb": size_mb,
+                    "input_bytes": input_bytes,
+                    "rows": rows,
+                    "run": run,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "cpu_count": os.cpu_count(),
+                }
+                if engine.available():
+                    record["engine_version"] = engine.version()
+                    destination_path = os.path.join(
+                        args.data_dir, f"output_{name}_{size_mb}mb.parquet"
+                    )
+                    record.update(
+                        run_engine(engine, source_path, destination_path, args.timeout)
+                    )
+                else:
+                    record.update({"status": "skipped", "error": "not installed"})
+                records.append(record)
+                print(format_record(record))
+
+    save_results(args.output, records)
+    print(f"results: {args.output}")
+    if args.baseline:
+        regressions = find_regressions(
+            records, load_results(args.baseline), args.tolerance
+        )
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+def format_record(record):
+    case = f"{record['engine']:>11} {record['input_mb']:>6}MB"
+    if record["status"] != "ok":
+        return f"{case}: {record['status']} ({record['error']})"
+    return (
+        f"{case}: {record['wall_time']:7.2f}s, "
+        f"cpu {record['cpu_time']:7.2f}s, "
+        f"peak RSS {record['peak_rss'] / 1024 / 1024:7,.0f} MiB, "
+        f"output {record['output_bytes'] / 1024 / 1024:7,.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
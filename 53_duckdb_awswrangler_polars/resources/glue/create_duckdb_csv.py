@@ -1,43 +1,178 @@
 import json
+import os
 import sys
 
 import duckdb
-from awsglue.utils import getResolvedOptions
+
+# 会社名のサンプル
+COMPANIES = [
+    "Acme Corp",
+    "Globex",
+    "Initech",
+    "Umbrella Corp",
+    "Stark Industries",
+    "Wayne Enterprises",
+    "Cyberdyne Systems",
+    "Soylent Corp",
+    "Massive Dynamic",
+    "Weyland-Yutani",
+    "Oscorp",
+    "Gekko & Co",
+    "Wonka Industries",
+    "Duff Brewing",
+]
+
+# 製品カテゴリ
+CATEGORIES = [
+    "Electronics",
+    "Clothing",
+    "Food",
+    "Home Goods",
+    "Office Supplies",
+    "Sporting Goods",
+    "Toys",
+    "Books",
+    "Health",
+    "Automotive",
+]
+
+# 国名
+COUNTRIES = [
+    "USA",
+    "Canada",
+    "UK",
+    "Germany",
+    "France",
+    "Japan",
+    "China",
+    "Australia",
+    "Brazil",
+    "India",
+    "Mexico",
+    "Spain",
+    "Italy",
+    "Russia",
+]
+
+# 都市名
+CITIES = [
+    "New York",
+    "London",
+    "Tokyo",
+    "Paris",
+    "Berlin",
+    "Sydney",
+    "Toronto",
+    "Shanghai",
+    "Mumbai",
+    "Rio de Janeiro",
+    "Mexico City",
+    "Madrid",
+    "Rome",
+    "Moscow",
+]
+
+# メールドメイン
+EMAIL_DOMAINS = [
+    "gmail.com",
+    "yahoo.com",
+    "hotmail.com",
+    "outlook.com",
+    "company.com",
+    "example.org",
+    "business.net",
+    "mail.co",
+    "webmail.info",
+    "protonmail.com",
+]
+
+# 名前
+FIRST_NAMES = [
+    "John",
+    "Jane",
+    "Robert",
+    "Mary",
+    "David",
+    "Sarah",
+    "Michael",
+    "Lisa",
+    "James",
+    "Emily",
+]
+
+# 姓
+LAST_NAMES = [
+    "Smith",
+    "Johnson",
+    "Williams",
+    "Jones",
+    "Brown",
+    "Davis",
+    "Miller",
+    "Wilson",
+    "Moore",
+    "Taylor",
+    "Anderson",
+    "Thomas",
+    "Jackson",
+    "White",
+]
+
+# ステータス
+STATUSES = ["Completed", "Pending", "Cancelled", "Refunded", "Shipped"]
+
+OUTPUT_FORMATS = {
+    "csv": "FORMAT CSV, HEADER",
+    "parquet": "FORMAT PARQUET, COMPRESSION 'SNAPPY'",
+    # file_keyをプレフィックスとして、country=<国名>/ごとにParquetを出力する
+    "partitioned": (
+        "FORMAT PARQUET, COMPRESSION 'SNAPPY', PARTITION_BY (country), "
+        "OVERWRITE_OR_IGNORE"
+    ),
+}
+# 指定がない場合に使うGlueジョブの引数
+OPTIONAL_ARGS = {"output_format": "csv", "threads": None, "seed": "0"}
 
 
 def main():
+    from awsglue.utils import getResolvedOptions
+
     args = getResolvedOptions(
         sys.argv,
         [
             "file_bucket",
             "file_key",
             "total_raws",
-        ],
+        ]
+        + [name for name in OPTIONAL_ARGS if f"--{name}" in sys.argv],
     )
+    args = {**OPTIONAL_ARGS, **args}
     file_bucket = args["file_bucket"]
     file_key = args["file_key"]
     total_rows = int(args["total_raws"])
+    output_format = args["output_format"]
+    threads = int(args["threads"]) if args["threads"] else None
 
     # S3パスを構築
     s3_path = f"s3://{file_bucket}/{file_key}"
 
     print(f"{total_rows}行のデータを生成してS3にアップロード中...")
 
+    con = connect(threads)
     # 一時ディレクトリを設定
-    duckdb.sql("SET home_directory='/tmp';")
-    duckdb.sql("SET extension_directory='/tmp/duckdb_extensions';")
+    con.execute("SET home_directory='/tmp';")
+    con.execute("SET extension_directory='/tmp/duckdb_extensions';")
 
     # AWS認証情報を設定
-    duckdb.sql("""CREATE SECRET (
+    con.execute("""CREATE SECRET (
         TYPE S3,
         PROVIDER CREDENTIAL_CHAIN
     );""")
 
-    # 会社名、カテゴリなどのリストをDuckDBのテーブルとして作成
-    create_lookup_tables()
-
     # データ生成とS3へのアップロード
-    generate_and_upload_data(s3_path, total_rows)
+    generate_and_upload_data(
+        con, s3_path, total_rows, output_format=output_format, seed=int(args["seed"])
+    )
     print("データ生成とアップロードが完了しました。")
     return {
         "statusCode": 200,
@@ -45,126 +180,109 @@ def main():
             {
                 "message": "CSV generation completed successfully",
                 "rows": total_rows,
+                "output_format": output_format,
                 "destination": s3_path,
             }
         ),
     }
 
 
-def create_lookup_tables():
-    """参照用のルックアップテーブルを作成"""
-
-    # 会社名のテーブル
-    duckdb.execute("""
-        CREATE TABLE companies AS SELECT * FROM (
-            VALUES
-                ('Acme Corp'), ('Globex'), ('Initech'), ('Umbrella Corp'),
-                ('Stark Industries'), ('Wayne Enterprises'), ('Cyberdyne Systems'),
-                ('Soylent Corp'), ('Massive Dynamic'), ('Weyland-Yutani'),
-                ('Oscorp'), ('Gekko & Co'), ('Wonka Industries'), ('Duff Brewing')
-        ) t(name);
-    """)
-
-    # 製品カテゴリのテーブル
-    duckdb.execute("""
-        CREATE TABLE categories AS SELECT * FROM (
-            VALUES
-                ('Electronics'), ('Clothing'), ('Food'), ('Home Goods'),
-                ('Office Supplies'), ('Sporting Goods'), ('Toys'), ('Books'),
-                ('Health'), ('Automotive')
-        ) t(name);
-    """)
-
-    # 国名のテーブル
-    duckdb.execute("""
-        CREATE TABLE countries AS SELECT * FROM (
-            VALUES
-                ('USA'), ('Canada'), ('UK'), ('Germany'), ('France'),
-                ('Japan'), ('China'), ('Australia'), ('Brazil'), ('India'),
-                ('Mexico'), ('Spain'), ('Italy'), ('Russia')
-        ) t(name);
-    """)
-
-    # 都市名のテーブル
-    duckdb.execute("""
-        CREATE TABLE cities AS SELECT * FROM (
-            VALUES
-                ('New York'), ('London'), ('Tokyo'), ('Paris'), ('Berlin'),
-                ('Sydney'), ('Toronto'), ('Shanghai'), ('Mumbai'), ('Rio de Janeiro'),
-                ('Mexico City'), ('Madrid'), ('Rome'), ('Moscow')
-        ) t(name);
-    """)
-
-    # メールドメインのテーブル
-    duckdb.execute("""
-        CREATE TABLE email_domains AS SELECT * FROM (
-            VALUES
-                ('gmail.com'), ('yahoo.com'), ('hotmail.com'), ('outlook.com'),
-                ('company.com'), ('example.org'), ('business.net'), ('mail.co'),
-                ('webmail.info'), ('protonmail.com')
-        ) t(name);
-    """)
-
-    # 名前のテーブル
-    duckdb.execute("""
-        CREATE TABLE first_names AS SELECT * FROM (
-            VALUES
-                ('John'), ('Jane'), ('Robert'), ('Mary'), ('David'),
-                ('Sarah'), ('Michael'), ('Lisa'), ('James'), ('Emily')
-        ) t(name);
-    """)
-
-    # 姓のテーブル
-    duckdb.execute("""
-        CREATE TABLE last_names AS SELECT * FROM (
-            VALUES
-                ('Smith'), ('Johnson'), ('Williams'), ('Jones'), ('Brown'),
-                ('Davis'), ('Miller'), ('Wilson'), ('Moore'), ('Taylor'),
-                ('Anderson'), ('Thomas'), ('Jackson'), ('White')
-        ) t(name);
-    """)
-
-    # ステータスのテーブル
-    duckdb.execute("""
-        CREATE TABLE statuses AS SELECT * FROM (
-            VALUES
-                ('Completed'), ('Pending'), ('Cancelled'), ('Refunded'), ('Shipped')
-        ) t(name);
-    """)
-
-
-def generate_and_upload_data(s3_path, rows):
-    """データを生成してS3に直接アップロード"""
-
-    # 並列処理を有効にする設定
-    duckdb.execute("SET threads TO 8;")  # Lambdaの環境に合わせて調整
+def connect(threads=None):
+    """
+    スレッド数を設定したDuckDBの接続を作成する
 
-    sql = f"""
-    COPY (
+    :param threads: int : スレッド数(指定しない場合は使用できるCPU数)
+    :return: duckdb.DuckDBPyConnection : 接続
+    """
+    con = duckdb.connect(database=":memory:")
+    con.execute(f"SET threads TO {threads or available_cpus()};")
+    return con
+
+
+def available_cpus():
+    # コンテナでCPUが制限されている場合は、プロセスが使用できるCPU数を使う
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _random(column, seed):
+    # 行番号と列の番号のハッシュで乱数を生成する(スレッド数によらず同じ値になる)
+    # 複数の引数のhashは下位ビットが列の間で相関するため、もう一度hashで混ぜる
+    return f"hash(hash(i, {column}, {seed}))"
+
+
+def _pick(values, column, seed):
+    # 配列のリテラルから1つ選ぶ(DuckDBの配列のインデックスは1から)
+    literal = "[" + ", ".join(_sql_string(value) for value in values) + "]"
+    return f"{literal}[1 + ({_random(column, seed)} % {len(values)})::BIGINT]"
+
+
+def _randint(low, high, column, seed):
+    # low以上high以下の整数を文字列にする
+    return f"({low} + {_random(column, seed)} % {high - low + 1})::VARCHAR"
+
+
+def build_query(rows, seed=0):
+    """
+    データを生成するSELECT文を作成する
+
+    各行の値は行番号と列のハッシュから1回の走査で求めるため、相関サブクエリや
+    ソートを使わず、行数に比例した時間で並列に生成できる
+
+    :param rows: int : 行数
+    :param seed: int : 乱数のシード
+    :return: str : SELECT文
+    """
+    return f"""
         SELECT
-            'CUST-' || (random() * 89999 + 10000)::INTEGER::VARCHAR AS customer_id,
-            (SELECT name FROM first_names ORDER BY random() LIMIT 1) || ' ' ||
-            (SELECT name FROM last_names ORDER BY random() LIMIT 1) AS full_name,
-            'user' || (random() * 899 + 100)::INTEGER::VARCHAR || '@' ||
-            (SELECT name FROM email_domains ORDER BY random() LIMIT 1) AS email,
-            '+' || (random() * 8 + 1)::INTEGER::VARCHAR || '-' ||
-            (random() * 899 + 100)::INTEGER::VARCHAR || '-' ||
-            (random() * 899 + 100)::INTEGER::VARCHAR || '-' ||
-            (random() * 8999 + 1000)::INTEGER::VARCHAR AS phone,
-            (SELECT name FROM companies ORDER BY random() LIMIT 1) AS company,
-            '$' || (random() * 990 + 10)::INTEGER::VARCHAR || '.' ||
-            lpad((random() * 99)::INTEGER::VARCHAR, 2, '0') AS purchase_amount,
-            (SELECT name FROM categories ORDER BY random() LIMIT 1) AS category,
-            (SELECT name FROM countries ORDER BY random() LIMIT 1) AS country,
-            (SELECT name FROM cities ORDER BY random() LIMIT 1) AS city,
-            (SELECT name FROM statuses ORDER BY random() LIMIT 1) AS status
+            'CUST-' || {_randint(10000, 99999, 0, seed)} AS customer_id,
+            {_pick(FIRST_NAMES, 1, seed)} || ' ' ||
+            {_pick(LAST_NAMES, 2, seed)} AS full_name,
+            'user' || {_randint(100, 999, 3, seed)} || '@' ||
+            {_pick(EMAIL_DOMAINS, 4, seed)} AS email,
+            '+' || {_randint(1, 9, 5, seed)} || '-' ||
+            {_randint(100, 999, 6, seed)} || '-' ||
+            {_randint(100, 999, 7, seed)} || '-' ||
+            {_randint(1000, 9999, 8, seed)} AS phone,
+            {_pick(COMPANIES, 9, seed)} AS company,
+            '$' || {_randint(10, 1000, 10, seed)} || '.' ||
+            lpad({_randint(0, 99, 11, seed)}, 2, '0') AS purchase_amount,
+            {_pick(CATEGORIES, 12, seed)} AS category,
+            {_pick(COUNTRIES, 13, seed)} AS country,
+            {_pick(CITIES, 14, seed)} AS city,
+            {_pick(STATUSES, 15, seed)} AS status
         FROM
-            generate_series(1, {rows})
-    ) TO '{s3_path}' WITH (FORMAT CSV, HEADER);
+            generate_series(1, {rows}) t(i)
+    """
+
+
+def generate_and_upload_data(con, path, rows, output_format="csv", seed=0):
+    """
+    データを生成してS3(またはローカル)に直接書き込む
+
+    :param con: duckdb.DuckDBPyConnection : 接続
+    :param path: str : 出力先(partitionedの場合はディレクトリ)
+    :param rows: int : 行数
+    :param output_format: str : csv / parquet / partitioned
+    :param seed: int : 乱数のシード
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"output_format must be one of {list(OUTPUT_FORMATS)}: {output_format}"
+        )
+
+    sql = f"""
+    COPY ({build_query(rows, seed)})
+    TO {_sql_string(path)} WITH ({OUTPUT_FORMATS[output_format]});
     """
 
     # SQLを実行してデータを生成し、S3に直接アップロード
-    duckdb.execute(sql)
+    con.execute(sql)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+import abc
+import importlib
+import importlib.util
+import json
+import os
+import resource
+import time
+from contextlib import contextmanager
+
+DEFAULT_COMPRESSION = "snappy"
+# pyarrowで読み込むブロックのサイズ(Parquetの1つの行グループになる)
+PYARROW_BLOCK_SIZE = 64 * 1024 * 1024
+
+
+@contextmanager
+def measure():
+    """
+    処理時間・CPU時間・ピークメモリを計測する
+
+    withブロックを抜けた時点で、yieldした辞書に以下を設定する
+    - wall_time: 経過時間(秒)
+    - cpu_time: プロセスのユーザー時間とシステム時間の合計(秒、全スレッド分)
+    - peak_rss: プロセスのピークメモリ(バイト、Lambdaのウォームスタートでは
+      それまでの呼び出しを含む)
+    """
+    metrics = {}
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics["wall_time"] = time.perf_counter() - start
+        metrics["cpu_time"] = time.process_time() - start_cpu
+        # Linuxのru_maxrssはKiB単位
+        metrics["peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Engine(abc.ABC):
+    """
+    CSVをParquetに変換するエンジンの基底クラス
+
+    各エンジンのライブラリはLambdaのレイヤーごとに異なるため、convertの中でimportする
+    """
+
+    name = None
+    label = None
+    module = None
+
+    def available(self):
+        """
+        エンジンのライブラリがインストールされているか
+        """
+        return importlib.util.find_spec(self.module) is not None
+
+    def version(self):
+        return getattr(importlib.import_module(self.module), "__version__", None)
+
+    @abc.abstractmethod
+    def convert(self, source_path, destination_path, compression=DEFAULT_COMPRESSION):
+        """
+        CSVをParquetに変換する
+
+        :param source_path: str : 入力のCSV(s3://またはローカルのパス)
+        :param destination_path: str : 出力のParquet(s3://またはローカルのパス)
+        :param compression: str : Parquetの圧縮方式
+        """
+
+
+class DuckDbEngine(Engine):
+    name = "duckdb"
+    label = "DuckDB"
+    module = "duckdb"
+
+    def __init__(self):
+        # S3に読み書きする接続は、Lambdaのコンテナごとに1回だけ初期化して再利用する
+        self._s3_connection = None
+
+    def convert(self, source_path, destination_path, compression=DEFAULT_COMPRESSION):
+        sql = f"""
+            COPY (SELECT * FROM read_csv_auto({_sql_string(source_path)},
+                                              parallel=True))
+            TO {_sql_string(destination_path)}
+            (FORMAT PARQUET, COMPRESSION '{compression.upper()}');
+        """
+        if not (_is_s3(source_path) or _is_s3(destination_path)):
+            import duckdb
+
+            with duckdb.connect(database=":memory:") as con:
+                con.execute(sql)
+            return
+
+        if self._s3_connection is None:
+            from duckdb_connection import DuckDbConnection
+
+            # これまでと同じく、S3の認証情報はhttpfsのデフォルトの設定を使う
+            self._s3_connection = DuckDbConnection(
+                extensions=["httpfs"], s3_secret=False
+            )
+        with self._s3_connection.session() as con:
+            con.execute(sql)
+
+
+class PolarsEngine(Engine):
+    name = "polars"
+    label = "Polars LazyFrame"
+    module = "polars"
+
+    def convert(self, source_path, destination_path, compression=DEFAULT_COMPRESSION):
+        # 専用のサブディレクトリを一時ディレクトリにする
+        os.environ.setdefault("POLARS_TEMP_DIR", "/tmp/polars_cache")
+        import polars as pl
+
+        # CSVをスキャンし、ストリーミングでParquetとして保存
+        df_lazy = pl.scan_csv(source_path, low_memory=True)
+        df_lazy.sink_parquet(destination_path, compression=compression)
+
+
+class AwsWranglerEngine(Engine):
+    name = "awswrangler"
+    label = "AWS Data Wrangler"
+    module = "awswrangler"
+
+    def convert(self, source_path, destination_path, compression=DEFAULT_COMPRESSION):
+        import awswrangler as wr
+        import pandas as pd
+
+        if _is_s3(source_path):
+            df = wr.s3.read_csv(source_path)
+        else:
+            # ローカルのファイルはawswranglerが内部で使用するpandasで読み込む
+            df = pd.read_csv(source_path)
+        if _is_s3(destination_path):
+            wr.s3.to_parquet(df=df, path=destination_path, compression=compression)
+        else:
+            df.to_parquet(destination_path, compression=compression, index=False)
+
+
+class PyArrowEngine(Engine):
+    name = "pyarrow"
+    label = "PyArrow"
+    module = "pyarrow"
+
+    def convert(self, source_path, destination_path, compression=DEFAULT_COMPRESSION):
+        import pyarrow.csv as pa_csv
+        import pyarrow.fs as pa_fs
+        import pyarrow.parquet as pq
+
+        source_fs, source = pa_fs.FileSystem.from_uri(_uri(source_path))
+        destination_fs, destination = pa_fs.FileSystem.from_uri(_uri(destination_path))
+        # ブロックごとに読み込んで書き込むため、ファイル全体をメモリに保持しない
+        with source_fs.open_input_stream(source) as f:
+            reader = pa_csv.open_csv(
+                f, read_options=pa_csv.ReadOptions(block_size=PYARROW_BLOCK_SIZE)
+            )
+            with pq.ParquetWriter(
+                destination,
+                reader.schema,
+                filesystem=destination_fs,
+                compression=compression,
+            ) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in [DuckDbEngine(), PolarsEngine(), AwsWranglerEngine(), PyArrowEngine()]
+}
+
+
+def get_engine(name):
+    """
+    名前からエンジンを取得する
+
+    :param name: str : duckdb / polars / awswrangler / pyarrow
+    :return: Engine : エンジン
+    """
+    if name not in ENGINES:
+        raise ValueError(f"engine must be one of {list(ENGINES)}: {name}")
+    return ENGINES[name]
+
+
+def _is_s3(path):
+    return path.startswith("s3://")
+
+
+def _uri(path):
+    return path if _is_s3(path) else os.path.abspath(path)
+
+
+def _sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def lambda_handler(event, context):
+    engine = get_engine(os.environ.get("engine"))
+
+    # S3バケット情報を取得
+    source_bucket = os.environ.get("source_bucket")
+    source_key = os.environ.get("source_key")
+    destination_bucket = os.environ.get("destination_bucket")
+    destination_key = os.environ.get("destination_key")
+
+    source_path = f"s3://{source_bucket}/{source_key}"
+    destination_path = f"s3://{destination_bucket}/{destination_key}"
+
+    try:
+        # 処理開始をログ出力
+        print(f"処理開始: {source_key} ({engine.name})")
+
+        with measure() as metrics:
+            engine.convert(source_path, destination_path)
+
+        print(
+            f"処理完了: 実行時間 {metrics['wall_time']:.2f}秒, "
+            f"CPU時間 {metrics['cpu_time']:.2f}秒, "
+            f"ピークメモリ {metrics['peak_rss'] / 1024 / 1024:,.0f}MiB"
+        )
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                {
+                    "message": (
+                        "CSV to Parquet conversion completed"
+                        f" successfully with {engine.label}"
+                    ),
+                    "engine": engine.name,
+                    "execution_time": metrics["wall_time"],
+                    "cpu_time": metrics["cpu_time"],
+                    "peak_rss": metrics["peak_rss"],
+                    "source": source_path,
+                    "destination": destination_path,
+                }
+            ),
+        }
+
+    except Exception as e:
+        print(f"エラー発生: {str(e)}")
+        raise e
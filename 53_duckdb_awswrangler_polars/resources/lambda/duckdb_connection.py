@@ -0,0 +1,133 @@
+import os
+import time
+from contextlib import contextmanager
+
+import duckdb
+
+# レイヤーに同梱した拡張機能のディレクトリ(CDKで環境変数に設定する)
+BUNDLED_EXTENSION_DIRECTORY = os.environ.get("DUCKDB_EXTENSION_DIRECTORY")
+# 同梱していない場合は、コールドスタート時に/tmpにダウンロードする
+DOWNLOAD_EXTENSION_DIRECTORY = "/tmp/duckdb_extensions"
+# CREDENTIAL_CHAINのシークレットは作成時に認証情報を取得するため、
+# 一定時間ごとに接続を作り直して認証情報を更新する
+DEFAULT_MAX_AGE_SECONDS = 3600
+
+
+class DuckDbConnection:
+    """
+    Lambdaのコンテナごとに1つのDuckDB接続を保持し、呼び出しの間で再利用する
+
+    拡張機能のロード・S3のシークレット・setupの処理(Glueカタログのアタッチなど)は
+    接続を作成したときに1回だけ行う。ウォームスタートでは接続のヘルスチェックだけを行い、
+    失敗した場合や処理中に例外が発生した場合は次の呼び出しで作り直す
+    """
+
+    def __init__(
+        self,
+        extensions=("httpfs",),
+        s3_secret=True,
+        setup=None,
+        max_age_seconds=DEFAULT_MAX_AGE_SECONDS,
+    ):
+        """
+        :param extensions: list[str] : ロードする拡張機能
+        :param s3_secret: bool : CREDENTIAL_CHAINのS3シークレットを作成するか
+        :param setup: Callable[[duckdb.DuckDBPyConnection], None] : 接続の作成時に
+            1回だけ実行する処理
+        :param max_age_seconds: int : 接続を作り直すまでの秒数
+        """
+        self.extensions = list(extensions)
+        self.s3_secret = s3_secret
+        self.setup = setup
+        self.max_age_seconds = max_age_seconds
+        self._con = None
+        self._created_at = None
+
+    def get(self):
+        """
+        初期化済みの接続を返す(なければ作成する)
+
+        :return: duckdb.DuckDBPyConnection : 接続
+        """
+        if self._con is not None and not self._healthy():
+            self.reset()
+        if self._con is None:
+            self._con = self._connect()
+            self._created_at = time.monotonic()
+        return self._con
+
+    @contextmanager
+    def session(self):
+        """
+        接続を取得し、例外が発生した場合は接続を破棄する
+
+        トランザクションが中断された状態の接続を次の呼び出しで使わないようにする
+        """
+        con = self.get()
+        try:
+            yield con
+        except Exception:
+            self.reset()
+            raise
+
+    def reset(self):
+        """
+        接続を閉じる(次のgetで作り直す)
+        """
+        if self._con is not None:
+            try:
+                self._con.close()
+            except duckdb.Error:
+                pass
+        self._con = None
+        self._created_at = None
+
+    def _healthy(self):
+        if time.monotonic() - self._created_at > self.max_age_seconds:
+            return False
+        try:
+            self._con.execute("SELECT 1").fetchone()
+        except duckdb.Error as e:
+            print(f"DuckDB接続のヘルスチェック失敗: {str(e)}")
+            return False
+        return True
+
+    def _connect(self):
+        bundled = BUNDLED_EXTENSION_DIRECTORY is not None
+        config = {
+            "home_directory": "/tmp",
+            "extension_directory": BUNDLED_EXTENSION_DIRECTORY
+            or DOWNLOAD_EXTENSION_DIRECTORY,
+        }
+        if bundled:
+            # 同梱していない拡張機能をネットワークからインストールしない
+            config["autoinstall_known_extensions"] = False
+        con = duckdb.connect(":memory:", config=config)
+        try:
+            statuses = _extension_statuses(con)
+            for name in self.extensions:
+                installed, loaded = statuses.get(name, (False, False))
+                if loaded:
+                    continue
+                if not installed and not bundled:
+                    # /tmpにインストール済みの場合はダウンロードしない
+                    con.install_extension(name)
+                con.load_extension(name)
+            if self.s3_secret:
+                con.execute("CREATE SECRET (TYPE S3, PROVIDER CREDENTIAL_CHAIN)")
+            if self.setup is not None:
+                self.setup(con)
+        except Exception:
+            con.close()
+            raise
+        print(f"DuckDB初期化完了 (extensions: {', '.join(self.extensions)})")
+        return con
+
+
+def _extension_statuses(con):
+    # 組み込みの拡張機能はインストール済み・ロード済みとして扱われる
+    # (パラメータを渡すとduckdbがpandasをimportするため、全件を取得する)
+    rows = con.execute(
+        "SELECT extension_name, installed, loaded FROM duckdb_extensions()"
+    ).fetchall()
+    return {name: (installed, loaded) for name, installed, loaded in rows}
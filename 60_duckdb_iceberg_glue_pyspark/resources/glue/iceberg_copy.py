@@ -54,12 +54,9 @@ def main():
         source_path = f"s3://{args['SOURCE_BUCKET']}/{args['SOURCE_PREFIX']}/sample_data_{args['TARGET_DATE']}.csv"
         print(f"Reading: {source_path}")
 
-        query = f"SELECT * FROM read_csv_auto('{source_path}')"
-        df = con.execute(query).fetch_arrow_table()
-        row_count = len(df)
-        print(f"Rows read: {row_count:,}")
-
-        if row_count == 0:
+        # 全件をメモリに読み込まず、先頭のブロックだけでデータの有無を確認
+        source = f"read_csv_auto('{source_path}')"
+        if con.execute(f"SELECT 1 FROM {source} LIMIT 1").fetchone() is None:
             print("No data found")
             con.close()
             job.commit()
@@ -77,12 +74,14 @@ def main():
         )
         print(f"Glue カタログ接続完了: Account={account_id}")
 
-        # Iceberg テーブルに insert
+        # Iceberg テーブルに read_csv_auto から直接 insert（DuckDB 内でストリーミング）
         table_identifier = (
             f"glue_catalog.{args['TARGET_DATABASE']}.{args['TARGET_TABLE']}"
         )
         print(f"Inserting into {table_identifier}...")
-        con.execute(f"INSERT INTO {table_identifier} SELECT * FROM df")
+        (row_count,) = con.execute(
+            f"INSERT INTO {table_identifier} SELECT * FROM {source}"
+        ).fetchone()
         print("INSERT完了")
 
         con.close()
@@ -94,6 +94,12 @@ export class MainStack extends cdk.Stack {
     // ========================================
     // Lambda Layer: DuckDB
     // ========================================
+    // 拡張機能もレイヤーに同梱し、コールドスタート時にダウンロードしない
+    const duckdbExtensions = ['httpfs', 'aws', 'avro', 'iceberg'];
+    const installExtensions = [
+      "import duckdb; con = duckdb.connect(config={'extension_directory': 'duckdb_extensions'})",
+      ...duckdbExtensions.map((name) => `con.install_extension('${name}')`),
+    ].join('; ');
     const duckdbLayer = new PythonLayerVersion(this, 'DuckdbLayer', {
       entry: path.join(__dirname, '../layers'),
       compatibleRuntimes: [lambda.Runtime.PYTHON_3_13],
@@ -101,6 +107,12 @@ export class MainStack extends cdk.Stack {
       bundling: {
         assetHashType: cdk.AssetHashType.SOURCE,
         outputPathSuffix: 'python',
+        commandHooks: {
+          beforeBundling: () => [],
+          afterBundling: (_inputDir: string, outputDir: string) => [
+            `cd ${outputDir} && python -c "${installExtensions}"`,
+          ],
+        },
       },
     });
 
@@ -122,6 +134,10 @@ export class MainStack extends cdk.Stack {
         SOURCE_PREFIX: 'data/sales_data',
         TARGET_DATABASE: targetDatabase,
         TARGET_TABLE: 'sales_data_iceberg',
+        // Iceberg テーブルへの書き込み方法（pyiceberg / duckdb）
+        ICEBERG_WRITER: 'pyiceberg',
+        // レイヤーは/opt/pythonに展開される
+        DUCKDB_EXTENSION_DIRECTORY: '/opt/python/duckdb_extensions',
       },
     });
   }
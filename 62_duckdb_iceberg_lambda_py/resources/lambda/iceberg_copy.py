@@ -2,7 +2,46 @@ import json
 import os
 
 import boto3
-import duckdb
+from duckdb_connection import DuckDbConnection
+from iceberg_load import DuckDbIcebergWriter, PyIcebergWriter, has_rows
+
+
+def attach_glue_catalog(con):
+    """
+    Glue カタログに接続（アカウントIDを使用）
+    """
+    account_id = boto3.client("sts").get_caller_identity()["Account"]
+    con.execute(
+        f"""
+        ATTACH '{account_id}' AS glue_catalog (
+            TYPE iceberg,
+            ENDPOINT_TYPE 'glue'
+        );
+    """
+    )
+    print(f"Glue カタログ接続完了: Account={account_id}")
+
+
+# コンテナごとに1回だけ初期化し、ウォームスタートでは接続を再利用する
+duckdb_connection = DuckDbConnection(
+    extensions=["httpfs", "aws", "avro", "iceberg"], setup=attach_glue_catalog
+)
+# PyIceberg の Glue カタログ（ICEBERG_WRITER=pyiceberg の場合に初回だけ作成）
+_pyiceberg_catalog = None
+
+
+def get_writer(con):
+    """
+    環境変数 ICEBERG_WRITER（pyiceberg / duckdb）で書き込み方法を選択
+    """
+    global _pyiceberg_catalog
+    if os.environ.get("ICEBERG_WRITER", "pyiceberg") == "pyiceberg":
+        if _pyiceberg_catalog is None:
+            from pyiceberg.catalog import load_catalog
+
+            _pyiceberg_catalog = load_catalog("glue", type="glue")
+        return PyIcebergWriter(con, _pyiceberg_catalog)
+    return DuckDbIcebergWriter(con)
 
 
 def lambda_handler(event, _context):
@@ -22,73 +61,31 @@ def lambda_handler(event, _context):
     print(f"Target: {target_database}.{target_table} (date={target_date})")
 
     try:
-        # DuckDB初期化
-        con = duckdb.connect(":memory:")
-        con.execute("SET home_directory='/tmp';")
-        con.execute("SET extension_directory='/tmp/duckdb_extensions';")
-        print("DuckDB初期化完了")
-
-        # AWS認証情報を設定
-        con.execute("""
-            CREATE SECRET (
-                TYPE S3,
-                PROVIDER CREDENTIAL_CHAIN
-            );
-        """)
-        print("S3 SECRET作成完了")
-
-        # S3 データ読み取り
-        source_path = (
-            f"s3://{source_bucket}/{source_prefix}/sample_data_{target_date}.csv"
-        )
-        print(f"Reading: {source_path}")
-
-        # CSVを読み取り、updated_atカラムを追加
-        query = f"""
-            SELECT
-                *,
-                CURRENT_TIMESTAMP AS updated_at
-            FROM read_csv_auto('{source_path}')
-        """
-        df = con.execute(query).fetch_arrow_table()
-        row_count = len(df)
-        print(f"Rows read: {row_count:,}")
-
-        if row_count == 0:
-            print("No data found")
-            con.close()
-            return {
-                "statusCode": 200,
-                "body": json.dumps({"message": "No data found", "rows_inserted": 0}),
-            }
-
-        # Glue カタログ接続（アカウントIDを使用）
-        account_id = boto3.client("sts").get_caller_identity()["Account"]
-        con.execute(
-            f"""
-            ATTACH '{account_id}' AS glue_catalog (
-                TYPE iceberg,
-                ENDPOINT_TYPE 'glue'
-            );
-        """
-        )
-        print(f"Glue カタログ接続完了: Account={account_id}")
-
-        # Iceberg テーブルに対する処理
-        table_identifier = f"glue_catalog.{target_database}.{target_table}"
-
-        # 既存のデータを削除（重複防止）
-        delete_query = f"DELETE FROM {table_identifier} WHERE date = '{target_date}'"
-        print(f"Deleting existing data for date={target_date}...")
-        con.execute(delete_query)
-        print("DELETE完了")
-
-        # データを insert
-        print(f"Inserting into {table_identifier}...")
-        con.execute(f"INSERT INTO {table_identifier} SELECT * FROM df")
-        print("INSERT完了")
-
-        con.close()
+        # DuckDB初期化（ウォームスタートでは初期化済みの接続を再利用）
+        with duckdb_connection.session() as con:
+            # S3 データ読み取り
+            source_path = (
+                f"s3://{source_bucket}/{source_prefix}/sample_data_{target_date}.csv"
+            )
+            print(f"Reading: {source_path}")
+
+            # 全件をメモリに読み込まず、先頭のブロックだけでデータの有無を確認
+            if not has_rows(con, source_path):
+                print("No data found")
+                return {
+                    "statusCode": 200,
+                    "body": json.dumps(
+                        {"message": "No data found", "rows_inserted": 0}
+                    ),
+                }
+
+            # Iceberg テーブルに対する処理（対象日付のデータを置き換え）
+            writer = get_writer(con)
+            print(f"Writer: {writer.name}")
+            row_count = writer.replace_date(
+                source_path, target_database, target_table, "date", target_date
+            )
+            print(f"Rows inserted: {row_count:,}")
 
         print(f"Lambda completed: {row_count:,} rows inserted")
 
@@ -0,0 +1,332 @@
+import datetime
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# fetch_record_batchで1回に取得する行数(DuckDBのベクトルサイズ2048の倍数)
+DEFAULT_BATCH_ROWS = 122_880
+# PyIcebergで書き込む1つのデータファイルの最大行数
+DEFAULT_FILE_ROWS = 2_000_000
+
+
+def _sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def csv_query(source_path):
+    """
+    CSVを読み取り、updated_atカラムを追加するSELECT文
+
+    :param source_path: str : CSVのパス(s3://またはローカルのパス)
+    :return: str : SELECT文
+    """
+    return f"""
+        SELECT
+            *,
+            CURRENT_TIMESTAMP AS updated_at
+        FROM read_csv_auto({_sql_string(source_path)})
+    """
+
+
+def has_rows(con, source_path):
+    """
+    CSVにデータ行があるか(先頭のブロックだけを読み込む)
+
+    :param con: duckdb.DuckDBPyConnection : 接続
+    :param source_path: str : CSVのパス
+    :return: bool : データ行がある場合はTrue
+    """
+    query = f"SELECT 1 FROM read_csv_auto({_sql_string(source_path)}) LIMIT 1"
+    return con.execute(query).fetchone() is not None
+
+
+class DuckDbIcebergWriter:
+    """
+    DuckDBのIceberg拡張でアタッチしたカタログのテーブルに書き込む
+
+    CSVの読み取りから書き込みまでをDuckDBの中でストリーミングで行うため、
+    データ全体をPythonのメモリに読み込まない
+    """
+
+    name = "duckdb"
+
+    def __init__(self, con, catalog="glue_catalog"):
+        """
+        :param con: duckdb.DuckDBPyConnection : カタログをアタッチした接続
+        :param catalog: str : アタッチしたカタログの名前
+        """
+        self.con = con
+        self.catalog = catalog
+
+    def replace_date(self, source_path, database, table, date_column, date):
+        """
+        指定した日付のデータを削除し、CSVのデータを挿入する
+
+        :param source_path: str : CSVのパス
+        :param database: str : データベース名
+        :param table: str : テーブル名
+        :param date_column: str : 日付のカラム名
+        :param date: str : 日付(YYYY-MM-DD)
+        :return: int : 挿入した行数
+        """
+        table_identifier = f"{self.catalog}.{database}.{table}"
+
+        # 既存のデータを削除（重複防止）
+        print(f"Deleting existing data for {date_column}={date}...")
+        self.con.execute(
+            f"DELETE FROM {table_identifier} WHERE {date_column} = {_sql_string(date)}"
+        )
+        print("DELETE完了")
+
+        # read_csv_autoから直接 insert し、行数は insert の結果から取得
+        print(f"Inserting into {table_identifier}...")
+        (row_count,) = self.con.execute(
+            f"INSERT INTO {table_identifier} {csv_query(source_path)}"
+        ).fetchone()
+        print("INSERT完了")
+        return row_count
+
+
+class PyIcebergWriter:
+    """
+    PyIcebergのカタログのテーブルに書き込む
+
+    DuckDBで読み取ったCSVをfetch_record_batchでbatch_rows行ずつ取得し、
+    file_rows行ごとのParquetファイルに書き込んでからテーブルに追加する。
+    メモリに保持するのは1つのバッチとParquetの書き込みバッファだけになる。
+    日付の置き換えはoverwrite_dateで1つのスナップショットとしてコミットする
+    """
+
+    name = "pyiceberg"
+
+    def __init__(
+        self,
+        con,
+        catalog,
+        batch_rows=DEFAULT_BATCH_ROWS,
+        file_rows=DEFAULT_FILE_ROWS,
+    ):
+        """
+        :param con: duckdb.DuckDBPyConnection : CSVを読み取る接続
+        :param catalog: pyiceberg.catalog.Catalog : カタログ
+        :param batch_rows: int : 1回に取得する行数
+        :param file_rows: int : 1つのデータファイルの最大行数
+        """
+        self.con = con
+        self.catalog = catalog
+        self.batch_rows = batch_rows
+        self.file_rows = file_rows
+
+    def replace_date(self, source_path, database, table, date_column, date):
+        """
+        指定した日付のデータをCSVのデータに置き換える(1つのスナップショット)
+
+        :param source_path: str : CSVのパス
+        :param database: str : データベース名
+        :param table: str : テーブル名
+        :param date_column: str : 日付のカラム名
+        :param date: str : 日付(YYYY-MM-DD)
+        :return: int : 追加した行数
+        """
+        iceberg_table = self.catalog.load_table((database, table))
+        result = self.con.execute(csv_query(source_path))
+        # duckdb 1.5からはto_arrow_reader(それ以前はfetch_record_batch)
+        if hasattr(result, "to_arrow_reader"):
+            reader = result.to_arrow_reader(self.batch_rows)
+        else:
+            reader = result.fetch_record_batch(self.batch_rows)
+        # 日付でパーティション分割されたテーブルでは、他の日付の行を含むファイルを
+        # 日付のパーティションに追加できないため、書き込む前に確認する
+        check_date = (
+            (date_column, date)
+            if is_partitioned_by(iceberg_table, date_column)
+            else None
+        )
+        file_paths, row_count = write_data_files(
+            iceberg_table, reader, self.file_rows, check_date
+        )
+
+        mode = overwrite_date(iceberg_table, date_column, date, file_paths)
+        print(f"Added {len(file_paths)} data files to {database}.{table} ({mode})")
+        return row_count
+
+
+def is_partitioned_by(iceberg_table, column):
+    """
+    テーブルがカラムの値(identityまたはday)でパーティション分割されているか
+
+    :param iceberg_table: pyiceberg.table.Table : テーブル
+    :param column: str : カラム名
+    :return: bool : 1つのパーティションに1つの値だけが含まれる場合はTrue
+    """
+    from pyiceberg.transforms import DayTransform, IdentityTransform
+
+    source_id = iceberg_table.schema().find_field(column).field_id
+    return any(
+        field.source_id == source_id
+        and isinstance(field.transform, (IdentityTransform, DayTransform))
+        for field in iceberg_table.spec().fields
+    )
+
+
+def overwrite_date(iceberg_table, date_column, date, file_paths):
+    """
+    指定した日付のデータファイルを削除し、追加するファイルと1つのOVERWRITE
+    スナップショットで置き換える(削除ファイルは作らない)
+
+    - overwrite: 日付でパーティション分割されたテーブルでは、日付のパーティションの
+      ファイルをメタデータの操作だけで置き換える
+    - merge: パーティション分割されていないテーブルでは、日付以外の行を含むファイルだけ
+      日付以外の行を新しいファイルに書き直す(copy-on-writeのMERGE)。
+      統計情報から日付だけを含むとわかるファイルは、そのまま置き換える
+
+    :param iceberg_table: pyiceberg.table.Table : テーブル
+    :param date_column: str : 日付のカラム名
+    :param date: str : 日付(YYYY-MM-DD)
+    :param file_paths: list[str] : write_data_filesで書き込んだParquetファイル
+                                   (コミットに失敗した場合は削除する)
+    :return: str : 置き換え方法(overwrite / merge)
+    """
+    from pyiceberg.exceptions import CommitStateUnknownException
+    from pyiceberg.expressions import EqualTo, IsNull, Not, Or
+    from pyiceberg.io.pyarrow import ArrowScan, parquet_files_to_data_files
+    from pyiceberg.table import TableProperties
+    from pyiceberg.utils.datetime import date_str_to_days
+
+    row_filter = EqualTo(date_column, date)
+    partitioned = is_partitioned_by(iceberg_table, date_column)
+    spec_id = iceberg_table.spec().spec_id
+    field_id = iceberg_table.schema().find_field(date_column).field_id
+    days = date_str_to_days(date)
+
+    # パーティションと統計情報で、日付の行を含む可能性のあるファイルだけに絞り込む
+    tasks = list(iceberg_table.scan(row_filter=row_filter).plan_files())
+    rewrite_paths = []
+    try:
+        for task in tasks:
+            if task.delete_files or not (
+                (partitioned and task.file.spec_id == spec_id)
+                or _contains_only(task.file, field_id, days)
+            ):
+                # 日付以外の行(NULLを含む)だけを、削除ファイルを適用して読み込む
+                remaining = ArrowScan(
+                    iceberg_table.metadata,
+                    iceberg_table.io,
+                    iceberg_table.schema(),
+                    Or(Not(row_filter), IsNull(date_column)),
+                ).to_table([task])
+                paths, _ = write_data_files(iceberg_table, remaining.to_reader())
+                rewrite_paths.extend(paths)
+
+        with iceberg_table.transaction() as tx:
+            # add_filesと同様に、フィールドIDを持たないファイルはカラム名で対応付ける
+            if tx.table_metadata.name_mapping() is None:
+                name_mapping = tx.table_metadata.schema().name_mapping
+                name_mapping_json = name_mapping.model_dump_json()
+                tx.set_properties(
+                    **{TableProperties.DEFAULT_NAME_MAPPING: name_mapping_json}
+                )
+            with tx.update_snapshot().overwrite() as overwrite:
+                for task in tasks:
+                    overwrite.delete_data_file(task.file)
+                for data_file in parquet_files_to_data_files(
+                    iceberg_table.io, tx.table_metadata, file_paths + rewrite_paths
+                ):
+                    overwrite.append_data_file(data_file)
+    except CommitStateUnknownException:
+        # コミットされた可能性があるため、ファイルは削除しない
+        raise
+    except Exception:
+        # どのスナップショットからも参照されないファイルを残さない
+        _delete_files(iceberg_table, file_paths + rewrite_paths)
+        raise
+    return "overwrite" if partitioned else "merge"
+
+
+def _contains_only(data_file, field_id, value):
+    # 統計情報の最小値と最大値が同じで、NULLを含まない場合だけTrue
+    from pyiceberg.conversions import from_bytes
+    from pyiceberg.types import DateType
+
+    lower = (data_file.lower_bounds or {}).get(field_id)
+    upper = (data_file.upper_bounds or {}).get(field_id)
+    null_count = (data_file.null_value_counts or {}).get(field_id)
+    return (
+        lower is not None
+        and upper is not None
+        and null_count == 0
+        and from_bytes(DateType(), lower) == value
+        and from_bytes(DateType(), upper) == value
+    )
+
+
+def _delete_files(iceberg_table, paths):
+    for path in paths:
+        try:
+            iceberg_table.io.delete(path)
+        except Exception as e:
+            print(f"Failed to delete {path}: {e!r}")
+
+
+def _check_date(table, date_column, date):
+    # 日付(タイムスタンプの場合はUTCの日付)が全ての行でdateと一致するか確認する
+    days = pc.cast(table.column(date_column), pa.date32())
+    expected = pa.scalar(datetime.date.fromisoformat(date), pa.date32())
+    if days.null_count or not pc.all(pc.equal(days, expected)).as_py():
+        raise ValueError(f"CSV contains rows whose {date_column} is not {date}")
+
+
+def write_data_files(
+    iceberg_table, reader, file_rows=DEFAULT_FILE_ROWS, check_date=None
+):
+    """
+    バッチを順にParquetファイルに書き込む(テーブルにはまだ追加しない)
+
+    例外が発生した場合は、書き込んだファイルを削除する
+
+    :param iceberg_table: pyiceberg.table.Table : 書き込み先のテーブル
+    :param reader: pa.RecordBatchReader : 書き込むデータ
+    :param file_rows: int : 1つのファイルの最大行数
+    :param check_date: tuple[str, str] : (日付のカラム名, 日付)。指定した場合、
+                                          他の日付の行があればValueErrorを送出する
+    :return: tuple[list[str], int] : 書き込んだファイルのパスと行数
+    """
+    # add_filesはフィールドIDを持つファイルを追加できないため、メタデータを除く
+    schema = pa.schema(
+        [field.remove_metadata() for field in iceberg_table.schema().as_arrow()]
+    )
+    file_paths = []
+    row_count = 0
+    writer = None
+    stream = None
+    file_row_count = 0
+    completed = False
+    try:
+        for batch in reader:
+            if batch.num_rows == 0:
+                continue
+            if writer is None or file_row_count >= file_rows:
+                if writer is not None:
+                    writer.close()
+                    stream.close()
+                path = f"{iceberg_table.location()}/data/{uuid.uuid4()}.parquet"
+                stream = iceberg_table.io.new_output(path).create(overwrite=True)
+                writer = pq.ParquetWriter(stream, schema)
+                file_paths.append(path)
+                file_row_count = 0
+            table = pa.Table.from_batches([batch]).select(schema.names).cast(schema)
+            if check_date is not None:
+                _check_date(table, *check_date)
+            writer.write_table(table)
+            file_row_count += batch.num_rows
+            row_count += batch.num_rows
+        completed = True
+    finally:
+        if writer is not None:
+            writer.close()
+            stream.close()
+        if not completed:
+            _delete_files(iceberg_table, file_paths)
+    return file_paths, row_count
@@ -0,0 +1,404 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from datetime import date, timedelta
+
+import duckdb
+import pyarrow as pa
+import pytest
+from pyiceberg.catalog.sql import SqlCatalog
+from pyiceberg.partitioning import PartitionField, PartitionSpec
+from pyiceberg.schema import Schema
+from pyiceberg.transforms import IdentityTransform
+from pyiceberg.types import (
+    DateType,
+    DoubleType,
+    LongType,
+    NestedField,
+    StringType,
+    TimestampType,
+)
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "lambda"))
+
+from iceberg_load import (
+    DuckDbIcebergWriter,
+    PyIcebergWriter,
+    has_rows,
+    is_partitioned_by,
+)
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+DATABASE = "sales"
+TABLE = "sales_data_iceberg"
+SCHEMA = Schema(
+    NestedField(1, "id", StringType()),
+    NestedField(2, "date", DateType()),
+    NestedField(3, "sales_amount", DoubleType()),
+    NestedField(4, "quantity", LongType()),
+    NestedField(5, "region", StringType()),
+    NestedField(6, "updated_at", TimestampType()),
+)
+# dateの値でパーティション分割する
+DATE_PARTITION_SPEC = PartitionSpec(
+    PartitionField(
+        source_id=2, field_id=1000, transform=IdentityTransform(), name="date"
+    )
+)
+
+
+def make_catalog(tmp_path, partition_spec=None):
+    catalog = SqlCatalog(
+        "local",
+        uri=f"sqlite:///{tmp_path}/catalog.db",
+        warehouse=f"file://{tmp_path}/warehouse",
+    )
+    catalog.create_namespace(DATABASE)
+    if partition_spec is None:
+        catalog.create_table((DATABASE, TABLE), schema=SCHEMA)
+    else:
+        catalog.create_table(
+            (DATABASE, TABLE), schema=SCHEMA, partition_spec=partition_spec
+        )
+    return catalog
+
+
+def write_csv(path, date, rows):
+    duckdb.execute(
+        f"""
+        COPY (
+            SELECT
+                lpad(i::VARCHAR, 8, '0') AS id,
+                DATE '{date}' AS date,
+                i * 0.5 AS sales_amount,
+                i AS quantity,
+                'Tokyo' AS region
+            FROM range({rows}) t(i)
+        ) TO '{path}' (FORMAT CSV, HEADER)
+        """
+    )
+    return str(path)
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect(":memory:")
+    yield con
+    con.close()
+
+
+def test_has_rows(con, tmp_path):
+    empty = tmp_path / "empty.csv"
+    empty.write_text("id,date,sales_amount,quantity,region\n")
+
+    assert has_rows(con, write_csv(tmp_path / "in.csv", "2025-11-18", 3))
+    assert not has_rows(con, str(empty))
+
+
+def test_pyiceberg_writer_replaces_date(con, tmp_path):
+    catalog = make_catalog(tmp_path)
+    writer = PyIcebergWriter(con, catalog, batch_rows=2048, file_rows=4096)
+    day1 = write_csv(tmp_path / "day1.csv", "2025-11-18", 10000)
+    day2 = write_csv(tmp_path / "day2.csv", "2025-11-19", 5)
+
+    assert writer.replace_date(day1, DATABASE, TABLE, "date", "2025-11-18") == 10000
+    assert writer.replace_date(day2, DATABASE, TABLE, "date", "2025-11-19") == 5
+    assert writer.replace_date(day1, DATABASE, TABLE, "date", "2025-11-18") == 10000
+
+    table = catalog.load_table((DATABASE, TABLE)).scan().to_arrow()
+    counts = table.group_by("date").aggregate([("id", "count")]).to_pylist()
+    assert sorted((row["date"].isoformat(), row["id_count"]) for row in counts) == [
+        ("2025-11-18", 10000),
+        ("2025-11-19", 5),
+    ]
+    # 先頭の0を含むIDが文字列のまま書き込まれる
+    assert "00000001" in table.column("id").to_pylist()
+
+
+def count_by_date(iceberg_table):
+    counts = (
+        iceberg_table.scan()
+        .to_arrow()
+        .group_by("date")
+        .aggregate([("id", "count")])
+        .to_pylist()
+    )
+    return sorted((row["date"].isoformat(), row["id_count"]) for row in counts)
+
+
+def scan_seconds(iceberg_table, repeat=5):
+    # 計画(マニフェストの読み込み)とデータの読み込みを含めた最短時間
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        iceberg_table.scan().to_arrow()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def daily_loads(con, tmp_path, name, days, reruns):
+    # days日分を1日ずつ読み込み、毎日reruns回再実行する(テーブルは日付で分割)
+    work_dir = tmp_path / name
+    work_dir.mkdir()
+    catalog = make_catalog(work_dir, DATE_PARTITION_SPEC)
+    writer = PyIcebergWriter(con, catalog)
+    for day in range(days):
+        target_date = (date(2025, 11, 1) + timedelta(days=day)).isoformat()
+        path = write_csv(work_dir / f"{target_date}.csv", target_date, 1000)
+        for _ in range(1 + reruns):
+            writer.replace_date(path, DATABASE, TABLE, "date", target_date)
+    return catalog.load_table((DATABASE, TABLE))
+
+
+@pytest.mark.parametrize("partition_spec", [DATE_PARTITION_SPEC, None])
+def test_daily_reruns_commit_one_snapshot_without_delete_files(
+    con, tmp_path, partition_spec
+):
+    catalog = make_catalog(tmp_path, partition_spec)
+    writer = PyIcebergWriter(con, catalog)
+    path = write_csv(tmp_path / "in.csv", "2025-11-18", 1000)
+
+    for _ in range(30):
+        assert writer.replace_date(path, DATABASE, TABLE, "date", "2025-11-18") == 1000
+
+    iceberg_table = catalog.load_table((DATABASE, TABLE))
+    assert is_partitioned_by(iceberg_table, "date") == (partition_spec is not None)
+    # 1回の実行で1つのOVERWRITEスナップショット(DELETE+INSERTでは2つ)
+    snapshots = iceberg_table.snapshots()
+    assert len(snapshots) == 30
+    operations = [snapshot.summary.operation.value for snapshot in snapshots]
+    # 初回は置き換えるファイルがないためAPPEND
+    assert operations == ["append"] + ["overwrite"] * 29
+    # 置き換えたファイルは現在のスナップショットに残らず、削除ファイルも作らない
+    tasks = list(iceberg_table.scan().plan_files())
+    assert len(tasks) == 1
+    assert not any(task.delete_files for task in tasks)
+    assert count_by_date(iceberg_table) == [("2025-11-18", 1000)]
+
+
+def test_daily_reruns_do_not_slow_down_scan(con, tmp_path):
+    once = daily_loads(con, tmp_path, "once", days=30, reruns=0)
+    rerun = daily_loads(con, tmp_path, "rerun", days=30, reruns=1)
+
+    assert len(once.snapshots()) == 30
+    assert len(rerun.snapshots()) == 60
+    # どちらも1日に1つのデータファイルだけが残る
+    for iceberg_table in (once, rerun):
+        tasks = list(iceberg_table.scan().plan_files())
+        assert len(tasks) == 30
+        assert not any(task.delete_files for task in tasks)
+    assert count_by_date(rerun) == count_by_date(once)
+    # 再実行しても、読み込み時間は1回ずつ読み込んだテーブルとほぼ同じ
+    assert scan_seconds(rerun) < scan_seconds(once) * 2
+
+
+def test_merge_rewrites_only_rows_of_other_dates(con, tmp_path):
+    catalog = make_catalog(tmp_path)
+    iceberg_table = catalog.load_table((DATABASE, TABLE))
+    # 2日分の行を含むファイル(パーティション分割されていないテーブル)
+    iceberg_table.append(
+        pa.table(
+            {
+                "id": ["a", "b", "c"],
+                "date": [date(2025, 11, 18), date(2025, 11, 19), None],
+                "sales_amount": [1.0, 2.0, 3.0],
+                "quantity": [1, 2, 3],
+                "region": ["Tokyo", "Osaka", "Nagoya"],
+                "updated_at": pa.array([None, None, None], pa.timestamp("us")),
+            },
+            schema=iceberg_table.schema().as_arrow(),
+        )
+    )
+    writer = PyIcebergWriter(con, catalog)
+    path = write_csv(tmp_path / "in.csv", "2025-11-18", 5)
+
+    assert writer.replace_date(path, DATABASE, TABLE, "date", "2025-11-18") == 5
+
+    iceberg_table = catalog.load_table((DATABASE, TABLE))
+    assert len(iceberg_table.snapshots()) == 2
+    rows = iceberg_table.scan().to_arrow()
+    # 2025-11-19とdateがNULLの行は残る
+    assert sorted(
+        row["id"] for row in rows.to_pylist() if row["date"] != date(2025, 11, 18)
+    ) == ["b", "c"]
+    assert rows.num_rows == 7
+    assert not any(task.delete_files for task in iceberg_table.scan().plan_files())
+
+
+def parquet_files(tmp_path):
+    return sorted((tmp_path / "warehouse").glob("**/data/*.parquet"))
+
+
+def test_partitioned_table_rejects_rows_of_other_dates(con, tmp_path):
+    catalog = make_catalog(tmp_path, DATE_PARTITION_SPEC)
+    writer = PyIcebergWriter(con, catalog, batch_rows=2048)
+    writer.replace_date(
+        write_csv(tmp_path / "day1.csv", "2025-11-18", 5),
+        DATABASE,
+        TABLE,
+        "date",
+        "2025-11-18",
+    )
+    existing_files = parquet_files(tmp_path)
+    assert len(existing_files) == 1
+    # 1つ目のバッチは2025-11-18、2つ目のバッチに2025-11-19の行を含むCSV
+    path = tmp_path / "mixed.csv"
+    con.execute(
+        f"""
+        COPY (
+            SELECT
+                lpad(i::VARCHAR, 8, '0') AS id,
+                DATE '2025-11-18' + (i >= 3000)::INTEGER AS date,
+                i * 0.5 AS sales_amount,
+                i AS quantity,
+                'Tokyo' AS region
+            FROM range(4000) t(i)
+        ) TO '{path}' (FORMAT CSV, HEADER)
+        """
+    )
+
+    with pytest.raises(ValueError):
+        writer.replace_date(str(path), DATABASE, TABLE, "date", "2025-11-18")
+
+    # 途中まで書き込んだファイルは削除され、テーブルも変わらない
+    assert parquet_files(tmp_path) == existing_files
+    iceberg_table = catalog.load_table((DATABASE, TABLE))
+    assert len(iceberg_table.snapshots()) == 1
+    assert count_by_date(iceberg_table) == [("2025-11-18", 5)]
+
+
+def test_failed_commit_deletes_written_files(con, tmp_path, monkeypatch):
+    catalog = make_catalog(tmp_path)
+    iceberg_table = catalog.load_table((DATABASE, TABLE))
+    # 2日分の行を含むファイル(置き換えるときに書き直す)
+    iceberg_table.append(
+        pa.table(
+            {
+                "id": ["a", "b"],
+                "date": [date(2025, 11, 18), date(2025, 11, 19)],
+                "sales_amount": [1.0, 2.0],
+                "quantity": [1, 2],
+                "region": ["Tokyo", "Osaka"],
+                "updated_at": pa.array([None, None], pa.timestamp("us")),
+            },
+            schema=iceberg_table.schema().as_arrow(),
+        )
+    )
+    existing_files = parquet_files(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr("pyiceberg.io.pyarrow.parquet_files_to_data_files", fail)
+    writer = PyIcebergWriter(con, catalog)
+    path = write_csv(tmp_path / "in.csv", "2025-11-18", 5)
+
+    with pytest.raises(RuntimeError):
+        writer.replace_date(path, DATABASE, TABLE, "date", "2025-11-18")
+
+    # CSVのファイルと書き直したファイルは、どのスナップショットからも参照されない
+    assert parquet_files(tmp_path) == existing_files
+    assert len(catalog.load_table((DATABASE, TABLE)).snapshots()) == 1
+
+
+def test_duckdb_writer_returns_row_count_from_insert(con, tmp_path):
+    # Iceberg拡張の代わりに、DuckDBのデータベースをカタログとしてアタッチする
+    con.execute("ATTACH ':memory:' AS glue_catalog")
+    con.execute(f"CREATE SCHEMA glue_catalog.{DATABASE}")
+    con.execute(
+        f"""
+        CREATE TABLE glue_catalog.{DATABASE}.{TABLE} (
+            id VARCHAR, date DATE, sales_amount DOUBLE, quantity BIGINT,
+            region VARCHAR, updated_at TIMESTAMP
+        )
+        """
+    )
+    writer = DuckDbIcebergWriter(con)
+    path = write_csv(tmp_path / "in.csv", "2025-11-18", 100)
+
+    assert writer.replace_date(path, DATABASE, TABLE, "date", "2025-11-18") == 100
+    assert writer.replace_date(path, DATABASE, TABLE, "date", "2025-11-18") == 100
+    (count,) = con.execute(
+        f"SELECT count(*) FROM glue_catalog.{DATABASE}.{TABLE}"
+    ).fetchone()
+    assert count == 100
+
+
+PEAK_RSS_CHILD = textwrap.dedent(
+    """
+    import json
+    import resource
+    import sys
+
+    import duckdb
+    from pyiceberg.catalog.sql import SqlCatalog
+
+    sys.path.append(sys.argv[1])
+    from iceberg_load import PyIcebergWriter
+
+    tmp_dir, source_path, database, table = sys.argv[2:6]
+    catalog = SqlCatalog(
+        "local",
+        uri=f"sqlite:///{tmp_dir}/catalog.db",
+        warehouse=f"file://{tmp_dir}/warehouse",
+    )
+    writer = PyIcebergWriter(duckdb.connect(":memory:"), catalog)
+    rows = writer.replace_date(source_path, database, table, "date", "2025-11-18")
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(json.dumps({"rows": rows, "peak_rss": peak_rss}))
+    """
+)
+
+
+def measure_load(tmp_path, name, rows):
+    # 親プロセスのメモリを引き継がないように、入力の生成と読み込みは別のプロセスで行う
+    work_dir = tmp_path / name
+    work_dir.mkdir()
+    make_catalog(work_dir)
+    source_path = work_dir / "in.csv"
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import duckdb, sys; duckdb.execute(sys.argv[1])",
+            f"""
+            COPY (
+                SELECT lpad(i::VARCHAR, 8, '0') AS id, DATE '2025-11-18' AS date,
+                       i * 0.5 AS sales_amount, i AS quantity,
+                       'region_' || (i % 100)::VARCHAR AS region
+                FROM range({rows}) t(i)
+            ) TO '{source_path}' (FORMAT CSV, HEADER)
+            """,
+        ],
+        check=True,
+    )
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            PEAK_RSS_CHILD,
+            LAMBDA_DIR,
+            str(work_dir),
+            str(source_path),
+            DATABASE,
+            TABLE,
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    result = json.loads(process.stdout.decode("utf-8").splitlines()[-1])
+    assert result["rows"] == rows
+    return result["peak_rss"], os.path.getsize(source_path)
+
+
+def test_pyiceberg_writer_peak_rss_is_independent_of_input_size(tmp_path):
+    small_rss, small_bytes = measure_load(tmp_path, "small", 1_000_000)
+    large_rss, large_bytes = measure_load(tmp_path, "large", 4_000_000)
+
+    # 入力が約4倍(約40MiB -> 約180MiB)になっても、ピークメモリはほとんど増えない
+    # (fetch_arrow_tableで全件を読み込む場合は、入力の増加と同程度に増える)
+    assert large_bytes > small_bytes * 3.5
+    assert large_rss - small_rss < (large_bytes - small_bytes) / 4
@@ -20,6 +20,8 @@ CREATE TABLE <DATABASE_NAME>.sales_data_iceberg (
     region STRING,
     updated_at TIMESTAMP
 )
+-- 日次ロードで date のパーティションを丸ごと置き換えるため、date で分割する
+PARTITIONED BY (date)
 LOCATION 's3://<PROJECT_NAME>-<ENV_NAME>-target/iceberg/sales_data_iceberg/'
 TBLPROPERTIES (
     'table_type' = 'ICEBERG',
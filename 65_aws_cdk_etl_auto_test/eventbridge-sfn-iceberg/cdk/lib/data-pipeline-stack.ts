@@ -89,7 +89,13 @@ export class DataPipelineStack extends cdk.Stack {
       destinationKeyPrefix: 'data',
     });
 
-    // DuckDB Lambda Layer
+    // DuckDB + PyIceberg Lambda Layer (extensions are bundled so cold starts never download them).
+    // DuckDB only reads the CSV; PyIceberg replaces the date's data in one snapshot.
+    const duckdbExtensions = ['httpfs', 'aws'];
+    const installExtensions = [
+      "import duckdb; con = duckdb.connect(config={'extension_directory': 'duckdb_extensions'})",
+      ...duckdbExtensions.map((name) => `con.install_extension('${name}')`),
+    ].join('; ');
     const duckdbLayer = new PythonLayerVersion(this, 'DuckdbLayer', {
       entry: path.join(__dirname, '../layers'),
       compatibleRuntimes: [lambda.Runtime.PYTHON_3_13],
@@ -97,6 +103,12 @@ export class DataPipelineStack extends cdk.Stack {
       bundling: {
         assetHashType: cdk.AssetHashType.SOURCE,
         outputPathSuffix: 'python',
+        commandHooks: {
+          beforeBundling: () => [],
+          afterBundling: (_inputDir: string, outputDir: string) => [
+            `cd ${outputDir} && python -c "${installExtensions}"`,
+          ],
+        },
       },
     });
 
@@ -123,13 +135,6 @@ export class DataPipelineStack extends cdk.Stack {
       })
     );
 
-    lambdaRole.addToPolicy(
-      new iam.PolicyStatement({
-        actions: ['sts:GetCallerIdentity'],
-        resources: ['*'],
-      })
-    );
-
     // Lambda function
     const processAndLoadLambda = new lambda.Function(this, 'ProcessAndLoad', {
       functionName: `${prefix}-process-and-load`,
@@ -146,6 +151,8 @@ export class DataPipelineStack extends cdk.Stack {
         SOURCE_PREFIX: 'data',
         TARGET_DATABASE: targetDatabase,
         TARGET_TABLE: 'orders_iceberg',
+        // Layers are extracted to /opt/python
+        DUCKDB_EXTENSION_DIRECTORY: '/opt/python/duckdb_extensions',
       },
     });
 
@@ -0,0 +1,248 @@
+import datetime
+import uuid
+
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Rows fetched from DuckDB per batch (a multiple of the 2048-row vector size)
+DEFAULT_BATCH_ROWS = 122_880
+# Maximum rows per data file written by PyIceberg
+DEFAULT_FILE_ROWS = 2_000_000
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def csv_query(source_path: str) -> str:
+    """SELECT statement that reads the CSV and adds a processed_at column."""
+    return f"""
+        SELECT
+            *,
+            CURRENT_TIMESTAMP AS processed_at
+        FROM read_csv_auto({_sql_string(source_path)})
+    """
+
+
+def has_rows(con: duckdb.DuckDBPyConnection, source_path: str) -> bool:
+    """Check for a data row by reading only the first block of the CSV."""
+    query = f"SELECT 1 FROM read_csv_auto({_sql_string(source_path)}) LIMIT 1"
+    return con.execute(query).fetchone() is not None
+
+
+class PyIcebergWriter:
+    """Write CSV data to a table of a PyIceberg catalog.
+
+    DuckDB streams the CSV in batches of ``batch_rows`` into Parquet files of
+    up to ``file_rows`` rows, so only one batch and the Parquet write buffer
+    are held in memory. The date is replaced with a single snapshot by
+    ``overwrite_date``.
+    """
+
+    def __init__(
+        self,
+        con: duckdb.DuckDBPyConnection,
+        catalog,
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        file_rows: int = DEFAULT_FILE_ROWS,
+    ) -> None:
+        self.con = con
+        self.catalog = catalog
+        self.batch_rows = batch_rows
+        self.file_rows = file_rows
+
+    def replace_date(
+        self, source_path: str, database: str, table: str, date_column: str, date: str
+    ) -> int:
+        """Replace the rows of ``date`` with the CSV rows and return the row count."""
+        iceberg_table = self.catalog.load_table((database, table))
+        result = self.con.execute(csv_query(source_path))
+        # duckdb 1.5 renamed fetch_record_batch to to_arrow_reader
+        if hasattr(result, "to_arrow_reader"):
+            reader = result.to_arrow_reader(self.batch_rows)
+        else:
+            reader = result.fetch_record_batch(self.batch_rows)
+        # A partitioned table cannot take a file that spans date partitions,
+        # so other dates are rejected before anything is committed
+        check_date = (
+            (date_column, date)
+            if is_partitioned_by(iceberg_table, date_column)
+            else None
+        )
+        file_paths, row_count = write_data_files(
+            iceberg_table, reader, self.file_rows, check_date
+        )
+
+        mode = overwrite_date(iceberg_table, date_column, date, file_paths)
+        print(f"Added {len(file_paths)} data files to {database}.{table} ({mode})")
+        return row_count
+
+
+def is_partitioned_by(iceberg_table, column: str) -> bool:
+    """Whether each partition holds a single value of ``column`` (identity or day)."""
+    from pyiceberg.transforms import DayTransform, IdentityTransform
+
+    source_id = iceberg_table.schema().find_field(column).field_id
+    return any(
+        field.source_id == source_id
+        and isinstance(field.transform, (IdentityTransform, DayTransform))
+        for field in iceberg_table.spec().fields
+    )
+
+
+def overwrite_date(
+    iceberg_table, date_column: str, date: str, file_paths: list[str]
+) -> str:
+    """Replace the data files holding ``date`` in one OVERWRITE snapshot.
+
+    No delete files are written:
+
+    - overwrite: on a table partitioned by the date, the files of the date's
+      partition are swapped as a metadata-only operation.
+    - merge: otherwise, files that also hold other dates have those rows
+      rewritten to new files (copy-on-write MERGE). Files whose column
+      statistics show only the date are swapped as they are.
+
+    ``file_paths`` and the rewritten files are deleted if the commit fails.
+    Returns the mode that was used.
+    """
+    from pyiceberg.exceptions import CommitStateUnknownException
+    from pyiceberg.expressions import EqualTo, IsNull, Not, Or
+    from pyiceberg.io.pyarrow import ArrowScan, parquet_files_to_data_files
+    from pyiceberg.table import TableProperties
+    from pyiceberg.utils.datetime import date_str_to_days
+
+    row_filter = EqualTo(date_column, date)
+    partitioned = is_partitioned_by(iceberg_table, date_column)
+    spec_id = iceberg_table.spec().spec_id
+    field_id = iceberg_table.schema().find_field(date_column).field_id
+    days = date_str_to_days(date)
+
+    # Partition values and column statistics narrow this to files that may hold the date
+    tasks = list(iceberg_table.scan(row_filter=row_filter).plan_files())
+    rewrite_paths: list[str] = []
+    try:
+        for task in tasks:
+            if task.delete_files or not (
+                (partitioned and task.file.spec_id == spec_id)
+                or _contains_only(task.file, field_id, days)
+            ):
+                # Read only the other rows (including NULL dates) with deletes applied
+                remaining = ArrowScan(
+                    iceberg_table.metadata,
+                    iceberg_table.io,
+                    iceberg_table.schema(),
+                    Or(Not(row_filter), IsNull(date_column)),
+                ).to_table([task])
+                paths, _ = write_data_files(iceberg_table, remaining.to_reader())
+                rewrite_paths.extend(paths)
+
+        with iceberg_table.transaction() as tx:
+            # Like add_files, map columns by name since the files carry no field IDs
+            if tx.table_metadata.name_mapping() is None:
+                name_mapping = tx.table_metadata.schema().name_mapping
+                name_mapping_json = name_mapping.model_dump_json()
+                tx.set_properties(
+                    **{TableProperties.DEFAULT_NAME_MAPPING: name_mapping_json}
+                )
+            with tx.update_snapshot().overwrite() as overwrite:
+                for task in tasks:
+                    overwrite.delete_data_file(task.file)
+                for data_file in parquet_files_to_data_files(
+                    iceberg_table.io, tx.table_metadata, file_paths + rewrite_paths
+                ):
+                    overwrite.append_data_file(data_file)
+    except CommitStateUnknownException:
+        # The commit may have succeeded, so the files must stay
+        raise
+    except Exception:
+        # Leave no files behind that no snapshot references
+        _delete_files(iceberg_table, file_paths + rewrite_paths)
+        raise
+    return "overwrite" if partitioned else "merge"
+
+
+def _contains_only(data_file, field_id: int, value: int) -> bool:
+    # True only when min == max == value and the column has no NULLs
+    from pyiceberg.conversions import from_bytes
+    from pyiceberg.types import DateType
+
+    lower = (data_file.lower_bounds or {}).get(field_id)
+    upper = (data_file.upper_bounds or {}).get(field_id)
+    null_count = (data_file.null_value_counts or {}).get(field_id)
+    return (
+        lower is not None
+        and upper is not None
+        and null_count == 0
+        and from_bytes(DateType(), lower) == value
+        and from_bytes(DateType(), upper) == value
+    )
+
+
+def _delete_files(iceberg_table, paths: list[str]) -> None:
+    for path in paths:
+        try:
+            iceberg_table.io.delete(path)
+        except Exception as e:
+            print(f"Failed to delete {path}: {e!r}")
+
+
+def _check_date(table: pa.Table, date_column: str, date: str) -> None:
+    # Every row's date (the UTC date for timestamps) must equal ``date``
+    days = pc.cast(table.column(date_column), pa.date32())
+    expected = pa.scalar(datetime.date.fromisoformat(date), pa.date32())
+    if days.null_count or not pc.all(pc.equal(days, expected)).as_py():
+        raise ValueError(f"CSV contains rows whose {date_column} is not {date}")
+
+
+def write_data_files(
+    iceberg_table,
+    reader: pa.RecordBatchReader,
+    file_rows: int = DEFAULT_FILE_ROWS,
+    check_date: tuple[str, str] | None = None,
+) -> tuple[list[str], int]:
+    """Write batches to Parquet files without adding them to the table yet.
+
+    With ``check_date`` as ``(date_column, date)``, a row of another date
+    raises ValueError. The written files are deleted on any error.
+    Returns the written file paths and the row count.
+    """
+    # Files are mapped to columns by name (as add_files requires), so drop field IDs
+    schema = pa.schema(
+        [field.remove_metadata() for field in iceberg_table.schema().as_arrow()]
+    )
+    file_paths: list[str] = []
+    row_count = 0
+    writer = None
+    stream = None
+    file_row_count = 0
+    completed = False
+    try:
+        for batch in reader:
+            if batch.num_rows == 0:
+                continue
+            if writer is None or file_row_count >= file_rows:
+                if writer is not None:
+                    writer.close()
+                    stream.close()
+                path = f"{iceberg_table.location()}/data/{uuid.uuid4()}.parquet"
+                stream = iceberg_table.io.new_output(path).create(overwrite=True)
+                writer = pq.ParquetWriter(stream, schema)
+                file_paths.append(path)
+                file_row_count = 0
+            table = pa.Table.from_batches([batch]).select(schema.names).cast(schema)
+            if check_date is not None:
+                _check_date(table, *check_date)
+            writer.write_table(table)
+            file_row_count += batch.num_rows
+            row_count += batch.num_rows
+        completed = True
+    finally:
+        if writer is not None:
+            writer.close()
+            stream.close()
+        if not completed:
+            _delete_files(iceberg_table, file_paths)
+    return file_paths, row_count
@@ -4,7 +4,8 @@ import re
 from datetime import datetime, timezone
 
 import boto3
-import duckdb
+from duckdb_connection import DuckDbConnection
+from iceberg_load import PyIcebergWriter, has_rows
 
 s3_client = boto3.client("s3")
 
@@ -14,6 +15,21 @@ TARGET_DATABASE = os.environ["TARGET_DATABASE"]
 TARGET_TABLE = os.environ["TARGET_TABLE"]
 
 
+# Initialised once per container and reused across warm invocations.
+# DuckDB only reads the CSV; PyIceberg commits to the Glue catalog.
+duckdb_connection = DuckDbConnection(extensions=["httpfs", "aws"])
+_pyiceberg_catalog = None
+
+
+def get_writer(con) -> PyIcebergWriter:
+    global _pyiceberg_catalog
+    if _pyiceberg_catalog is None:
+        from pyiceberg.catalog import load_catalog
+
+        _pyiceberg_catalog = load_catalog("glue", type="glue")
+    return PyIcebergWriter(con, _pyiceberg_catalog)
+
+
 def lambda_handler(event: dict, _context) -> dict:
     target_date = event["target_date"]
     if not re.match(r"^\d{4}-\d{2}-\d{2}$", target_date):
@@ -22,43 +38,16 @@ def lambda_handler(event: dict, _context) -> dict:
     print("Lambda started")
     print(f"Target: {TARGET_DATABASE}.{TARGET_TABLE} (date={target_date})")
 
-    con = duckdb.connect(":memory:")
-    con.execute("SET home_directory='/tmp';")
-    con.execute("SET extension_directory='/tmp/duckdb_extensions';")
-
-    con.execute("CREATE SECRET (TYPE S3, PROVIDER CREDENTIAL_CHAIN)")
+    with duckdb_connection.session() as con:
+        source_path = f"s3://{SOURCE_BUCKET}/{SOURCE_PREFIX}/orders_{target_date}.csv"
+        if not has_rows(con, source_path):
+            return {"statusCode": 200, "body": json.dumps({"rows_inserted": 0})}
 
-    source_path = f"s3://{SOURCE_BUCKET}/{SOURCE_PREFIX}/orders_{target_date}.csv"
-    df = con.execute(
-        f"""
-        SELECT
-            *,
-            CURRENT_TIMESTAMP AS processed_at
-        FROM read_csv_auto('{source_path}')
-    """
-    ).fetch_arrow_table()
-
-    row_count = len(df)
-    print(f"Rows read: {row_count:,}")
-
-    if row_count == 0:
-        con.close()
-        return {"statusCode": 200, "body": json.dumps({"rows_inserted": 0})}
-
-    account_id = boto3.client("sts").get_caller_identity()["Account"]
-    con.execute(
-        f"""
-        ATTACH '{account_id}' AS glue_catalog (
-            TYPE iceberg,
-            ENDPOINT_TYPE 'glue'
+        # One OVERWRITE snapshot replaces the date (no DELETE + INSERT delete files)
+        row_count = get_writer(con).replace_date(
+            source_path, TARGET_DATABASE, TARGET_TABLE, "order_date", target_date
         )
-    """
-    )
-
-    table_id = f"glue_catalog.{TARGET_DATABASE}.{TARGET_TABLE}"
-    con.execute(f"DELETE FROM {table_id} WHERE order_date = ?", [target_date])
-    con.execute(f"INSERT INTO {table_id} SELECT * FROM df")
-    con.close()
+        print(f"Rows inserted: {row_count:,}")
 
     source_key = f"{SOURCE_PREFIX}/orders_{target_date}.csv"
     now = datetime.now(timezone.utc)